@@ -1,15 +1,62 @@
 import csv
 import argparse
+import gzip
+import hashlib
+import heapq
+import io
+import os
 import sys
-from typing import Set, List
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, redirect_stdout
+from itertools import compress
+from typing import TYPE_CHECKING, Container, Dict, Set, List, Optional, Tuple
 from pathlib import Path
+from types import SimpleNamespace
 
+try:
+    from loading_scripts.lib import progress
+except ImportError:
+    # run outside the repository, or without rich: the stages run without any progress display
+    progress = None
 
-def discover_unique_values(csv_files: List[Path], column_name: str, limit: int) -> Set[str]:
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class _NoProgressTracker:
+    """Stand-in for progress.ProgressTracker when the progress module cannot be imported: shows nothing."""
+
+    def __init__(self, description, total=None, unit=None, enabled=None):
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def advance(self, amount):
+        self.position += amount
+
+    @contextmanager
+    def watching(self, f):
+        yield self
+
+
+if progress is None:
+    progress = SimpleNamespace(ENABLED=False, ProgressTracker=_NoProgressTracker)
+
+
+def discover_unique_values(csv_files: List[Path], column_name: str, limit: int,
+                           tracker: progress.ProgressTracker = None, use_index: bool = False) -> Set[str]:
     """
     Scans CSV files to find and return the first 'limit' unique values for the
     specified column name.
+    The tracker, when given, follows the bytes of the files read.
+    With use_index, the values of the files with a current KeyIndex are read from it instead.
     """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
     allowed_values: Set[str] = set()
     total_files = len(csv_files)
 
@@ -24,7 +71,17 @@ def discover_unique_values(csv_files: List[Path], column_name: str, limit: int)
             f"[{i}/{total_files}] Scanning file for keys: {input_filepath.relative_to(csv_files[0].parent.parent if csv_files else Path())}")
 
         try:
-            with open(str(input_filepath), mode='r', newline='', encoding='utf-8') as infile:
+            index = KeyIndex.load(input_filepath, column_name) if use_index else None
+            if index is not None:
+                for column_value in index.values_in_order():
+                    if len(allowed_values) >= limit:
+                        break
+                    allowed_values.add(column_value)
+                tracker.advance(input_filepath.stat().st_size)
+                continue
+
+            with open(str(input_filepath), mode='r', newline='', encoding='utf-8') as infile, \
+                    tracker.watching(infile):
                 reader = csv.reader(infile)
 
                 try:
@@ -55,29 +112,395 @@ def discover_unique_values(csv_files: List[Path], column_name: str, limit: int)
     return allowed_values
 
 
-def limit_csv(input_filepath: Path, output_filepath: Path, column_name: str, allowed_values: Set[str]):
+def value_hash(value: str) -> int:
+    """
+    Stable 64-bit hash of a column value, used by the hash sampling: unlike hash(), it is the same in every run
+    and process, so the same values are selected in all the files and tables sharing the column.
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashFraction:
+    """
+    Allowed values of the --fraction sampling: the values whose value_hash falls under the fraction of the
+    hash range. It is used as the allowed set of limit_csv, no discovery is needed.
+    """
+
+    def __init__(self, fraction: float):
+        self.fraction = fraction
+        self.threshold = int(fraction * 2 ** 64)
+
+    def __contains__(self, value: str) -> bool:
+        return value_hash(value) < self.threshold
+
+
+def bottom_k_values(input_filepath: Path, column_name: str, k: int,
+                    tracker: progress.ProgressTracker = None, use_index: bool = False) -> List[Tuple[int, str]]:
+    """
+    Returns the sorted (hash, value) pairs of the k distinct values of the column with the smallest value_hash
+    in the file, its bottom-k sketch: the sketches of several files merge into the one of all of them.
+    The tracker, when given, follows the bytes of the file read.
+    With use_index, the values are read from the KeyIndex of the file when it is current.
+    """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
+    # Max-heap of the k smallest hashes, as (-hash, value)
+    heap: List[Tuple[int, str]] = []
+    selected: Set[str] = set()
+
+    try:
+        index = KeyIndex.load(input_filepath, column_name) if use_index else None
+        if index is not None:
+            tracker.advance(input_filepath.stat().st_size)
+            return heapq.nsmallest(k, ((value_hash(column_value), column_value) for column_value in index.values()))
+
+        with open(str(input_filepath), mode='r', newline='', encoding='utf-8') as infile, \
+                tracker.watching(infile):
+            reader = csv.reader(infile)
+
+            try:
+                header = next(reader)
+            except StopIteration:
+                return []
+
+            try:
+                column_index = header.index(column_name)
+            except ValueError:
+                print(f"Warning: Column '{column_name}' not found in {input_filepath.name}. Skipping file.")
+                return []
+
+            for row in reader:
+                if len(row) <= column_index or row[column_index] in selected:
+                    continue
+                column_value = row[column_index]
+                column_hash = value_hash(column_value)
+                if len(heap) < k:
+                    heapq.heappush(heap, (-column_hash, column_value))
+                    selected.add(column_value)
+                elif column_hash < -heap[0][0]:
+                    _, evicted = heapq.heapreplace(heap, (-column_hash, column_value))
+                    selected.discard(evicted)
+                    selected.add(column_value)
+
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_filepath.name}' not found. Skipping.")
+    except Exception as e:
+        print(f"An unexpected error occurred during discovery in {input_filepath.name}: {e}")
+
+    return sorted((-negated_hash, value) for negated_hash, value in heap)
+
+
+def _bottom_k_in_worker(input_filepath: Path, column_name: str, k: int, use_index: bool):
+    """Runs bottom_k_values in a worker process, and returns its sketch and its messages for the parent to print."""
+    messages = io.StringIO()
+    with redirect_stdout(messages):
+        sketch = bottom_k_values(input_filepath, column_name, k, use_index=use_index)
+    return sketch, messages.getvalue()
+
+
+def discover_bottom_k(csv_files: List[Path], column_name: str, k: int, workers: int, input_path: Path,
+                      tracker: progress.ProgressTracker = None, use_index: bool = False) -> Set[str]:
+    """
+    Hash sampling variant of discover_unique_values: returns the k values of the column with the smallest
+    value_hash over all the files. The selection depends neither on the order of the rows and files nor on
+    the other columns, and the files are sketched in parallel with more than one worker.
+    """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
+    hashes: Dict[str, int] = {}
+
+    print("\n--- PHASE 1: Discovering the Values of Smallest Hash ---")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_bottom_k_in_worker, input_file, column_name, k, use_index): input_file
+                       for input_file in sorted(csv_files, key=lambda input_file: -input_file.stat().st_size)}
+            for i, future in enumerate(as_completed(futures), 1):
+                input_file = futures[future]
+                sketch, messages = future.result()
+                print(f"[{i}/{len(csv_files)}] Scanned file for keys: {input_file.relative_to(input_path)}")
+                print(messages, end='')
+                tracker.advance(input_file.stat().st_size)
+                hashes.update((value, column_hash) for column_hash, value in sketch)
+    else:
+        for i, input_file in enumerate(csv_files, 1):
+            print(f"[{i}/{len(csv_files)}] Scanning file for keys: {input_file.relative_to(input_path)}")
+            sketch = bottom_k_values(input_file, column_name, k, tracker, use_index)
+            hashes.update((value, column_hash) for column_hash, value in sketch)
+
+    allowed_values = {value for _, value in heapq.nsmallest(k, ((h, value) for value, h in hashes.items()))}
+    print(f"Discovery complete. Found {len(allowed_values)} unique values to keep.")
+    return allowed_values
+
+
+def _open_keys(keys_filepath: Path, mode: str):
+    """Opens a key set file as text, gzip-compressed when its name ends with .gz."""
+    if keys_filepath.suffix == '.gz':
+        return gzip.open(str(keys_filepath), mode + 't', newline='', encoding='utf-8')
+    return open(str(keys_filepath), mode, newline='', encoding='utf-8')
+
+
+def save_keys(keys_filepath: Path, values: Set[str]):
+    """
+    Saves a set of column values, sorted, one per line (quoted by the csv module when needed),
+    so that load_keys can filter other tables sharing the values, see --save_keys.
+    """
+    keys_filepath.parent.mkdir(parents=True, exist_ok=True)
+    with _open_keys(keys_filepath, 'w') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerows([value] for value in sorted(values))
+    print(f"Saved {len(values)} unique values to: {keys_filepath}")
+
+
+def load_keys(keys_filepath: Path) -> Set[str]:
+    """Loads a set of column values saved by save_keys."""
+    with _open_keys(keys_filepath, 'r') as f:
+        values = {row[0] for row in csv.reader(f) if row}
+    print(f"Loaded {len(values)} unique values to keep from: {keys_filepath}")
+    return values
+
+
+# Buffer sizes of the files read and written by limit_csv: kept lines are written in blocks of this size
+FILTER_BUFFER_SIZE = 1024 * 1024
+
+# Returned by _key_value for the rows only the csv module can split
+_PARSE_ROW = object()
+
+
+def _field_end(line: bytes, start: int, content_end: int) -> int:
+    """
+    Returns the index of the delimiter ending the field of line starting at start, content_end for the last field,
+    or -1 when the field is quoted and its closing quote is not on this line or not followed by a delimiter.
+    """
+    if not line.startswith(b'"', start):
+        comma = line.find(b',', start, content_end)
+        return content_end if comma < 0 else comma
+    position = start + 1
+    while True:
+        quote = line.find(b'"', position, content_end)
+        if quote < 0:
+            return -1
+        if line.startswith(b'""', quote):
+            # escaped quote
+            position = quote + 2
+            continue
+        end = quote + 1
+        return end if end == content_end or line[end] == ord(',') else -1
+
+
+def _key_value(line: bytes, column_index: int):
+    """
+    Returns the value of the column_index field of a raw CSV line, unquoted and decoded,
+    None when the row has fewer fields, or _PARSE_ROW when the row needs the csv module:
+    a quoted field goes on over the next lines, or has characters after its closing quote.
+    """
+    first_quote = line.find(b'"')
+    fields = line.split(b',', column_index + 1)
+    if first_quote < 0:
+        if len(fields) <= column_index or line in (b'\n', b'\r\n'):
+            return None
+        value = fields[column_index].rstrip(b'\r\n') if len(fields) == column_index + 1 else fields[column_index]
+        return value.decode('utf-8')
+
+    content_end = len(line.rstrip(b'\r\n'))
+    if len(fields) > column_index + 1 and len(line) - len(fields[-1]) <= first_quote:
+        # the quotes are all after the key
+        value = fields[column_index]
+        key_end = first_quote - 1
+    else:
+        start = 0
+        for _ in range(column_index):
+            end = _field_end(line, start, content_end)
+            if end < 0:
+                return _PARSE_ROW
+            if end == content_end:
+                return None
+            start = end + 1
+        key_end = _field_end(line, start, content_end)
+        if key_end < 0:
+            return _PARSE_ROW
+        if line.startswith(b'"', start):
+            value = line[start + 1:key_end - 1].replace(b'""', b'"')
+        else:
+            value = line[start:key_end]
+
+    # The row must also end on this line: skip from quote to quote, the quoted fields have to be closed
+    position = key_end
+    while True:
+        quote = line.find(b'"', position, content_end)
+        if quote < 0:
+            return value.decode('utf-8')
+        if line[quote - 1] != ord(','):
+            # a quote inside an unquoted field is kept as is
+            position = quote + 1
+            continue
+        position = _field_end(line, quote, content_end)
+        if position < 0:
+            return _PARSE_ROW
+
+
+def _parse_row(record: List[bytes], lines) -> List[str]:
+    """
+    Parses with the csv module the row starting with the line record[0], appending to record the next lines
+    it takes from lines.
+    """
+    def record_text():
+        yield record[0].decode('utf-8')
+        for line in lines:
+            record.append(line)
+            yield line.decode('utf-8')
+
+    return next(csv.reader(record_text()), [])
+
+
+# Rows of a file checked at once against a CompactKeySet
+COMPACT_BATCH_ROWS = 65536
+
+
+class CompactKeySet:
+    """
+    Memory-compact set of values for key sets in the millions (--compact_keys): the sorted 64-bit hashes
+    of the values (pandas hash_array), and the values encoded in one buffer in the same order, to verify
+    the hash matches exactly. A value costs 16 bytes plus its length instead of a hundred or more in a set,
+    and the set pickles to the workers as a few arrays.
+    contains_many checks a batch of values at once; a single value is checked with in.
+    """
+
+    def __init__(self, values: Set[str]):
+        # numpy is only needed by the compact key sets and the key indexes
+        import numpy as np
+        values = np.array(list(values), dtype=object)
+        hashes = _hash_values(values)
+        order = np.argsort(hashes, kind='stable')
+        self.hashes = hashes[order]
+        encoded = [value.encode('utf-8') for value in values[order].tolist()]
+        self.buffer = b''.join(encoded)
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.uint32 if len(self.buffer) < 2 ** 32 else np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=self.offsets[1:])
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __contains__(self, value: str) -> bool:
+        return bool(self.contains_many([value])[0])
+
+    def contains_many(self, values: List[str]) -> 'np.ndarray':
+        """Boolean mask of the values in the set."""
+        import numpy as np
+        hashes = _hash_values(np.array(values, dtype=object))
+        positions = np.searchsorted(self.hashes, hashes)
+        mask = np.zeros(len(values), dtype=bool)
+        if len(self.hashes):
+            mask = self.hashes[np.minimum(positions, len(self.hashes) - 1)] == hashes
+        # verify the first value of each matching hash, and the next ones of the same hash when it differs
+        candidates = np.flatnonzero(mask)
+        candidate_positions = positions[candidates]
+        buffer = self.buffer
+        for i, position, start, end in zip(candidates.tolist(), candidate_positions.tolist(),
+                                           self.offsets[candidate_positions].tolist(),
+                                           self.offsets[candidate_positions + 1].tolist()):
+            encoded = values[i].encode('utf-8')
+            if buffer[start:end] != encoded:
+                mask[i] = self._stored_after(encoded, position)
+        return mask
+
+    def _stored_after(self, encoded: bytes, position: int) -> bool:
+        """Whether the encoded value is stored after position, among the values of the hash at position."""
+        value_hash = self.hashes[position]
+        position += 1
+        while position < len(self.hashes) and self.hashes[position] == value_hash:
+            if self.buffer[int(self.offsets[position]):int(self.offsets[position + 1])] == encoded:
+                return True
+            position += 1
+        return False
+
+
+def _hash_values(values: 'np.ndarray') -> 'np.ndarray':
+    # pandas is only needed by the compact key sets
+    from pandas.util import hash_array
+    return hash_array(values, categorize=False)
+
+
+def _filter_lines_compact(lines, column_index: int, allowed_values: CompactKeySet, write) -> Tuple[int, int]:
+    """
+    Variant of the row loop of limit_csv for a CompactKeySet: the rows are checked by batches of
+    COMPACT_BATCH_ROWS, and the kept lines of a batch written at once. Returns the numbers of rows kept and removed.
+    """
+    rows_kept = 0
+    rows_removed = 0
+    batch_lines: List[bytes] = []
+    batch_values: List[str] = []
+
+    def flush_batch():
+        nonlocal rows_kept, rows_removed
+        kept = list(compress(batch_lines, allowed_values.contains_many(batch_values)))
+        write(b''.join(kept))
+        rows_kept += len(kept)
+        rows_removed += len(batch_lines) - len(kept)
+        batch_lines.clear()
+        batch_values.clear()
+
+    for line in lines:
+        column_value = _key_value(line, column_index)
+        if column_value is _PARSE_ROW:
+            record = [line]
+            row = _parse_row(record, lines)
+            line = b''.join(record)
+            column_value = row[column_index] if len(row) > column_index else None
+
+        if column_value is None:
+            rows_removed += 1
+            continue
+        batch_lines.append(line)
+        batch_values.append(column_value)
+        if len(batch_lines) == COMPACT_BATCH_ROWS:
+            flush_batch()
+
+    if batch_lines:
+        flush_batch()
+    return rows_kept, rows_removed
+
+
+def limit_csv(input_filepath: Path, output_filepath: Path, column_name: str, allowed_values: Container[str],
+              tracker: progress.ProgressTracker = None, discover_limit: Optional[int] = None,
+              use_index: bool = False) -> Optional[Tuple[int, int]]:
     """
     Filters rows based on whether the value in the specified column is present
     in the set of allowed values, and writes the results to an output CSV.
+    allowed_values is a set, or any container such as a HashFraction.
+    The rows are not parsed: the value is read from its byte span in the line, and the kept lines are copied
+    as they are, in blocks. Only the rows the scan cannot split, with a quoted field spanning several lines,
+    go through the csv module.
+    The tracker, when given, follows the bytes of the input file read.
+    With a discover_limit, new values are added to allowed_values (and their rows kept)
+    until it holds discover_limit values, see discover_and_filter.
+    With use_index, a file with a current KeyIndex is filtered by limit_csv_indexed.
+    Returns the numbers of rows kept and removed, or None when the file could not be filtered.
     """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
     input_str = str(input_filepath)
     output_str = str(output_filepath)
 
     try:
+        index = KeyIndex.load(input_filepath, column_name) if use_index else None
+        if index is not None:
+            counts = limit_csv_indexed(input_filepath, output_filepath, index, allowed_values)
+            tracker.advance(input_filepath.stat().st_size)
+            return counts
+
         # Open the input file for reading and the output file for writing
-        with open(input_str, mode='r', newline='', encoding='utf-8') as infile, \
-                open(output_str, mode='w', newline='', encoding='utf-8') as outfile:
+        with open(input_str, mode='rb', buffering=FILTER_BUFFER_SIZE) as infile, \
+                open(output_str, mode='wb', buffering=FILTER_BUFFER_SIZE) as outfile, \
+                tracker.watching(infile):
 
-            reader = csv.reader(infile)
-            writer = csv.writer(outfile)
+            lines = iter(infile)
 
             # Read the header row
-            try:
-                header = next(reader)
-            except StopIteration:
+            header_line = next(lines, None)
+            if header_line is None:
                 return
+            header_record = [header_line]
+            header = _parse_row(header_record, lines)
 
-            writer.writerow(header)
+            outfile.write(b''.join(header_record))
 
             # Find the index of the column to filter on
             try:
@@ -85,32 +508,387 @@ def limit_csv(input_filepath: Path, output_filepath: Path, column_name: str, all
             except ValueError:
                 return  # Should not happen if discovery was successful, but safe to guard
 
-            rows_kept = 0
-            rows_removed = 0
+            write = outfile.write
+            if isinstance(allowed_values, CompactKeySet):
+                rows_kept, rows_removed = _filter_lines_compact(lines, column_index, allowed_values, write)
+            else:
+                rows_kept = 0
+                rows_removed = 0
 
-            # Iterate over the remaining data rows
-            for row in reader:
-                if len(row) > column_index:
-                    column_value = row[column_index]
+                # Iterate over the remaining data rows
+                for line in lines:
+                    column_value = _key_value(line, column_index)
+                    if column_value is _PARSE_ROW:
+                        record = [line]
+                        row = _parse_row(record, lines)
+                        line = b''.join(record)
+                        column_value = row[column_index] if len(row) > column_index else None
 
                     # Check if the column value is in the set of allowed (limited) values
-                    if column_value in allowed_values:
-                        writer.writerow(row)
+                    if column_value is None:
+                        rows_removed += 1
+                    elif column_value in allowed_values:
+                        write(line)
+                        rows_kept += 1
+                    elif discover_limit is not None and len(allowed_values) < discover_limit:
+                        allowed_values.add(column_value)
+                        write(line)
                         rows_kept += 1
                     else:
                         rows_removed += 1
-                else:
-                    rows_removed += 1
 
             # Print shrinkage details
             print(f"  Result: Rows kept: {rows_kept}, Rows removed: {rows_removed}")
             print(f"  Output saved to: {output_filepath.name}")
+            return rows_kept, rows_removed
 
 
     except Exception as e:
         print(f"An unexpected error occurred while filtering {input_filepath.name}: {e}", file=sys.stderr)
 
 
+# Version of the KeyIndex sidecar format, an index of another version is rebuilt
+KEY_INDEX_VERSION = 1
+
+
+def key_index_path(input_filepath: Path, column_name: str) -> Path:
+    """Path of the KeyIndex sidecar of a CSV file for a column, next to the file."""
+    return input_filepath.with_name(f"{input_filepath.name}.{column_name}.keyidx.npz")
+
+
+class KeyIndex:
+    """
+    Byte offsets of the rows of a CSV file for each value of a column, stored as a columnar .npz sidecar
+    (see --index): later runs read the values from it instead of scanning the file, and seek to the rows kept.
+    keys are the distinct values, encoded and sorted; the rows of keys[i] are
+    row_offsets[key_rows[i]:key_rows[i + 1]] (in file order) with their row_lengths in bytes.
+    row_count counts all the data rows, including the ones without the column.
+    """
+
+    def __init__(self, header: bytes, keys: 'np.ndarray', key_rows: 'np.ndarray', row_offsets: 'np.ndarray',
+                 row_lengths: 'np.ndarray', row_count: int):
+        self.header = header
+        self.keys = keys
+        self.key_rows = key_rows
+        self.row_offsets = row_offsets
+        self.row_lengths = row_lengths
+        self.row_count = row_count
+
+    @classmethod
+    def from_rows(cls, header: bytes, key_ids: Dict[str, int], row_keys: array, row_offsets: array,
+                  row_lengths: array, row_count: int) -> 'KeyIndex':
+        """Builds the index of the rows of a scan: row i has the value of id row_keys[i] in key_ids."""
+        import numpy as np
+        keys = np.array([value.encode('utf-8') for value in key_ids], dtype=np.bytes_)
+        key_order = np.argsort(keys, kind='stable')
+        key_ranks = np.empty_like(key_order)
+        key_ranks[key_order] = np.arange(len(key_order))
+
+        row_ranks = key_ranks[np.frombuffer(row_keys, dtype=np.int64)]
+        # stable: the rows of each key stay in file order
+        row_order = np.argsort(row_ranks, kind='stable')
+        key_rows = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ranks, minlength=len(keys)), out=key_rows[1:])
+        return cls(header, keys[key_order], key_rows, np.frombuffer(row_offsets, dtype=np.int64)[row_order],
+                   np.frombuffer(row_lengths, dtype=np.int64)[row_order].astype(np.uint32), row_count)
+
+    def save(self, index_filepath: Path, column_name: str, source_stat: os.stat_result):
+        import numpy as np
+        # written aside and renamed, so that an interrupted build leaves no truncated index
+        temporary_filepath = index_filepath.with_name(index_filepath.name + '.tmp')
+        with open(str(temporary_filepath), 'wb') as f:
+            np.savez(f, version=KEY_INDEX_VERSION, column=column_name, source_size=source_stat.st_size,
+                     source_mtime_ns=source_stat.st_mtime_ns, header=np.frombuffer(self.header, dtype=np.uint8),
+                     keys=self.keys, key_rows=self.key_rows, row_offsets=self.row_offsets,
+                     row_lengths=self.row_lengths, row_count=self.row_count)
+        os.replace(str(temporary_filepath), str(index_filepath))
+
+    @classmethod
+    def load(cls, input_filepath: Path, column_name: str) -> Optional['KeyIndex']:
+        """Loads the index of a file, None when there is none or when the file changed since it was built."""
+        import numpy as np
+        index_filepath = key_index_path(input_filepath, column_name)
+        if not _key_index_current(input_filepath, column_name):
+            return None
+        with np.load(str(index_filepath)) as data:
+            return cls(data['header'].tobytes(), data['keys'], data['key_rows'], data['row_offsets'],
+                       data['row_lengths'], int(data['row_count']))
+
+    def values_in_order(self) -> List[str]:
+        """The values in the order they are first read in the file."""
+        import numpy as np
+        first_offsets = self.row_offsets[self.key_rows[:-1]]
+        return [value.decode('utf-8') for value in self.keys[np.argsort(first_offsets)].tolist()]
+
+    def values(self) -> List[str]:
+        return [value.decode('utf-8') for value in self.keys.tolist()]
+
+    def selected_keys(self, allowed_values: Container[str]) -> 'np.ndarray':
+        """Positions in keys of the allowed values."""
+        import numpy as np
+        if isinstance(allowed_values, CompactKeySet):
+            return np.flatnonzero(allowed_values.contains_many(self.values()))
+        if isinstance(allowed_values, (set, frozenset)) and len(allowed_values) < len(self.keys):
+            # look the allowed values up in the sorted keys
+            allowed = np.array([value.encode('utf-8') for value in allowed_values], dtype=np.bytes_)
+            positions = np.searchsorted(self.keys, allowed)
+            found = positions < len(self.keys)
+            positions = positions[found]
+            return np.unique(positions[self.keys[positions] == allowed[found]])
+        return np.flatnonzero([value in allowed_values for value in self.values()])
+
+
+def _key_index_current(input_filepath: Path, column_name: str) -> bool:
+    """Whether the KeyIndex sidecar of a file exists and was built from the file as it is now."""
+    import numpy as np
+    index_filepath = key_index_path(input_filepath, column_name)
+    if not index_filepath.exists():
+        return False
+    source_stat = os.stat(str(input_filepath))
+    with np.load(str(index_filepath)) as data:
+        return (int(data['version']) == KEY_INDEX_VERSION and str(data['column']) == column_name
+                and int(data['source_size']) == source_stat.st_size
+                and int(data['source_mtime_ns']) == source_stat.st_mtime_ns)
+
+
+def build_key_index(input_filepath: Path, column_name: str, tracker: progress.ProgressTracker = None) -> bool:
+    """
+    Scans a CSV file like limit_csv and saves its KeyIndex for the column next to it.
+    The tracker, when given, follows the bytes of the file read. Returns whether the index was saved.
+    """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
+    key_ids: Dict[str, int] = {}
+    row_keys, row_offsets, row_lengths = array('q'), array('q'), array('q')
+    row_count = 0
+
+    try:
+        source_stat = os.stat(str(input_filepath))
+        with open(str(input_filepath), mode='rb', buffering=FILTER_BUFFER_SIZE) as infile, \
+                tracker.watching(infile):
+            lines = iter(infile)
+
+            header_line = next(lines, None)
+            if header_line is None:
+                return False
+            header_record = [header_line]
+            header = _parse_row(header_record, lines)
+            try:
+                column_index = header.index(column_name)
+            except ValueError:
+                print(f"Warning: Column '{column_name}' not found in {input_filepath.name}. Not indexed.")
+                return False
+
+            offset = sum(map(len, header_record))
+            for line in lines:
+                column_value = _key_value(line, column_index)
+                if column_value is _PARSE_ROW:
+                    record = [line]
+                    row = _parse_row(record, lines)
+                    line = b''.join(record)
+                    column_value = row[column_index] if len(row) > column_index else None
+
+                row_count += 1
+                if column_value is not None:
+                    row_keys.append(key_ids.setdefault(column_value, len(key_ids)))
+                    row_offsets.append(offset)
+                    row_lengths.append(len(line))
+                offset += len(line)
+
+        index = KeyIndex.from_rows(b''.join(header_record), key_ids, row_keys, row_offsets, row_lengths, row_count)
+        index.save(key_index_path(input_filepath, column_name), column_name, source_stat)
+        return True
+
+    except Exception as e:
+        print(f"An unexpected error occurred while indexing {input_filepath.name}: {e}", file=sys.stderr)
+        return False
+
+
+def _build_key_index_in_worker(input_filepath: Path, column_name: str):
+    """Runs build_key_index in a worker process, and returns its messages for the parent to print."""
+    messages = io.StringIO()
+    with redirect_stdout(messages):
+        build_key_index(input_filepath, column_name)
+    return messages.getvalue()
+
+
+def build_key_indexes(csv_files: List[Path], column_name: str, workers: int, input_path: Path,
+                      tracker: progress.ProgressTracker = None):
+    """Builds the KeyIndex of the files, in parallel with more than one worker."""
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
+
+    print("\n--- Indexing Files ---")
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_build_key_index_in_worker, input_file, column_name): input_file
+                       for input_file in sorted(csv_files, key=lambda input_file: -input_file.stat().st_size)}
+            for i, future in enumerate(as_completed(futures), 1):
+                input_file = futures[future]
+                messages = future.result()
+                print(f"[{i}/{len(csv_files)}] Indexed file: {input_file.relative_to(input_path)}")
+                print(messages, end='')
+                tracker.advance(input_file.stat().st_size)
+    else:
+        for i, input_file in enumerate(csv_files, 1):
+            print(f"[{i}/{len(csv_files)}] Indexing file: {input_file.relative_to(input_path)}")
+            build_key_index(input_file, column_name, tracker)
+
+
+def limit_csv_indexed(input_filepath: Path, output_filepath: Path, index: KeyIndex,
+                      allowed_values: Container[str]) -> Tuple[int, int]:
+    """
+    Variant of limit_csv reading the rows of the allowed values with the index of the file: it seeks
+    to the rows kept and copies them, in file order, so the output is the same as the one of limit_csv.
+    Returns the numbers of rows kept and removed.
+    """
+    import numpy as np
+    selected = index.selected_keys(allowed_values)
+    if not len(selected):
+        # none of the rows of the file is kept
+        with open(str(output_filepath), mode='wb') as outfile:
+            outfile.write(index.header)
+        print(f"  Result: Rows kept: 0, Rows removed: {index.row_count}")
+        print(f"  Output saved to: {output_filepath.name}")
+        return 0, index.row_count
+    starts = index.key_rows[selected]
+    counts = index.key_rows[selected + 1] - starts
+    # the positions of the rows of all the selected keys, starts[i] to starts[i] + counts[i]
+    rows = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    offsets = index.row_offsets[rows]
+    order = np.argsort(offsets)
+    offsets = offsets[order]
+    ends = offsets + index.row_lengths[rows][order].astype(np.int64)
+
+    # the consecutive rows are copied together
+    run_starts = np.flatnonzero(np.r_[True, offsets[1:] != ends[:-1]])
+    run_ends = np.r_[run_starts[1:], len(offsets)] - 1
+
+    with open(str(input_filepath), mode='rb') as infile, \
+            open(str(output_filepath), mode='wb', buffering=FILTER_BUFFER_SIZE) as outfile:
+        outfile.write(index.header)
+        for start, end in zip(offsets[run_starts].tolist(), ends[run_ends].tolist()):
+            infile.seek(start)
+            while start < end:
+                block = infile.read(min(end - start, FILTER_BUFFER_SIZE))
+                if not block:
+                    raise ValueError(f"{input_filepath.name} is shorter than its index")
+                outfile.write(block)
+                start += len(block)
+
+    rows_kept = len(offsets)
+    rows_removed = index.row_count - rows_kept
+    print(f"  Result: Rows kept: {rows_kept}, Rows removed: {rows_removed}")
+    print(f"  Output saved to: {output_filepath.name}")
+    return rows_kept, rows_removed
+
+
+def discover_and_filter(tasks: List[Tuple[Path, Path]], column_name: str, limit: int, input_path: Path,
+                        tracker: progress.ProgressTracker = None) -> Tuple[Set[str], List[Optional[Tuple[int, int]]]]:
+    """
+    Single pass variant of discover_unique_values followed by limit_csv: the (input file, output file) tasks read
+    by the discovery are filtered as they are read. Every row read before the limit is reached has one of the
+    final values and is kept, the rows after it are filtered with the then final set, so the output is the same
+    as with the two phases. Returns the allowed values and the limit_csv counts of the files read, the first
+    ones of tasks: only the remaining files need a filtering pass.
+    """
+    allowed_values: Set[str] = set()
+    results = []
+
+    print("\n--- PHASE 1: Discovering Unique Values and Filtering the Files Read ---")
+
+    for i, (input_file, output_file) in enumerate(tasks, 1):
+        if len(allowed_values) >= limit:
+            print(f"Limit of {limit} unique values reached. Stopping discovery.")
+            break
+
+        print(f"[{i}/{len(tasks)}] Discovering and filtering file: {input_file.relative_to(input_path)}")
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        results.append(limit_csv(input_file, output_file, column_name, allowed_values, tracker,
+                                 discover_limit=limit))
+
+    print(f"Discovery complete. Found {len(allowed_values)} unique values to keep.")
+    return allowed_values, results
+
+
+def filter_files(tasks: List[Tuple[Path, Path]], column_name: str, allowed_values: Container[str], workers: int,
+                 input_path: Path, tracker: progress.ProgressTracker = None,
+                 use_index: bool = False) -> List[Optional[Tuple[int, int]]]:
+    """Filters the (input file, output file) tasks with limit_csv, in parallel with more than one worker."""
+    for _, output_file in tasks:
+        # Ensure the subdirectory structure exists in the output path
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    if workers > 1:
+        return filter_files_parallel(tasks, column_name, allowed_values, workers, input_path, tracker, use_index)
+
+    # Iterate over all found CSV files
+    results = []
+    for i, (input_file, output_file) in enumerate(tasks, 1):
+        # Print the progress indicator and the file currently being processed
+        print(f"[{i}/{len(tasks)}] Filtering file: {input_file.relative_to(input_path)}")
+
+        # Call the filtering function
+        results.append(limit_csv(input_file, output_file, column_name, allowed_values, tracker,
+                                 use_index=use_index))
+    return results
+
+
+# Allowed values of a worker process of filter_files_parallel, shipped once per process by its initializer
+_worker_allowed_values: Container[str] = frozenset()
+
+
+def _init_filter_worker(allowed_values: Container[str]):
+    global _worker_allowed_values
+    _worker_allowed_values = allowed_values
+
+
+def _limit_csv_in_worker(input_filepath: Path, output_filepath: Path, column_name: str, use_index: bool):
+    """Runs limit_csv in a worker process, and returns its counts and its messages for the parent to print."""
+    messages = io.StringIO()
+    with redirect_stdout(messages):
+        counts = limit_csv(input_filepath, output_filepath, column_name, _worker_allowed_values,
+                           use_index=use_index)
+    return counts, messages.getvalue()
+
+
+def filter_files_parallel(tasks: List[Tuple[Path, Path]], column_name: str, allowed_values: Container[str],
+                          workers: int, input_path: Path, tracker: progress.ProgressTracker = None,
+                          use_index: bool = False) -> List[Optional[Tuple[int, int]]]:
+    """
+    Filters the (input file, output file) tasks in a pool of worker processes. The allowed values are sent
+    once to each worker by the pool initializer, not with every file. The largest files are started first,
+    so that they do not end the run alone. Returns the limit_csv counts of the files, in completion order.
+    """
+    tracker = tracker or progress.ProgressTracker(None, enabled=False)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_filter_worker,
+                             initargs=(allowed_values,)) as executor:
+        futures = {
+            executor.submit(_limit_csv_in_worker, input_file, output_file, column_name, use_index): input_file
+            for input_file, output_file in sorted(tasks, key=lambda task: -task[0].stat().st_size)}
+        for i, future in enumerate(as_completed(futures), 1):
+            input_file = futures[future]
+            counts, messages = future.result()
+            print(f"[{i}/{len(tasks)}] Filtered file: {input_file.relative_to(input_path)}")
+            print(messages, end='')
+            tracker.advance(input_file.stat().st_size)
+            results.append(counts)
+    return results
+
+
+def print_summary(results: List[Optional[Tuple[int, int]]]):
+    """Prints the kept and removed rows of all the files."""
+    filtered = [counts for counts in results if counts is not None]
+    rows_kept = sum(kept for kept, _ in filtered)
+    rows_removed = sum(removed for _, removed in filtered)
+    total_rows = rows_kept + rows_removed
+
+    print("\n--- SUMMARY ---")
+    print(f"Files filtered: {len(filtered)}/{len(results)}")
+    print(f"Rows kept: {rows_kept}, Rows removed: {rows_removed}"
+          + (f" ({rows_kept / total_rows:.1%} kept)" if total_rows else ""))
+
+
 def main():
     """Parses command line arguments and executes the two-phase filtering."""
     parser = argparse.ArgumentParser(
@@ -137,14 +915,83 @@ def main():
         required=True,
         help="The exact name of the column (header) to limit unique values on."
     )
-    parser.add_argument(
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument(
         '-l', '--limit',
         type=int,
-        required=True,
         help="The maximum number of unique column values (N) to keep."
     )
+    selection.add_argument(
+        '--fraction',
+        type=float,
+        help="Keep the column values whose stable hash falls under this fraction (0 to 1) of the hash range, "
+             "instead of N values: there is no discovery phase, the files are only filtered."
+    )
+    selection.add_argument(
+        '--load_keys',
+        type=str,
+        help="Keep the column values of a key set saved by --save_keys, e.g. from another table sharing them "
+             "under its own column name: there is no discovery phase, the files are only filtered."
+    )
+    parser.add_argument(
+        '--index',
+        action='store_true',
+        help="Use a key index sidecar per file (<file>.<column>.keyidx.npz, the byte offsets of the rows of "
+             "each value), building the missing or outdated ones first: the discovery reads the values from "
+             "the indexes and the filtering seeks to the rows kept, so later runs on the same files do not "
+             "scan them again."
+    )
+    parser.add_argument(
+        '--compact_keys',
+        action='store_true',
+        help="Hold the values to keep as sorted 64-bit hashes verified against the values stored in one buffer, "
+             "instead of a set of strings: much less memory in the filtering processes for limits in the "
+             "millions, with the same output."
+    )
+    parser.add_argument(
+        '--save_keys',
+        type=str,
+        help="Save the discovered values to this file (sorted, one per line, gzip-compressed if it ends "
+             "with .gz), to filter the other tables sharing them with --load_keys."
+    )
+    parser.add_argument(
+        '--sampling',
+        choices=['first', 'hash'],
+        default='first',
+        help="How the N values of --limit are selected: 'first' keeps the first ones read, in sorted file order, "
+             "'hash' the ones of smallest stable hash, the same for every table sharing the column "
+             "(the discovery then runs with --workers processes)."
+    )
+    parser.add_argument(
+        '--no_progress',
+        action='store_true',
+        help="Do not show the progress bars, e.g. in batch runs."
+    )
+    parser.add_argument(
+        '--single_pass',
+        action='store_true',
+        help="Filter the files read by the discovery as they are read: only the files after the discovery "
+             "cutoff are read a second time. The output is the same."
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help="Number of processes filtering the files in parallel in phase 2."
+    )
 
     args = parser.parse_args()
+    if args.fraction is not None and not 0 < args.fraction <= 1:
+        parser.error("--fraction must be in (0, 1]")
+    if args.single_pass and (args.limit is None or args.sampling != 'first'):
+        parser.error("--single_pass only applies to the 'first' sampling of --limit")
+    if args.single_pass and args.index:
+        parser.error("--single_pass does not apply with --index, the discovery reads the indexes")
+    if args.save_keys and args.limit is None:
+        parser.error("--save_keys needs values discovered with --limit")
+    if args.compact_keys and args.fraction is not None:
+        parser.error("--compact_keys does not apply to --fraction, which holds no values")
+    progress.ENABLED = not args.no_progress
 
     # Convert directories to Path objects
     input_path = Path(args.input_dir)
@@ -169,33 +1016,72 @@ def main():
         print(f"No CSV files found in the input directory or its subdirectories: {input_path}")
         return
 
-    total_files = len(csv_files)
+    total_size = sum(input_file.stat().st_size for input_file in csv_files)
 
-    # 3. Discover the allowed set of unique values
-    allowed_set = discover_unique_values(csv_files, args.column, limit)
+    # Construct the output file paths, maintaining the relative directory structure
+    tasks = [(input_file, output_path / input_file.relative_to(input_path)) for input_file in csv_files]
+
+    # 3. Index the files not indexed yet
+    if args.index:
+        to_index = [input_file for input_file in csv_files if not _key_index_current(input_file, args.column)]
+        if to_index:
+            with progress.ProgressTracker("Indexing files...",
+                                          total=sum(input_file.stat().st_size for input_file in to_index)) as tracker:
+                build_key_indexes(to_index, args.column, args.workers, input_path, tracker)
+        else:
+            print("\nAll the files are indexed.")
+
+    # 4. Discover the allowed set of unique values
+    if args.load_keys:
+        print("\nUsing a saved key set: no discovery.")
+        try:
+            allowed_set = load_keys(Path(args.load_keys))
+        except Exception as e:
+            print(f"Error: Could not load the key set '{args.load_keys}': {e}", file=sys.stderr)
+            return
+        results = []
+        remaining_tasks = tasks
+    elif args.fraction is not None:
+        print(f"\nKeeping the values whose hash falls under {args.fraction:.2%} of the hash range: no discovery.")
+        allowed_set = HashFraction(args.fraction)
+        results = []
+        remaining_tasks = tasks
+    elif args.sampling == 'hash':
+        with progress.ProgressTracker("Discovering unique values...", total=total_size) as tracker:
+            allowed_set = discover_bottom_k(csv_files, args.column, limit, args.workers, input_path, tracker,
+                                            args.index)
+        results = []
+        remaining_tasks = tasks
+    elif args.single_pass:
+        with progress.ProgressTracker("Discovering and filtering...", total=total_size) as tracker:
+            allowed_set, results = discover_and_filter(tasks, args.column, limit, input_path, tracker)
+        remaining_tasks = tasks[len(results):]
+    else:
+        with progress.ProgressTracker("Discovering unique values...", total=total_size) as tracker:
+            allowed_set = discover_unique_values(csv_files, args.column, limit, tracker, args.index)
+        results = []
+        remaining_tasks = tasks
 
     if not allowed_set:
         print("No unique values were discovered. Exiting.")
         return
 
-    # 4. Filter and process all CSV files
-    print("\n--- PHASE 2: Applying Filter to Files ---")
+    if args.save_keys:
+        save_keys(Path(args.save_keys), allowed_set)
 
-    # Iterate over all found CSV files
-    for i, input_file in enumerate(csv_files, 1):
-        # Print the progress indicator and the file currently being processed
-        print(f"[{i}/{total_files}] Filtering file: {input_file.relative_to(input_path)}")
+    if args.compact_keys:
+        allowed_set = CompactKeySet(allowed_set)
 
-        # Construct the output file path, maintaining the relative directory structure
-        relative_path = input_file.relative_to(input_path)
-        output_file = output_path / relative_path
+    # 5. Filter and process the CSV files not filtered yet
+    if remaining_tasks:
+        print("\n--- PHASE 2: Applying Filter to Files ---")
 
-        # Ensure the subdirectory structure exists in the output path
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-
-        # Call the filtering function
-        limit_csv(input_file, output_file, args.column, allowed_set)
+        remaining_size = sum(input_file.stat().st_size for input_file, _ in remaining_tasks)
+        with progress.ProgressTracker("Filtering files...", total=remaining_size) as tracker:
+            results += filter_files(remaining_tasks, args.column, allowed_set, args.workers, input_path, tracker,
+                                    args.index)
 
+    print_summary(results)
     print("\nAll files processed successfully.")
 
 
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import lib.synthetic_logs as synthetic_logs
+
+"""
+Throughput benchmark of the log and CSV tools on deterministic synthetic inputs (see lib/synthetic_logs.py).
+Each tool runs in its own process, so that its peak RSS is measured alone.
+
+Example: python benchmark.py --sizes 100MB 1GB 10GB --work_dir /tmp/bench --json results.json
+"""
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+SIZE_UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(size: str) -> int:
+    """Parses '100MB', '1GB', '10GB'... into bytes."""
+    size = size.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * factor)
+    return int(size)
+
+
+def prepare_inputs(work_dir, size_name, size, seed):
+    """Generates the synthetic log and CSV tree of a size once, and returns their statistics."""
+    log_path = os.path.join(work_dir, f"synthetic_{size_name}_{seed}.log")
+    csv_dir = os.path.join(work_dir, f"synthetic_{size_name}_{seed}_csv")
+    stats_path = os.path.join(work_dir, f"synthetic_{size_name}_{seed}.json")
+    if os.path.exists(stats_path):
+        with open(stats_path) as f:
+            return json.load(f)
+
+    print(f"[*] Generating {size_name} of synthetic log and CSV files in {work_dir}...")
+    stats = {
+        'log_path': log_path,
+        'log': synthetic_logs.generate_log(log_path, size, seed=seed),
+        'csv_dir': csv_dir,
+        'csv': synthetic_logs.generate_csv_tree(csv_dir, size, seed=seed),
+    }
+    with open(stats_path, 'w') as f:
+        json.dump(stats, f, indent=2)
+    return stats
+
+
+def python_call(statement):
+    """Command running a statement with the lib package importable."""
+    return [sys.executable, '-c', f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); {statement}"]
+
+
+def benchmark_targets(inputs, work_dir):
+    """Returns the (name, command, input lines, input bytes) of the benchmarked tools."""
+    log_path, log = inputs['log_path'], inputs['log']
+    csv = inputs['csv']
+    mahie = os.path.join(SCRIPTS_DIR, 'mahie')
+    log_input = (log['lines'], log['bytes'])
+    return [
+        ('extract_dlc_operations (text)',
+         python_call(f"import lib.dlc_analytics as dlc; dlc.extract_dlc_operations_from_file({log_path!r})"),
+         *log_input),
+        ('extract_dlc_operations (mmap)',
+         python_call(f"import lib.dlc_analytics as dlc; "
+                     f"dlc.extract_dlc_operations_from_file({log_path!r}, engine='mmap')"),
+         *log_input),
+        ('reduce_log_file',
+         python_call(f"import lib.log_utils as lu; lu.reduce_log_file({log_path!r}, "
+                     f"{os.path.join(work_dir, 'reduced.log')!r}, {log['start_time']!r}, {log['end_time']!r})"),
+         *log_input),
+        ('mahie/cs', [sys.executable, os.path.join(mahie, 'cs'), log_path], *log_input),
+        ('mahie/ts', [sys.executable, os.path.join(mahie, 'ts'), log_path, 'Trades'], *log_input),
+        ('mahie/fl', [sys.executable, os.path.join(mahie, 'fl'), log_path, '1000',
+                      os.path.join(work_dir, 'pivot_blocks.log')], *log_input),
+        ('KeepNKeys.py', [sys.executable, os.path.join(REPO_DIR, 'KeepNKeys.py'), '-d', inputs['csv_dir'],
+                          '-o', os.path.join(work_dir, 'kept_csv'), '-c', 'tradeKey', '-l', '1000'],
+         csv['rows'], csv['bytes']),
+    ]
+
+
+def run_measured(command):
+    """Runs the command and returns its wall time in seconds and its peak RSS in bytes."""
+    # stderr goes to a file, read after the child exits: a full pipe would block a child writing a lot to it
+    with tempfile.TemporaryFile() as stderr_file:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=stderr_file)
+        # wait4 gives the resource usage of this child alone
+        _, status, rusage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode('utf-8', errors='ignore')
+    if process.returncode != 0:
+        raise RuntimeError(f"{command} failed with exit code {process.returncode}: {stderr[-2000:]}")
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    peak_rss = rusage.ru_maxrss if sys.platform == 'darwin' else rusage.ru_maxrss * 1024
+    return elapsed, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the log and CSV tools on synthetic inputs.")
+    parser.add_argument("--sizes", nargs='+', default=["100MB"], help="Input sizes, e.g. 100MB 1GB 10GB.")
+    parser.add_argument("--work_dir", default="benchmark_data", help="Directory of the generated inputs, reused across runs.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic inputs.")
+    parser.add_argument("--only", nargs='+', default=None, help="Benchmark only the tools whose name contains one of these strings.")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = []
+    print(f"{'tool':<32} {'size':>6} {'seconds':>9} {'lines/s':>12} {'MB/s':>9} {'peak RSS MB':>12}")
+    for size_name in args.sizes:
+        inputs = prepare_inputs(args.work_dir, size_name, parse_size(size_name), args.seed)
+        for name, command, lines, size in benchmark_targets(inputs, args.work_dir):
+            if args.only and not any(only in name for only in args.only):
+                continue
+            elapsed, peak_rss = run_measured(command)
+            result = {'tool': name, 'size': size_name, 'seconds': elapsed, 'lines_per_s': lines / elapsed,
+                      'mb_per_s': size / elapsed / 1024 ** 2, 'peak_rss_mb': peak_rss / 1024 ** 2}
+            results.append(result)
+            print(f"{name:<32} {size_name:>6} {elapsed:>9.2f} {result['lines_per_s']:>12,.0f} "
+                  f"{result['mb_per_s']:>9.1f} {result['peak_rss_mb']:>12.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
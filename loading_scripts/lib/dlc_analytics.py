@@ -1,5 +1,31 @@
+import csv
+import gzip
+import heapq
+import mmap
+import os
+import numpy as np
 import pandas as pd
 import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+try:
+    from . import log_consumers
+    from . import log_sources
+    from . import log_utils as lu
+    from . import parse_cache
+    from . import profiling
+    from . import progress
+    from .timestamps import TimestampParser, epoch_ms_to_str
+except ImportError:
+    import log_consumers
+    import log_sources
+    import log_utils as lu
+    import parse_cache
+    import profiling
+    import progress
+    from timestamps import TimestampParser, epoch_ms_to_str
 
 """
 A library for parsing DLC log and establish statistics
@@ -56,167 +82,734 @@ PIVOT_TRANSACTION_ID = 'pivot_transaction_id'
 AP_TRANSACTION_DURATION_MS = 'pivot_transaction_duration_ms'
 AP_COMMIT_DURATION_MS = 'pivot_commit_duration_ms'
 DLC_DURATION_MS = 'dlc_duration_ms'
+# Byte range of the operation in the log, only kept in the parse cache
+START_OFFSET = 'start_offset'
+END_OFFSET = 'end_offset'
+
+# Version of the extraction, part of the parse cache key: bump it whenever the extracted operations change
+PARSER_VERSION = 2
+
+
+# Kinds of the events returned by parse_log_line
+EVENT_LINE = 'line'
+EVENT_DLC_START = 'dlc_start'
+EVENT_DS_COMMIT = 'ds_commit'
+EVENT_DS_START = 'ds_start'
+EVENT_PIVOT_LINK = 'pivot_link'
+EVENT_AP_COMMIT = 'ap_commit'
+EVENT_DLC_FINISH = 'dlc_finish'
+
+
+# Literals contained in every line matched by the corresponding pattern. They are looked up on the raw line
+# (ANSI codes only colour the thread/level/logger prefix) so that the patterns run on candidate lines only.
+DLC_START_LITERAL = 'operation, operation_id='
+DS_TRANSACTION_LITERAL = 'event_type=DatastoreTransaction'
+PIVOT_LINK_LITERAL = 'fired by database transaction'
+AP_COMMIT_LITERAL = 'event_type=ActivePivotTransactionCommittedEvent'
+DLC_FINISH_LITERAL = 'operation, id '
+
+# Module patterns timed by the profiling mode, see profiling.Profiler.instrument_patterns
+PROFILED_PATTERNS = ['ANSI_ESCAPE', 'THREAD_EXTRACTOR', 'DLC_START_EVENT', 'DS_TRANSACTION_COMMIT',
+                     'DS_TRANSACTION_START', 'PIVOT_LINK_EVENT', 'AP_COMMIT_EVENT', 'DLC_FINISH_EVENT',
+                     'BYTES_EVENT_PATTERNS', 'BYTES_ANSI_ESCAPE', 'BYTES_THREAD_EXTRACTOR', 'BYTES_LINE_LOCATORS']
+
+
+def parse_log_line(raw_line, plain_lines=False):
+    """
+    Parses one log line into an event tuple (kind, thread, *fields), or None if the line has no thread prefix.
+    Lines with a thread but no DLC event give (EVENT_LINE, thread) when plain_lines is set, None otherwise.
+    This is the stateless half of the extraction, it can run on any chunk of the log independently.
+    """
+    # Tier 1: cheap literal checks, most lines of a log are irrelevant
+    is_dlc_start = DLC_START_LITERAL in raw_line
+    is_ds_transaction = DS_TRANSACTION_LITERAL in raw_line
+    is_pivot_link = PIVOT_LINK_LITERAL in raw_line
+    is_ap_commit = AP_COMMIT_LITERAL in raw_line
+    is_dlc_finish = DLC_FINISH_LITERAL in raw_line
+    if not (plain_lines or is_dlc_start or is_ds_transaction or is_pivot_link or is_ap_commit or is_dlc_finish):
+        return None
+
+    # Tier 2: thread prefix, on the line stripped of its colours
+    line = raw_line.rstrip('\r\n')
+    clean_line = ANSI_ESCAPE.sub('', line) if '\x1b' in line else line
+
+    thread_match = THREAD_EXTRACTOR.match(clean_line)
+    if not thread_match:
+        return None
+
+    current_thread = thread_match.group(THREAD).strip()
+
+    # Tier 3: full extraction patterns, only on the candidate lines
+    # The line corresponds to the start of a DLC operation
+    if is_dlc_start and (m := DLC_START_EVENT.search(clean_line)):
+        return _event_from_match(EVENT_DLC_START, current_thread, m, clean_line[:23])
+
+    if is_ds_transaction:
+        if m := DS_TRANSACTION_COMMIT.search(clean_line):
+            return _event_from_match(EVENT_DS_COMMIT, current_thread, m, clean_line[:23])
+
+        if m := DS_TRANSACTION_START.search(clean_line):
+            return _event_from_match(EVENT_DS_START, current_thread, m, clean_line[:23])
+
+    if is_pivot_link and (m := PIVOT_LINK_EVENT.search(clean_line)):
+        return _event_from_match(EVENT_PIVOT_LINK, current_thread, m, clean_line[:23])
+
+    if is_ap_commit and (m := AP_COMMIT_EVENT.search(clean_line)):
+        return _event_from_match(EVENT_AP_COMMIT, current_thread, m, clean_line[:23])
+
+    if is_dlc_finish and (m := DLC_FINISH_EVENT.search(clean_line)):
+        return _event_from_match(EVENT_DLC_FINISH, current_thread, m, clean_line[:23])
+
+    return (EVENT_LINE, current_thread) if plain_lines else None
+
+
+def _text(value):
+    """Decodes the groups captured by the bytes patterns, str groups are returned as is."""
+    return value.decode('utf-8', errors='ignore') if isinstance(value, bytes) else value
+
+
+def _event_from_match(kind, thread, m, timestamp):
+    """Builds the event tuple of a match of the pattern of `kind`, on a str or a bytes line."""
+    if kind == EVENT_DLC_START:
+        return (kind, thread, int(m.group('op_id')), _text(m.group('type')), _text(m.group('topic')),
+                _text(m.group('scope')), _text(m.group('locked_stores')), timestamp)
+    if kind == EVENT_DS_COMMIT:
+        return kind, thread, int(m.group('ds_tx_id')), int(m.group('ds_tx_dur')), int(m.group('ds_commit_dur'))
+    if kind == EVENT_DS_START:
+        return kind, thread, int(m.group('ds_tx_id'))
+    if kind == EVENT_PIVOT_LINK:
+        return kind, thread, int(m.group('ap_tx')), int(m.group('ds_tx'))
+    if kind == EVENT_AP_COMMIT:
+        return (kind, thread, int(m.group('ap_tx_id')), _text(m.group('pivots')), int(m.group('ap_tx_dur')),
+                int(m.group('ap_commit_dur')))
+    return kind, thread, timestamp
+
+
+# --- BINARY ENGINE ---
+# bytes versions of the literals and patterns, in the order parse_log_line tries them on a line
+BYTES_EVENT_PATTERNS = [(kind, literal.encode('utf-8'), re.compile(pattern.pattern.encode('utf-8')))
+                        for kind, literal, pattern in [
+                            (EVENT_DLC_START, DLC_START_LITERAL, DLC_START_EVENT),
+                            (EVENT_DS_COMMIT, DS_TRANSACTION_LITERAL, DS_TRANSACTION_COMMIT),
+                            (EVENT_DS_START, DS_TRANSACTION_LITERAL, DS_TRANSACTION_START),
+                            (EVENT_PIVOT_LINK, PIVOT_LINK_LITERAL, PIVOT_LINK_EVENT),
+                            (EVENT_AP_COMMIT, AP_COMMIT_LITERAL, AP_COMMIT_EVENT),
+                            (EVENT_DLC_FINISH, DLC_FINISH_LITERAL, DLC_FINISH_EVENT),
+                        ]]
+BYTES_ANSI_ESCAPE = re.compile(ANSI_ESCAPE.pattern.encode('utf-8'))
+BYTES_THREAD_EXTRACTOR = re.compile(THREAD_EXTRACTOR.pattern.encode('utf-8'))
+# Every literal above contains one of these, they locate the candidate lines in the whole buffer
+BYTES_LINE_LOCATORS = [re.compile(re.escape(locator)) for locator in
+                       [b'operation, ', b'event_type=', PIVOT_LINK_LITERAL.encode('utf-8')]]
+
+
+def _scan_events_mmap(buf, start_offset, end_offset):
+    """
+    Binary counterpart of running parse_log_line on every line of buf[start_offset:end_offset].
+    A few locator patterns run with finditer over the whole range to find the candidate lines, in file order,
+    and the bytes patterns only run on these lines. Only the thread prefix of the event lines is stripped
+    of its ANSI codes, and only the captured groups are decoded.
+    Yields (event, line_offset, line_end) tuples.
+    """
+    def candidate_lines(locator):
+        for m in locator.finditer(buf, start_offset, end_offset):
+            yield buf.rfind(b'\n', start_offset, m.start()) + 1 or start_offset
+
+    last_line_offset = -1
+    for line_offset in heapq.merge(*[candidate_lines(locator) for locator in BYTES_LINE_LOCATORS]):
+        if line_offset == last_line_offset:
+            continue
+        last_line_offset = line_offset
+
+        line_end = buf.find(b'\n', line_offset, end_offset)
+        line_end = end_offset if line_end == -1 else line_end + 1
+        line = buf[line_offset:line_end]
+
+        for kind, literal, pattern in BYTES_EVENT_PATTERNS:
+            if literal in line and (m := pattern.search(line)):
+                break
+        else:
+            continue
+
+        prefix = line[:m.start()]
+        if b'\x1b' in prefix:
+            prefix = BYTES_ANSI_ESCAPE.sub(b'', prefix)
+        thread_match = BYTES_THREAD_EXTRACTOR.match(prefix)
+        if not thread_match:
+            continue
+
+        thread = _text(thread_match.group(THREAD).strip())
+        yield _event_from_match(kind, thread, m, _text(prefix[:23])), line_offset, line_end
+
+
+class DlcOperation:
+    """
+    A DLC operation and the durations of its datastore and ActivePivot transactions.
+    Times are kept as epoch milliseconds (see timestamps.TimestampParser) until the DataFrame is built.
+    """
+    __slots__ = ('thread', 'operation_id', 'operation_type', 'topic', 'scope', 'locked_stores', 'start_ms',
+                 'end_ms', 'pivots', 'ds_transaction_id', 'ds_transaction_duration_ms', 'ds_commit_duration_ms',
+                 'pivot_transaction_id', 'pivot_transaction_duration_ms', 'pivot_commit_duration_ms',
+                 'dlc_duration_ms', 'start_offset', 'end_offset', 'ds_ids', 'ap_ids')
+
+    def __init__(self, thread, operation_id, operation_type, topic, scope, locked_stores, start_ms, start_offset=None):
+        self.thread = thread
+        self.operation_id = operation_id
+        self.operation_type = operation_type
+        self.topic = topic
+        self.scope = scope
+        self.locked_stores = locked_stores
+        self.start_ms = start_ms
+        self.end_ms = None
+        self.pivots = set()
+        self.ds_transaction_id = None
+        self.ds_transaction_duration_ms = 0
+        self.ds_commit_duration_ms = 0
+        self.pivot_transaction_id = None
+        self.pivot_transaction_duration_ms = 0
+        self.pivot_commit_duration_ms = 0
+        self.dlc_duration_ms = None
+        # byte range of the operation in the log, from its start line to the end of its finish line
+        self.start_offset = start_offset
+        self.end_offset = None
+        # ids of the datastore and ActivePivot transactions mapped to the operation by the tracker, once per commit
+        # event still expected: an ActivePivot transaction commits once per schema it was started on
+        self.ds_ids = []
+        self.ap_ids = []
+
+
+def operations_to_frame(operations, with_offsets=False):
+    """
+    Builds the operations DataFrame column by column with compact dtypes: int64 ids and durations
+    (nullable Int64 for the transaction ids), datetime64 times and categorical repeated strings.
+    The pivots of an operation are joined in a sorted, comma separated string.
+    with_offsets adds the byte range columns of the operations.
+    """
+    def category(values):
+        return pd.Categorical(values)
+
+    def times(values):
+        return np.array(values, dtype='int64').astype('datetime64[ms]')
+
+    def integers(values):
+        return np.array(values, dtype='int64')
+
+    frame = pd.DataFrame({
+        THREAD: category([op.thread for op in operations]),
+        OPERATION_ID: integers([op.operation_id for op in operations]),
+        OPERATION_TYPE: category([op.operation_type for op in operations]),
+        TOPIC: category([op.topic for op in operations]),
+        SCOPE: category([op.scope for op in operations]),
+        LOCKED_STORES: category([op.locked_stores for op in operations]),
+        START_TIME: times([op.start_ms for op in operations]),
+        PIVOTS: category([', '.join(sorted(op.pivots)) for op in operations]),
+        DS_TRANSACTION_ID: pd.array([op.ds_transaction_id for op in operations], dtype='Int64'),
+        DS_TRANSACTION_DURATION_MS: integers([op.ds_transaction_duration_ms for op in operations]),
+        DS_COMMIT_DURATION_MS: integers([op.ds_commit_duration_ms for op in operations]),
+        PIVOT_TRANSACTION_ID: pd.array([op.pivot_transaction_id for op in operations], dtype='Int64'),
+        AP_TRANSACTION_DURATION_MS: integers([op.pivot_transaction_duration_ms for op in operations]),
+        AP_COMMIT_DURATION_MS: integers([op.pivot_commit_duration_ms for op in operations]),
+        END_TIME: times([op.end_ms for op in operations]),
+        DLC_DURATION_MS: integers([op.dlc_duration_ms for op in operations]),
+    })
+    if with_offsets:
+        frame[START_OFFSET] = integers([op.start_offset for op in operations])
+        frame[END_OFFSET] = integers([op.end_offset for op in operations])
+    return frame
+
+
+def operation_to_row(op):
+    """Returns the row of a completed DlcOperation, with the columns and the time format of the CSV reports."""
+    return {
+        THREAD: op.thread,
+        OPERATION_ID: op.operation_id,
+        OPERATION_TYPE: op.operation_type,
+        TOPIC: op.topic,
+        SCOPE: op.scope,
+        LOCKED_STORES: op.locked_stores,
+        START_TIME: epoch_ms_to_str(op.start_ms),
+        PIVOTS: ', '.join(sorted(op.pivots)),
+        DS_TRANSACTION_ID: op.ds_transaction_id,
+        DS_TRANSACTION_DURATION_MS: op.ds_transaction_duration_ms,
+        DS_COMMIT_DURATION_MS: op.ds_commit_duration_ms,
+        PIVOT_TRANSACTION_ID: op.pivot_transaction_id,
+        AP_TRANSACTION_DURATION_MS: op.pivot_transaction_duration_ms,
+        AP_COMMIT_DURATION_MS: op.pivot_commit_duration_ms,
+        END_TIME: epoch_ms_to_str(op.end_ms),
+        DLC_DURATION_MS: op.dlc_duration_ms,
+    }
 
 
-def extract_dlc_operations_from_file(input_file, threshold_ms=None, output_log_path=None):
-    # set up data structures to keep dlc operation data and map dlc operations to db and pivot transactions
-
-    # Keeps the current DLC operation state per thread
-    dlc_op_data = {}
-
-    # keeps the mapping from db transaction to dlc operation
-    ds_transaction_to_dlc_op = {}
-
-    # keeps the mapping from pivot transaction to dlc operation
-    pivot_transaction_to_dlc_op = {}
-
-    # List of completed DLC operations
-    completed_ops = []
-
-    last_started_dlc = None
-
-    # if we want to buffer lines for slow operations
-    should_buffer = threshold_ms is not None and output_log_path is not None
-
-    print(f"[*] Opening {input_file}...")
-    with open(input_file, 'r', encoding="utf-8", errors="ignore") as inf:
-        print("[*] Processing log file...")
-        outf = open(output_log_path, 'w', encoding="utf-8") if should_buffer else None
-        try:
-            for raw_line in inf:
-                line = raw_line.rstrip('\n')
-                clean_line = ANSI_ESCAPE.sub('', line)
-
-                thread_match = THREAD_EXTRACTOR.match(clean_line)
-                if not thread_match: continue
-
-                current_thread = thread_match.group(THREAD).strip()
-                # The line corresponds to the start of a DLC operation
-                if m := DLC_START_EVENT.search(clean_line):
-
-                    # save the DLC operation information in the state
-                    dlc_operation_info = {
-                        THREAD: current_thread,
-                        OPERATION_ID: m.group('op_id'),
-                        OPERATION_TYPE: m.group('type'),
-                        TOPIC: m.group('topic'),
-                        SCOPE: m.group('scope'),
-                        LOCKED_STORES: m.group('locked_stores'),
-                        START_TIME: clean_line[:23],
-                        PIVOTS: set(),
-                        DS_TRANSACTION_ID: None,
-                        DS_TRANSACTION_DURATION_MS: 0,
-                        DS_COMMIT_DURATION_MS: 0,
-                        PIVOT_TRANSACTION_ID: None,
-                        AP_TRANSACTION_DURATION_MS: 0,
-                        AP_COMMIT_DURATION_MS: 0,
-                    }
-                    dlc_op_data[current_thread] = dlc_operation_info
-                    last_started_dlc = dlc_operation_info  # Important: used for the next Transaction Start
-                    if should_buffer:
-                        dlc_operation_info['buffered_lines'] = [raw_line + "\n"]
-                    continue
-
-                # 1. Buffer lines if within a DLC operation and buffering is enabled
-                if should_buffer and current_thread in dlc_op_data:
-                    dlc_op_data[current_thread]['buffered_lines'].append(raw_line + "\n")
-
-                # # 2. Check for ID links on ANY thread (Outside the thread-state block)
-                # if m := DB_TRANSACTION_START.search(clean_line):
-                #     db_id = m.group('tx_id')
-                #     # Look for the op on the current thread
-                #     target_op = dlc_op_data.get(current_thread) or last_started_dlc
-                #     if target_op:
-                #         target_op[TRANSACTION_ID] = db_id
-                #         db_transaction_to_dlc_op[db_id] = target_op
-                #     continue
-
-                if m := DS_TRANSACTION_COMMIT.search(clean_line):
-                    ds_id = m.group('ds_tx_id')
-                    if ds_id in ds_transaction_to_dlc_op:
-                        op_to_update = ds_transaction_to_dlc_op[ds_id]
-                        op_to_update[DS_TRANSACTION_ID] = ds_id
-                        op_to_update[DS_TRANSACTION_DURATION_MS] += int(m.group('ds_tx_dur'))
-                        op_to_update[DS_COMMIT_DURATION_MS] += int(m.group('ds_commit_dur'))
-
-                    continue
-
-                # 2. Check for DB txn start (build the DB -> DLC op bridge)
-                if m := DS_TRANSACTION_START.search(clean_line):
-                    db_id = m.group('ds_tx_id')
-                    # target op: use current thread or the last DLC that started (threads differ in your logs)
-                    target_op = dlc_op_data.get(current_thread) or last_started_dlc
-                    if target_op:
-                        # store DB id where the tests expect it
-                        target_op[PIVOT_TRANSACTION_ID] = db_id
-                        ds_transaction_to_dlc_op[db_id] = target_op
-                    continue
-
-                elif m := PIVOT_LINK_EVENT.search(clean_line):
-                    ds_id = m.group('ds_tx')
-                    ap_tx_id = m.group('ap_tx')
-                    if ds_id in ds_transaction_to_dlc_op:
-                        pivot_transaction_to_dlc_op[ap_tx_id] = ds_transaction_to_dlc_op[ds_id]
-
-
-                elif m := AP_COMMIT_EVENT.search(clean_line):
-                    ap_tx_id = m.group('ap_tx_id')
-                    if ap_tx_id in pivot_transaction_to_dlc_op:
-                        op_to_update = pivot_transaction_to_dlc_op[ap_tx_id]
-                        op_to_update[PIVOTS].add(m.group('pivots'))
-                        op_to_update[AP_TRANSACTION_DURATION_MS] += int(m.group('ap_tx_dur'))
-                        op_to_update[AP_COMMIT_DURATION_MS] += int(m.group('ap_commit_dur'))
-
+class CsvOperationWriter:
+    """Writes completed operations to a CSV file one row at a time, as they complete. compression: None or 'gzip'."""
+
+    def __init__(self, output_path, compression=None):
+        self.output_path = output_path
+        self.compression = compression
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        if self.compression == 'gzip':
+            self._file = gzip.open(self.output_path, 'wt', newline='', encoding='utf-8')
+        elif self.compression is None:
+            self._file = open(self.output_path, 'w', newline='', encoding='utf-8')
+        else:
+            raise ValueError(f"Unsupported CSV compression {self.compression}")
+        self._writer = None
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def __call__(self, op):
+        row = operation_to_row(op)
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row))
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+
+class DlcOperationTracker:
+    """
+    Stateful half of the extraction: links the events of parse_log_line to the DLC operations
+    and collects the completed operations. Events must be applied in log order.
+    on_complete is called with each operation as it completes. Without keep_completed, the completed
+    operations are not collected, so memory only holds the operations in progress.
+    """
+
+    def __init__(self, time_format='%Y-%m-%d %H:%M:%S.%f', on_complete=None, keep_completed=True):
+        self.timestamp_parser = TimestampParser(time_format)
+        self.on_complete = on_complete
+        self.keep_completed = keep_completed
+
+        # Keeps the current DLC operation state per thread
+        self.dlc_op_data = {}
+
+        # keeps the mapping from db transaction to dlc operation
+        self.ds_transaction_to_dlc_op = {}
+
+        # keeps the mapping from pivot transaction to dlc operation
+        self.pivot_transaction_to_dlc_op = {}
+
+        # List of completed DLC operations
+        self.completed_ops = []
+
+        self.last_started_dlc = None
+
+    def apply(self, event, line_offset=None, line_end=None):
+        """Applies the event of the line spanning [line_offset, line_end) in the log."""
+        kind, current_thread = event[0], event[1]
+
+        if kind == EVENT_DLC_START:
+            _, _, op_id, op_type, topic, scope, locked_stores, start_time = event
+            # save the DLC operation information in the state
+            dlc_operation = DlcOperation(current_thread, op_id, op_type, topic, scope, locked_stores,
+                                         self.timestamp_parser.to_epoch_ms(start_time), line_offset)
+            self.dlc_op_data[current_thread] = dlc_operation
+            self.last_started_dlc = dlc_operation  # Important: used for the next Transaction Start
+            return
+
+        if kind == EVENT_DS_COMMIT:
+            _, _, ds_id, ds_tx_dur, ds_commit_dur = event
+            if ds_id in self.ds_transaction_to_dlc_op:
+                op_to_update = self.ds_transaction_to_dlc_op[ds_id]
+                op_to_update.ds_transaction_id = ds_id
+                op_to_update.ds_transaction_duration_ms += ds_tx_dur
+                op_to_update.ds_commit_duration_ms += ds_commit_dur
+                self._commit_seen(self.ds_transaction_to_dlc_op, ds_id, op_to_update.ds_ids)
+
+        # 2. Check for DB txn start (build the DB -> DLC op bridge)
+        elif kind == EVENT_DS_START:
+            db_id = event[2]
+            # target op: use current thread or the last DLC that started (threads differ in your logs)
+            target_op = self.dlc_op_data.get(current_thread) or self.last_started_dlc
+            if target_op:
+                # store DB id where the tests expect it
+                target_op.pivot_transaction_id = db_id
+                self.ds_transaction_to_dlc_op[db_id] = target_op
+                target_op.ds_ids.append(db_id)
+
+        elif kind == EVENT_PIVOT_LINK:
+            _, _, ap_tx_id, ds_id = event
+            if ds_id in self.ds_transaction_to_dlc_op:
+                op_to_link = self.ds_transaction_to_dlc_op[ds_id]
+                self.pivot_transaction_to_dlc_op[ap_tx_id] = op_to_link
+                op_to_link.ap_ids.append(ap_tx_id)
+
+        elif kind == EVENT_AP_COMMIT:
+            _, _, ap_tx_id, pivots, ap_tx_dur, ap_commit_dur = event
+            if ap_tx_id in self.pivot_transaction_to_dlc_op:
+                op_to_update = self.pivot_transaction_to_dlc_op[ap_tx_id]
+                op_to_update.pivots.add(pivots)
+                op_to_update.pivot_transaction_duration_ms += ap_tx_dur
+                op_to_update.pivot_commit_duration_ms += ap_commit_dur
+                self._commit_seen(self.pivot_transaction_to_dlc_op, ap_tx_id, op_to_update.ap_ids)
+
+        elif kind == EVENT_DLC_FINISH:
+            op = self.dlc_op_data.pop(current_thread, None)
+            if op:
+                # the bridges of its transactions are kept until their commits, which can be logged after this line
+                op.end_ms = self.timestamp_parser.to_epoch_ms(event[2])
+                op.dlc_duration_ms = op.end_ms - op.start_ms
+                op.end_offset = line_end
+
+                if self.on_complete:
+                    self.on_complete(op)
+                if self.keep_completed:
+                    self.completed_ops.append(op)
+
+    @staticmethod
+    def _commit_seen(transaction_to_dlc_op, transaction_id, transaction_ids):
+        # the bridge is released with the last commit expected for the transaction,
+        # so that memory only holds the transactions in progress
+        if transaction_id in transaction_ids:
+            transaction_ids.remove(transaction_id)
+        if transaction_id not in transaction_ids:
+            del transaction_to_dlc_op[transaction_id]
+
+
+# Names of the parsing engines
+ENGINE_TEXT = 'text'
+ENGINE_MMAP = 'mmap'
+ENGINES = [ENGINE_TEXT, ENGINE_MMAP]
+
+
+def extract_dlc_operations_from_file(input_file, threshold_ms=None, output_log_path=None,
+                                     start_time=None, end_time=None, time_format='%Y-%m-%d %H:%M:%S.%f',
+                                     workers=1, engine=ENGINE_TEXT, cache_dir=None, consumers=None,
+                                     on_operation=None):
+    """
+    Extracts the DLC operations of a log file into a DataFrame.
+    input_file is a path, a glob pattern or a list of them: the files of a rotated log series are read
+    in order (oldest rotation first for a glob) as one stream, gzip/bz2/xz/zstd files are decompressed
+    on the fly, and operations spanning two files are stitched (see log_sources).
+    When start_time and end_time are given, only the lines of that time window are parsed,
+    in the same pass (see log_utils.TimeWindow), so no reduced copy of the log is needed.
+    With workers > 1 the file is parsed in parallel, see _extract_dlc_operations_parallel.
+    The 'mmap' engine scans the memory-mapped file with bytes patterns instead of decoding every line,
+    see _scan_events_mmap. It produces the same operations.
+    Both need a single plain file, other inputs are streamed by the sequential text engine.
+    When threshold_ms and output_log_path are given, the lines of the operations slower than the threshold
+    are copied to output_log_path after the pass, see write_slow_operations.
+    With a cache_dir, the operations are loaded from the parse cache when the same file was already parsed
+    with the same window, and stored there otherwise (see parse_cache).
+    consumers are other analyses fed with the lines of the same pass (see log_consumers). They need every line,
+    so they disable the cache lookup and the parallel and mmap engines; they are finished after the pass.
+    on_operation is called with each operation as it completes, e.g. to maintain the top-N reports
+    (see streaming_stats.SlowestOperations). On a cache hit it is called with the cached rows instead.
+    """
+    paths = log_sources.resolve_log_paths(input_file)
+    seekable = log_sources.is_seekable(paths) and not consumers
+
+    frame = None
+    entry_path = None
+    if cache_dir and not consumers:
+        entry_path = parse_cache.cache_path(cache_dir, paths, PARSER_VERSION, start_time=start_time,
+                                            end_time=end_time, time_format=time_format)
+        with profiling.stage('parse cache'):
+            frame = parse_cache.load_frame(entry_path)
+        if frame is not None:
+            print(f"[*] Loaded {len(frame)} DLC operations from the parse cache {entry_path}")
+            if on_operation:
+                for row in frame.itertuples(index=False):
+                    on_operation(row)
+
+    if frame is None:
+        if not seekable and (workers > 1 or engine != ENGINE_TEXT):
+            print("[!] Compressed or multi-file input, or consumers: parsing it as a single stream "
+                  "with the text engine")
+        with profiling.stage('parse'):
+            if seekable and workers > 1:
+                operations = _extract_dlc_operations_parallel(paths[0], workers, start_time, end_time, time_format,
+                                                              engine, on_operation)
+            elif seekable and engine == ENGINE_MMAP:
+                operations = _extract_dlc_operations_mmap(paths[0], start_time, end_time, time_format,
+                                                          on_operation)
+            else:
+                operations = _extract_dlc_operations(paths, start_time, end_time, time_format, consumers or [],
+                                                     DlcOperationTracker(time_format, on_complete=on_operation))
+        with profiling.stage('operations frame'):
+            frame = operations_to_frame(operations, with_offsets=True)
+        if entry_path:
+            with profiling.stage('parse cache'):
+                parse_cache.save_frame(entry_path, frame)
+
+    if threshold_ms is not None and output_log_path is not None:
+        with profiling.stage('slow operations dump'):
+            write_slow_operations(paths, frame.itertuples(index=False), threshold_ms, output_log_path)
+
+    return frame.drop(columns=[START_OFFSET, END_OFFSET])
+
+
+def stream_dlc_operations(input_file, on_operation, start_time=None, end_time=None,
+                          time_format='%Y-%m-%d %H:%M:%S.%f', consumers=None, threshold_ms=None,
+                          output_log_path=None):
+    """
+    Streaming counterpart of extract_dlc_operations_from_file: calls on_operation(op) with each DlcOperation
+    as soon as it completes, and keeps no completed operation, so memory does not grow with their number.
+    Aggregates are maintained by the callback, see streaming_stats.
+    When threshold_ms and output_log_path are given, only the operations slower than the threshold are kept,
+    and their lines are copied to output_log_path after the pass, see write_slow_operations.
+    """
+    paths = log_sources.resolve_log_paths(input_file)
+    slow_operations = None
+    if threshold_ms is not None and output_log_path is not None:
+        slow_operations = []
+
+        def on_complete(op):
+            on_operation(op)
+            if op.dlc_duration_ms >= threshold_ms:
+                slow_operations.append(op)
+    else:
+        on_complete = on_operation
+
+    tracker = DlcOperationTracker(time_format, on_complete=on_complete, keep_completed=False)
+    with profiling.stage('parse'):
+        _extract_dlc_operations(paths, start_time, end_time, time_format, consumers or [], tracker)
+
+    if slow_operations is not None:
+        with profiling.stage('slow operations dump'):
+            write_slow_operations(paths, slow_operations, threshold_ms, output_log_path)
+
+
+def _extract_dlc_operations(paths, start_time=None, end_time=None, time_format='%Y-%m-%d %H:%M:%S.%f',
+                            consumers=(), tracker=None):
+    """
+    Parses the files of the series as one stream of lines. Line offsets are offsets in the concatenated
+    decompressed stream, and the tracker state carries over from one file to the next.
+    The lines of the time window are also handed to the consumers.
+    """
+    window = lu.TimeWindow(start_time, end_time, time_format) if start_time and end_time else None
+    tracker = tracker or DlcOperationTracker(time_format)
+
+    print(f"[*] Opening {', '.join(paths)}...")
+    print("[*] Processing log file...")
+    line_end = 0
+    try:
+        with progress.ProgressTracker("Parsing log file...", total=lambda: log_sources.disk_size(paths)) as read_progress:
+            for raw_bytes in profiling.counted(log_sources.iter_log_lines(paths, progress=read_progress), 'log'):
+                line_offset = line_end
+                line_end += len(raw_bytes)
+                raw_line = raw_bytes.decode('utf-8', errors='ignore')
+
+                if window and not window.admit(raw_line):
+                    if window.finished:
+                        break
                     continue
 
-                elif m := DLC_FINISH_EVENT.search(clean_line):
+                if consumers:
+                    log_consumers.feed_consumers(consumers, raw_line)
 
-                    op = dlc_op_data.pop(current_thread, None)
+                event = parse_log_line(raw_line)
+                if event:
+                    tracker.apply(event, line_offset, line_end)
 
-                    if op:
+    except Exception as e:
+        print(f"[!] Error processing log file: {e}")
+    finally:
+        for consumer in consumers:
+            consumer.finish()
 
-                        # Clean up bridge
+    return tracker.completed_ops
 
-                        tx_id = op.get(PIVOT_TRANSACTION_ID)
 
-                        if tx_id in ds_transaction_to_dlc_op: del ds_transaction_to_dlc_op[tx_id]
+def _window_byte_range(f, start_time, end_time, time_format):
+    """
+    Returns the byte range of the binary file f to parse: the lines the TimeWindow of the sequential pass admits,
+    found by a scan of the timestamps (see log_utils.scan_time_window_offsets), so that the engines parse
+    the same lines also when the log has out-of-order timestamps.
+    """
+    file_size = os.fstat(f.fileno()).st_size
+    if start_time and end_time:
+        return lu.scan_time_window_offsets(f, file_size, datetime.strptime(start_time, time_format),
+                                           datetime.strptime(end_time, time_format), time_format)
+    return 0, file_size
 
-                        op[END_TIME] = clean_line[:23]
 
-                        # Fix math: Total seconds * 1000 to get ms
+def _extract_dlc_operations_mmap(input_file, start_time=None, end_time=None, time_format='%Y-%m-%d %H:%M:%S.%f',
+                                 on_operation=None):
+    tracker = DlcOperationTracker(time_format, on_complete=on_operation)
 
-                        duration = (pd.to_datetime(op[END_TIME]) - pd.to_datetime(
-                            op[START_TIME])).total_seconds() * 1000
-
-                        op[DLC_DURATION_MS] = duration
-
-                        if should_buffer and duration >= threshold_ms:
-                            outf.write(f"\n---- SLOW DLC OP: {op[OPERATION_ID]} ({duration:.2f}ms) ----\n")
-                            outf.writelines(op.get('buffered_lines', []))
+    print(f"[*] Opening {input_file}...")
+    with open(input_file, 'rb') as inf:
+        start_offset, end_offset = _window_byte_range(inf, start_time, end_time, time_format)
+        if end_offset <= start_offset:
+            return tracker.completed_ops
+
+        print("[*] Processing log file (mmap)...")
+        profiling.record_input('log', size=end_offset - start_offset)
+        with mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as buf, \
+                progress.ProgressTracker("Scanning log file...", total=end_offset - start_offset) as scan_progress:
+            try:
+                for event, line_offset, line_end in _scan_events_mmap(buf, start_offset, end_offset):
+                    scan_progress.position = line_end - start_offset
+                    tracker.apply(event, line_offset, line_end)
+            except Exception as e:
+                print(f"[!] Error processing log file: {e}")
+
+    return tracker.completed_ops
+
+
+def write_slow_operations(input_file, operations, threshold_ms, output_log_path):
+    """
+    Copies the log lines of the operations lasting at least threshold_ms to output_log_path.
+    The operations are DlcOperation records or rows with the same attributes.
+    Only the byte range of each slow operation is read back from the input file, and its lines are kept
+    when they come from the thread of the operation, so memory does not grow with the length of the operations.
+    Compressed or multi-file inputs cannot be seeked: they are streamed again and the lines of the slow
+    operations are collected in that pass, see _collect_slow_operation_lines.
+    """
+    paths = log_sources.resolve_log_paths(input_file)
+    slow_operations = [op for op in operations if op.dlc_duration_ms >= threshold_ms]
+    print(f"[*] Writing the lines of {len(slow_operations)} slow DLC operations to {output_log_path}...")
+
+    seekable = log_sources.is_seekable(paths)
+    collected_lines = None if seekable else _collect_slow_operation_lines(paths, slow_operations)
+    with open(paths[0] if seekable else os.devnull, 'rb') as inf, open(output_log_path, 'wb') as outf:
+        for i, op in enumerate(slow_operations):
+            outf.write(f"\n---- SLOW DLC OP: {op.operation_id} ({op.dlc_duration_ms:.2f}ms) ----\n".encode('utf-8'))
+            if collected_lines is not None:
+                outf.writelines(collected_lines[i])
+                continue
+
+            inf.seek(op.start_offset)
+            remaining = op.end_offset - op.start_offset
+            while remaining > 0:
+                raw_bytes = inf.readline()
+                if not raw_bytes:
+                    break
+                remaining -= len(raw_bytes)
+                if _is_line_of_thread(raw_bytes, op.thread):
+                    outf.write(raw_bytes)
+
+
+def _is_line_of_thread(raw_bytes, thread):
+    event = parse_log_line(raw_bytes.decode('utf-8', errors='ignore'), plain_lines=True)
+    return event is not None and event[1] == thread
+
+
+def _collect_slow_operation_lines(paths, slow_operations):
+    """
+    Streams the series once and returns, for each slow operation, the lines of its thread within its byte range.
+    Only the lines of the slow operations are held in memory.
+    """
+    collected_lines = [[] for _ in slow_operations]
+    pending = sorted(range(len(slow_operations)), key=lambda i: slow_operations[i].start_offset, reverse=True)
+    active = []
+    if not pending:
+        return collected_lines
+
+    line_end = 0
+    with progress.ProgressTracker("Collecting slow operation lines...",
+                                  total=lambda: log_sources.disk_size(paths)) as lines_progress:
+        lines = log_sources.iter_log_lines(paths, progress=lines_progress)
+        for raw_bytes in profiling.counted(lines, 'log (slow operations pass)'):
+            line_offset = line_end
+            line_end += len(raw_bytes)
+            while pending and slow_operations[pending[-1]].start_offset <= line_offset:
+                active.append(pending.pop())
+            if not active:
+                if not pending:
+                    break
+                continue
+
+            active = [i for i in active if slow_operations[i].end_offset > line_offset]
+            event = parse_log_line(raw_bytes.decode('utf-8', errors='ignore'), plain_lines=True)
+            if event:
+                for i in active:
+                    if slow_operations[i].thread == event[1]:
+                        collected_lines[i].append(raw_bytes)
+    return collected_lines
+
+
+# Number of chunks given to each worker, so that a slow chunk does not hold up the others
+CHUNKS_PER_WORKER = 4
+
+
+def _split_into_chunks(f, start_offset, end_offset, n_chunks):
+    """Splits the [start_offset, end_offset) byte range of a binary file into chunks aligned on line starts."""
+    boundaries = [start_offset]
+    step = max(1, (end_offset - start_offset) // n_chunks)
+    for i in range(1, n_chunks):
+        f.seek(start_offset + i * step - 1)
+        f.readline()
+        boundary = min(f.tell(), end_offset)
+        if boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    if end_offset > boundaries[-1]:
+        boundaries.append(end_offset)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _parse_chunk(input_file, start_offset, end_offset, engine=ENGINE_TEXT):
+    """
+    Worker side of the parallel extraction: returns the DLC events of one chunk of the file in order,
+    as (event, line_offset, line_end) tuples.
+    """
+    events = []
+    with open(input_file, 'rb') as inf:
+        if engine == ENGINE_MMAP:
+            with mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return list(_scan_events_mmap(buf, start_offset, end_offset))
+
+        inf.seek(start_offset)
+        line_end = start_offset
+        for raw_bytes in inf:
+            line_offset = line_end
+            line_end += len(raw_bytes)
+            event = parse_log_line(raw_bytes.decode('utf-8', errors='ignore'))
+            if event:
+                events.append((event, line_offset, line_end))
+            if line_end >= end_offset:
+                break
+    return events
+
+
+def _extract_dlc_operations_parallel(input_file, workers, start_time=None, end_time=None,
+                                     time_format='%Y-%m-%d %H:%M:%S.%f', engine=ENGINE_TEXT, on_operation=None):
+    """
+    Parses byte-range chunks of the file in a process pool. Each worker turns its chunk into a list of events
+    (the partial state of the chunk), and the events are replayed in file order through a single
+    DlcOperationTracker, so operations and transactions spanning several chunks are stitched exactly as
+    in the sequential pass. The time window is located like in the sequential pass, see _window_byte_range.
+    """
+    print(f"[*] Opening {input_file}...")
+    with open(input_file, 'rb') as inf:
+        start_offset, end_offset = _window_byte_range(inf, start_time, end_time, time_format)
+        chunks = _split_into_chunks(inf, start_offset, end_offset, workers * CHUNKS_PER_WORKER)
+    profiling.record_input('log', size=end_offset - start_offset)
 
-                        completed_ops.append(op)  # This was missing
+    print(f"[*] Processing log file in {len(chunks)} chunks with {workers} workers...")
+    tracker = DlcOperationTracker(time_format=time_format, on_complete=on_operation)
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            progress.ProgressTracker("Parsing log file...", total=end_offset - start_offset) as chunks_progress:
+        chunk_events = executor.map(_parse_chunk, repeat(input_file), *zip(*chunks), repeat(engine)) \
+            if chunks else []
+        for (chunk_start, chunk_end), events in zip(chunks, chunk_events):
+            for event, line_offset, line_end in events:
+                tracker.apply(event, line_offset, line_end)
+            chunks_progress.advance(chunk_end - chunk_start)
 
-                    continue
+    return tracker.completed_ops
 
-        except Exception as e:
-            print(f"[!] Error processing log file: {e}")
-        finally:
-            if outf:
-                outf.close()
 
-    return pd.DataFrame(completed_ops)
+"""Generates DLC stats from the DLC operations DataFrame."""
 
 
-"""Generates DLC stats from the DLC operations DataFrame."""
+def _with_dlc_durations(dlc_df):
+    """Returns the frame with its DLC durations, computed from the times only when the column is missing."""
+    if DLC_DURATION_MS in dlc_df:
+        return dlc_df
+    durations = (pd.to_datetime(dlc_df[END_TIME]) - pd.to_datetime(dlc_df[START_TIME])).dt.total_seconds() * 1000
+    return dlc_df.assign(**{DLC_DURATION_MS: durations})
 
 
 def compute_dlc_stats(dlc_df):
     if dlc_df.empty:
         return "No data available"
     else:
-        dlc_df[START_TIME] = pd.to_datetime(dlc_df[START_TIME])
-        dlc_df[END_TIME] = pd.to_datetime(dlc_df[END_TIME])
-        dlc_df[DLC_DURATION_MS] = (dlc_df[END_TIME] - dlc_df[START_TIME]).dt.total_seconds() * 1000
+        dlc_df = _with_dlc_durations(dlc_df)
 
         metrics = {
             DLC_DURATION_MS: 'DCL operation duration',
@@ -236,27 +829,23 @@ def compute_dlc_stats(dlc_df):
         return pd.DataFrame(stats_list)
 
 
-def get_n_slowest_operations(dlc_df, n=5):
-    # copy the input data frame
-    dlc_df = dlc_df.copy()
-
-    dlc_df[START_TIME] = pd.to_datetime(dlc_df[START_TIME])
-    dlc_df[END_TIME] = pd.to_datetime(dlc_df[END_TIME])
+# Top-N reports: report name -> (metric ranked, columns reported)
+SLOWEST_REPORTS = {
+    'slowest_dlc_operations': (DLC_DURATION_MS, [OPERATION_ID, OPERATION_TYPE, DLC_DURATION_MS, PIVOT_TRANSACTION_ID]),
+    'slowest_transactions': (AP_TRANSACTION_DURATION_MS,
+                             [PIVOT_TRANSACTION_ID, AP_TRANSACTION_DURATION_MS, OPERATION_ID, LOCKED_STORES]),
+    'slowest_commits': (AP_COMMIT_DURATION_MS, [PIVOT_TRANSACTION_ID, AP_COMMIT_DURATION_MS, OPERATION_ID, LOCKED_STORES]),
+}
 
-    dlc_df[DLC_DURATION_MS] = (dlc_df[END_TIME] - dlc_df[START_TIME]).dt.total_seconds() * 1000
-    slowest_dlc = dlc_df.nlargest(n, DLC_DURATION_MS)[
-        [OPERATION_ID, OPERATION_TYPE, DLC_DURATION_MS, PIVOT_TRANSACTION_ID]]
-    exploded_df = dlc_df.explode(PIVOTS)
-    slowest_transactions = dlc_df.nlargest(n, AP_TRANSACTION_DURATION_MS)[
-        [PIVOT_TRANSACTION_ID, AP_TRANSACTION_DURATION_MS, OPERATION_ID, LOCKED_STORES]]
-    slowest_commits = dlc_df.nlargest(n, AP_COMMIT_DURATION_MS)[
-        [PIVOT_TRANSACTION_ID, AP_COMMIT_DURATION_MS, OPERATION_ID, LOCKED_STORES]]
 
-    return {
-        'slowest_dlc_operations': slowest_dlc,
-        'slowest_transactions': slowest_transactions,
-        'slowest_commits': slowest_commits
-    }
+def get_n_slowest_operations(dlc_df, n=5):
+    """
+    Top-N reports of a complete operations DataFrame. During a parse, streaming_stats.SlowestOperations
+    maintains the same reports without a frame.
+    """
+    dlc_df = _with_dlc_durations(dlc_df)
+    return {report_name: dlc_df.nlargest(n, metric)[columns]
+            for report_name, (metric, columns) in SLOWEST_REPORTS.items()}
 
 
 def save_dlc_stats_to_csv(dlc_stats, output_file):
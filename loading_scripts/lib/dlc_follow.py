@@ -0,0 +1,175 @@
+import csv
+import os
+import pickle
+import time
+
+try:
+    from . import dlc_analytics as dlc
+except ImportError:
+    import dlc_analytics as dlc
+
+"""
+Live analysis of a log file the server is still writing to: tails the file, feeds the new lines to a
+DlcOperationTracker and reports every DLC operation as soon as it finishes.
+"""
+
+# Minimum delay between two saves of the follow state, to keep the overhead low at peak log rates
+STATE_SAVE_INTERVAL_S = 1.0
+# Finished operations reported at once, so that a long backlog is reported while it is being read
+REPORT_BATCH_OPS = 1000
+
+
+class CsvOperationAppender:
+    """Appends completed operations to a CSV file, writing the header only when the file is new."""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+
+    def __call__(self, op):
+        row = dlc.operation_to_row(op)
+        is_new = not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0
+        with open(self.output_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            if is_new:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+class FollowState:
+    """What a restart needs to resume: the file being followed, how far it was read and the tracker state."""
+
+    def __init__(self, input_file, inode, offset, tracker):
+        self.input_file = input_file
+        self.inode = inode
+        self.offset = offset
+        self.tracker = tracker
+
+    @staticmethod
+    def load(state_path):
+        if not state_path or not os.path.exists(state_path):
+            return None
+        with open(state_path, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, state_path):
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, state_path)
+
+
+def follow_dlc_operations(input_file, on_operation, state_path=None, time_format='%Y-%m-%d %H:%M:%S.%f',
+                          poll_interval_s=0.2, should_stop=None):
+    """
+    Tails input_file and calls on_operation(op) with each DlcOperation as soon as its finish line is written.
+    Only complete lines are parsed, a line still being written is read again at the next poll.
+    With a state_path, the offset and the tracker state are persisted so that a restart resumes where
+    the previous run stopped, without rereading the file. The state is saved before the finished operations
+    are reported, so that a crash never reports an operation twice. A truncated file (copytruncate) is read again
+    from its start, a rotated file (new inode at the same path) is followed from the start of the new file.
+    Runs until should_stop() returns True, or until interrupted.
+    """
+    input_file = os.path.abspath(input_file)
+    state = FollowState.load(state_path)
+    if state is None or state.input_file != input_file:
+        state = FollowState(input_file, None, 0, dlc.DlcOperationTracker(time_format))
+    else:
+        print(f"[*] Resuming {input_file} at offset {state.offset}")
+
+    last_save = time.monotonic()
+    inf = None
+    try:
+        while should_stop is None or not should_stop():
+            if inf is None or _was_rotated(input_file, inf):
+                if inf:
+                    # finish the lines written to the rotated file before switching to the new one
+                    while _read_new_lines(inf, state):
+                        _report_operations(state, state_path, on_operation)
+                    inf.close()
+                inf = _reopen(input_file, state)
+                if inf is None:
+                    time.sleep(poll_interval_s)
+                    continue
+
+            if os.fstat(inf.fileno()).st_size < state.offset:
+                print(f"[!] {input_file} was truncated, reading it from the start")
+                state.offset = 0
+
+            progressed = _read_new_lines(inf, state)
+
+            if _report_operations(state, state_path, on_operation):
+                last_save = time.monotonic()
+            elif state_path and progressed and time.monotonic() - last_save >= STATE_SAVE_INTERVAL_S:
+                state.save(state_path)
+                last_save = time.monotonic()
+            if not progressed:
+                time.sleep(poll_interval_s)
+    except KeyboardInterrupt:
+        print("[*] Stopped following")
+    finally:
+        if inf:
+            inf.close()
+        if state_path:
+            state.save(state_path)
+
+
+def _was_rotated(input_file, inf):
+    try:
+        return os.stat(input_file).st_ino != os.fstat(inf.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _reopen(input_file, state):
+    """Opens the followed file, from the saved offset if it is the same file, from its start otherwise."""
+    try:
+        new_inf = open(input_file, 'rb')
+    except FileNotFoundError:
+        return None
+
+    inode = os.fstat(new_inf.fileno()).st_ino
+    if state.inode is not None and state.inode != inode:
+        print(f"[*] {input_file} was rotated, following the new file")
+        state.offset = 0
+    state.inode = inode
+    return new_inf
+
+
+def _read_new_lines(inf, state):
+    """
+    Parses the complete lines written after state.offset, the tracker collects the operations they finish.
+    Stops after REPORT_BATCH_OPS finished operations, the next call reads on from state.offset.
+    """
+    inf.seek(state.offset)
+    progressed = False
+    tracker = state.tracker
+    for raw_bytes in inf:
+        if not raw_bytes.endswith(b'\n'):
+            # partial line, the writer has not finished it yet
+            break
+        line_offset = state.offset
+        state.offset += len(raw_bytes)
+        progressed = True
+
+        event = dlc.parse_log_line(raw_bytes.decode('utf-8', errors='ignore'))
+        if event:
+            tracker.apply(event, line_offset, state.offset)
+            if len(tracker.completed_ops) >= REPORT_BATCH_OPS:
+                break
+    return progressed
+
+
+def _report_operations(state, state_path, on_operation):
+    """
+    Reports the operations finished since the last call, after saving the state without them: a crash while
+    reporting loses these operations rather than appending them again on restart. Returns True if it saved.
+    """
+    operations = state.tracker.completed_ops
+    if not operations:
+        return False
+    state.tracker.completed_ops = []
+    if state_path:
+        state.save(state_path)
+    for op in operations:
+        on_operation(op)
+    return bool(state_path)
@@ -0,0 +1,298 @@
+import re
+from collections import defaultdict
+from statistics import mean
+
+try:
+    from . import log_sources
+except ImportError:
+    import log_sources
+
+"""
+Analyses fed by the shared parse pass of dlc_analytics, instead of each re-reading the log:
+pivot commit stats (formerly mahie/cs), datastore transaction stats per store (mahie/ts)
+and the dump of the slow pivot blocks (mahie/fl).
+
+A consumer declares the literals its lines contain: it only receives the lines containing one of them,
+as the raw line and the line stripped of its ANSI colours, which is computed once for all the consumers.
+A consumer whose patterns ignore the case sets ignore_case and declares lowercase literals: they are looked up
+in the lowercased line, also computed once.
+"""
+
+ANSI_ESCAPE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+
+
+def feed_consumers(consumers, raw_line):
+    """Hands the line to the consumers interested in it."""
+    clean_line = None
+    lower_line = None
+    for consumer in consumers:
+        line = raw_line
+        if consumer.ignore_case:
+            if lower_line is None:
+                lower_line = raw_line.lower()
+            line = lower_line
+        for literal in consumer.literals:
+            if literal in line:
+                if clean_line is None:
+                    clean_line = ANSI_ESCAPE.sub("", raw_line) if '\x1b' in raw_line else raw_line
+                consumer.consume(raw_line, clean_line)
+                break
+
+
+def run_consumers(input_file, consumers):
+    """Runs the consumers alone on a log file or log series, without extracting the DLC operations."""
+    try:
+        for raw_bytes in log_sources.iter_log_lines(log_sources.resolve_log_paths(input_file)):
+            feed_consumers(consumers, raw_bytes.decode('utf-8', errors='ignore'))
+    finally:
+        for consumer in consumers:
+            consumer.finish()
+
+
+def _print_stats(values, label, indent=""):
+    print(f"\n{indent}{label}")
+    print(f"{indent}{'-' * len(label)}")
+    print(f"{indent}Count   : {len(values)}")
+    print(f"{indent}Min     : {min(values)} ms")
+    print(f"{indent}Max     : {max(values)} ms")
+    print(f"{indent}Average : {int(mean(values))} ms")
+
+
+class PivotCommitStats:
+    """Total, transaction and commit duration stats of the ActivePivot commits, grouped by pivot."""
+
+    literals = ('total_duration=',)
+    ignore_case = False
+
+    COMMIT_PATTERN = re.compile(
+        r"Pivots\s*=\s*\[(.*?)\].*?"
+        r"total_duration=(\d+)ms,\s*"
+        r"transaction_duration=(\d+)ms,\s*"
+        r"commit_duration=(\d+)ms"
+    )
+
+    def __init__(self, top_k=5):
+        self.top_k = top_k
+        # pivot_data[pivot] = list of {"total_duration", "transaction_duration", "commit_duration"}
+        self.pivot_data = defaultdict(list)
+
+    def consume(self, raw_line, clean_line):
+        match = self.COMMIT_PATTERN.search(clean_line)
+        if not match:
+            return
+
+        entry = {
+            "total_duration": int(match.group(2)),
+            "transaction_duration": int(match.group(3)),
+            "commit_duration": int(match.group(4)),
+        }
+        for pivot in match.group(1).split(","):
+            self.pivot_data[pivot.strip()].append(entry)
+
+    def finish(self):
+        pass
+
+    def report(self):
+        if not self.pivot_data:
+            print("No ActivePivot transaction events found.")
+            return
+
+        for pivot, entries in sorted(self.pivot_data.items()):
+            print(f"\nPivot: {pivot}")
+            print("=" * (7 + len(pivot)))
+
+            _print_stats([e["total_duration"] for e in entries], "Total Duration Stats", indent="  ")
+            _print_stats([e["transaction_duration"] for e in entries], "Transaction Duration Stats", indent="  ")
+            _print_stats([e["commit_duration"] for e in entries], "Commit Duration Stats", indent="  ")
+
+            self._print_top_k(entries, "total_duration")
+            self._print_top_k(entries, "commit_duration")
+
+    def _print_top_k(self, entries, key):
+        top = sorted(entries, key=lambda x: x[key], reverse=True)[:self.top_k]
+        print(f"\n  Top {self.top_k} by {key}")
+        print(f"  {'-' * (10 + len(key))}")
+        for i, e in enumerate(top, 1):
+            print(f"  {i:>2}. {key}={e[key]}ms "
+                  f"(total={e['total_duration']}ms)")
+
+
+class StoreTransactionStats:
+    """Transaction and commit duration stats of the datastore transactions touching one of the given stores."""
+
+    literals = ('Transaction Started', 'Transaction Committed')
+    ignore_case = False
+
+    START_PATTERN = re.compile(
+        r"Transaction Started\s+transaction_id=(\d+).*?on_stores=\[(.*?)\]"
+    )
+
+    COMMIT_PATTERN = re.compile(
+        r"Transaction Committed\s+transaction_id=(\d+).*?"
+        r"transaction_duration=(\d+)ms\s+commit_duration=(\d+)ms"
+    )
+
+    def __init__(self, stores, top_k=12):
+        self.stores = set(stores)
+        self.top_k = top_k
+        self.transactions = defaultdict(dict)
+
+    def consume(self, raw_line, clean_line):
+        start_match = self.START_PATTERN.search(clean_line)
+        if start_match:
+            self.transactions[start_match.group(1)]["stores"] = {s.strip() for s in start_match.group(2).split(",")}
+            return
+
+        commit_match = self.COMMIT_PATTERN.search(clean_line)
+        if commit_match:
+            transaction = self.transactions[commit_match.group(1)]
+            transaction["transaction_duration"] = int(commit_match.group(2))
+            transaction["commit_duration"] = int(commit_match.group(3))
+
+    def finish(self):
+        pass
+
+    def matching_transactions(self):
+        """Returns the (transaction id, data) of the complete transactions on at least one of the stores."""
+        return [(tx_id, data) for tx_id, data in self.transactions.items()
+                if "stores" in data and "transaction_duration" in data and "commit_duration" in data
+                and data["stores"] & self.stores]
+
+    def report(self):
+        filtered = self.matching_transactions()
+        if not filtered:
+            print("No matching transactions found.")
+            return
+
+        _print_stats([d["transaction_duration"] for _, d in filtered], "Transaction Duration Stats")
+        _print_stats([d["commit_duration"] for _, d in filtered], "Commit Duration Stats")
+
+        self._print_top_k(filtered, "transaction_duration")
+        self._print_top_k(filtered, "commit_duration")
+
+    def _print_top_k(self, transactions, key):
+        print(f"\nTop {self.top_k} transactions by {key}")
+        print("-" * (28 + len(key)))
+        top = sorted(transactions, key=lambda x: x[1][key], reverse=True)[:self.top_k]
+        for tx_id, data in top:
+            print(
+                f"tx_id={tx_id} {key}={data[key]}ms "
+                f"stores={sorted(data['stores'])}"
+            )
+
+
+class SlowPivotBlockFilter:
+    """
+    Writes to output_file the DLC transactions with at least one pivot block (from the ActivePivot transaction
+    start to its commit event) whose commit lasted threshold_ms or more: the DLC start line, the slow pivot
+    blocks and the datastore commit line closing the transaction.
+    Its patterns ignore the case, like the ones of the original filter.
+    """
+
+    literals = ('[dlc, transaction] starting ', 'activepivottransactionstartedevent',
+                'activepivottransactioncommittedevent', 'committed on cube dimensions',
+                'committed on aggregate providers', 'hierarchy transaction times',
+                'event_type=datastoretransactioncommitted')
+    ignore_case = True
+
+    DLC_START = re.compile(r"\[dlc, transaction\] Starting (LOAD|UNLOAD)", re.IGNORECASE)
+    PIVOT_START = re.compile(r"ActivePivotTransactionStartedEvent", re.IGNORECASE)
+    PIVOT_END = re.compile(r"ActivePivotTransactionCommittedEvent", re.IGNORECASE)
+    PIVOT_ANY = re.compile(
+        r"(committed on cube dimensions|committed on aggregate providers|Hierarchy transaction times)",
+        re.IGNORECASE
+    )
+    DATASTORE_COMMIT = re.compile(r"event_type=DatastoreTransactionCommitted", re.IGNORECASE)
+    COMMIT_DURATION = re.compile(r"commit_duration=([0-9,]+)ms")
+
+    def __init__(self, threshold_ms, output_file, debug=False):
+        self.threshold_ms = threshold_ms
+        self.output_file = output_file
+        self.debug = debug
+        self.written_transactions = 0
+        self._out = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self.in_transaction = False
+        self.in_pivot_block = False
+        self.dlc_start_line = None
+        self.pivot_block = []
+        self.valid_pivot_blocks = []
+
+    def _log(self, msg):
+        if self.debug:
+            print(msg)
+
+    def consume(self, raw_line, clean_line):
+        line = raw_line.rstrip("\n") + "\n"
+
+        # DLC start
+        if self.DLC_START.search(clean_line):
+            self._reset_state()
+            self.in_transaction = True
+            self.dlc_start_line = line
+            self._log("[DEBUG] DLC start detected")
+            return
+
+        if not self.in_transaction:
+            return
+
+        # Pivot block start
+        if self.PIVOT_START.search(clean_line):
+            self.in_pivot_block = True
+            self.pivot_block = [line]
+            self._log("[DEBUG] Pivot block started")
+            return
+
+        # Pivot block lines inside block
+        if self.in_pivot_block and self.PIVOT_ANY.search(clean_line):
+            self.pivot_block.append(line)
+            return
+
+        # Pivot block end
+        if self.PIVOT_END.search(clean_line) and self.in_pivot_block:
+            self._log("[DEBUG] pivot commit detected")
+            self.pivot_block.append(line)
+            m = self.COMMIT_DURATION.search(clean_line)
+            if m:
+                duration = int(m.group(1).replace(",", ""))
+                if duration >= self.threshold_ms:
+                    self.valid_pivot_blocks.append(self.pivot_block)
+                    self._log(f"[DEBUG] Pivot block passed threshold: {duration}ms")
+                else:
+                    self._log(f"[DEBUG] Pivot block below threshold: {duration}ms")
+            self.in_pivot_block = False
+            self.pivot_block = []
+            return
+
+        # Datastore commit
+        if self.DATASTORE_COMMIT.search(clean_line):
+            self._log("[DEBUG] Datastore commit detected")
+            if self.valid_pivot_blocks and self.dlc_start_line:
+                self._write_transaction(line)
+                self._log(f"[DEBUG] Transaction written with {len(self.valid_pivot_blocks)} pivot block(s)")
+            else:
+                self._log("[DEBUG] Transaction dropped (no pivot block passed threshold)")
+            self._reset_state()
+
+    def _write_transaction(self, datastore_commit_line):
+        if self._out is None:
+            self._out = open(self.output_file, "w")
+        self._out.write("\n==================== TRANSACTION ====================\n")
+        self._out.write(self.dlc_start_line)
+        for block in self.valid_pivot_blocks:
+            self._out.writelines(block)
+        self._out.write(datastore_commit_line)
+        self._out.write("=====================================================\n\n")
+        self.written_transactions += 1
+
+    def finish(self):
+        if self._out is None:
+            # like the original filter, an empty output file is still written
+            self._out = open(self.output_file, "w")
+        self._out.close()
+
+    def report(self):
+        print(f"{self.written_transactions} transactions with pivot commits of at least {self.threshold_ms}ms "
+              f"written to {self.output_file}")
@@ -0,0 +1,188 @@
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import queue
+import re
+import threading
+from contextlib import contextmanager
+
+"""
+Reading of log series: one or several log files, plain or compressed (gzip, bz2, xz, zstd),
+streamed in order as one sequence of lines, without decompressing them to disk first.
+"""
+
+# Magic bytes at the start of the compressed files
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')
+
+# Size hint of the batches of lines read ahead by the prefetch thread, and number of batches queued
+PREFETCH_BATCH_SIZE = 1024 * 1024
+PREFETCH_QUEUE_BATCHES = 8
+
+ROTATION_INDEX = re.compile(r'\.(\d+)$')
+
+
+def resolve_log_paths(inputs) -> list:
+    """
+    Returns the ordered list of files of a log series given as a path, a glob pattern or a list of them.
+    The files matched by a glob are ordered oldest rotation first ('nohup.out.2.gz', 'nohup.out.1.gz',
+    'nohup.out'); files without a rotation index are ordered by name. Lists keep the order given.
+    """
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+
+    paths = []
+    for entry in inputs:
+        entry = os.fspath(entry)
+        if glob.has_magic(entry):
+            matches = sorted(glob.glob(entry), key=_rotation_order)
+            if not matches:
+                raise FileNotFoundError(f"No log file matches {entry}")
+            paths.extend(matches)
+        else:
+            paths.append(entry)
+    return paths
+
+
+def _rotation_order(path):
+    name = os.path.basename(path)
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    m = ROTATION_INDEX.search(name)
+    # the higher the rotation index the older the file, the live file has none
+    return (-int(m.group(1)) if m else 0), path
+
+
+def compression_of(path) -> str:
+    """Returns the compression of the file from its magic bytes: 'gzip', 'bz2', 'xz', 'zstd', or None when plain."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+@contextmanager
+def open_log(path):
+    """Opens a plain or compressed log file for reading its decompressed bytes."""
+    with _open_log(path) as (stream, _):
+        yield stream
+
+
+@contextmanager
+def _open_log(path):
+    """
+    Yields the decompressed stream of the file and the file on disk, whose offset is the number of bytes
+    of the file read so far, compressed or not: the progress of the read.
+    """
+    compression = compression_of(path)
+    with open(path, 'rb') as raw:
+        if compression == 'gzip':
+            stream = gzip.GzipFile(fileobj=raw, mode='rb')
+        elif compression == 'bz2':
+            stream = bz2.BZ2File(raw, 'rb')
+        elif compression == 'xz':
+            stream = lzma.LZMAFile(raw, 'rb')
+        elif compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError(f"{path} is zstd compressed, install the 'zstandard' package to read it")
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=False, read_across_frames=True)
+            # buffered for readline support
+            stream = io.BufferedReader(reader)
+        else:
+            yield raw, raw
+            return
+        with stream:
+            yield stream, raw
+
+
+def is_seekable(paths) -> bool:
+    """True when the series is a single plain file, whose byte offsets can be seeked, bisected and memory-mapped."""
+    return len(paths) == 1 and compression_of(paths[0]) is None
+
+
+def disk_size(paths):
+    """Total size of the files of the series on disk, the total of the read progress of iter_log_lines."""
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def iter_log_lines(paths, prefetch=True, progress=None):
+    """
+    Yields the raw lines (bytes, with their line ending) of the files in order, as one stream.
+    The last line of a file ending without a newline is given one, except in the last file of the series:
+    lines never span two files, also in the copies of the lines written by the reducer.
+    The byte offsets of the lines in the concatenated stream are the running sum of their lengths.
+    With prefetch, a background thread reads and decompresses the next batches of lines while
+    the caller parses the current one.
+    The position of progress (see progress.ProgressTracker) is set to the bytes of the files read from disk
+    after each batch of lines, out of disk_size(paths).
+    """
+    if not prefetch:
+        for batch in _read_batches(paths, progress):
+            yield from batch
+        return
+
+    batches = queue.Queue(maxsize=PREFETCH_QUEUE_BATCHES)
+    stop = threading.Event()
+    reader = threading.Thread(target=_prefetch, args=(paths, batches, stop, progress), daemon=True)
+    reader.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            yield from batch
+    finally:
+        # the consumer may stop early, e.g. at the end of a time window
+        stop.set()
+        while reader.is_alive():
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                reader.join(0.05)
+
+
+def _read_batches(paths, progress=None, stop=None):
+    """Yields the lines of the files by batches of about PREFETCH_BATCH_SIZE bytes."""
+    read_files_size = 0
+    for i, path in enumerate(paths):
+        with _open_log(path) as (f, raw):
+            while not (stop and stop.is_set()):
+                batch = f.readlines(PREFETCH_BATCH_SIZE)
+                if not batch:
+                    break
+                # only the last line of a file can lack its newline
+                if not batch[-1].endswith(b'\n') and i < len(paths) - 1:
+                    batch[-1] += b'\n'
+                if progress is not None:
+                    progress.position = read_files_size + raw.tell()
+                yield batch
+            # the whole file was read
+            read_files_size += raw.tell()
+        if stop and stop.is_set():
+            return
+
+
+def _prefetch(paths, batches, stop, progress=None):
+    try:
+        for batch in _read_batches(paths, progress, stop):
+            batches.put(batch)
+        if not stop.is_set():
+            batches.put(None)
+    except BaseException as e:
+        batches.put(e)
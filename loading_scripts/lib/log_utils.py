@@ -1,7 +1,18 @@
+import mmap
 import os
 import re
-from datetime import datetime, timedelta
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
+from datetime import datetime
+
+try:
+    from . import log_sources
+    from . import profiling
+    from . import progress
+    from .timestamps import TimestampParser, datetime_to_epoch_ms, epoch_ms_to_str
+except ImportError:
+    import log_sources
+    import profiling
+    import progress
+    from timestamps import TimestampParser, datetime_to_epoch_ms, epoch_ms_to_str
 
 
 def build_time_format_matcher(time_format: str):
@@ -18,63 +29,208 @@ def build_time_format_matcher(time_format: str):
     return re.compile(pattern)
 
 
-def reduce_log_file(input_path: str, output_path: str, start_time: str, end_time: str,
-                    time_format='%Y-%m-%d %H:%M:%S.%f'):
+class TimeWindow:
+    """
+    Streaming filter keeping the log lines between start_time and end_time.
+    Lines without a timestamp follow the last timestamped line: they are dropped before the window
+    and kept inside it. Once a timestamp after end_time is seen, `finished` is set and the caller can stop reading.
+    """
+
+    def __init__(self, start_time: str, end_time: str, time_format='%Y-%m-%d %H:%M:%S.%f'):
+        self.start_ms = datetime_to_epoch_ms(datetime.strptime(start_time, time_format))
+        self.end_ms = datetime_to_epoch_ms(datetime.strptime(end_time, time_format))
+        self.time_format_matcher = build_time_format_matcher(time_format)
+        self.timestamp_parser = TimestampParser(time_format)
+        self.is_within_range = False
+        self.finished = False
+
+    def admit(self, line: str) -> bool:
+        """Returns True if the line belongs to the window."""
+        line_matched_time = self.time_format_matcher.match(line)
+        if line_matched_time:
+            try:
+                log_ms = self.timestamp_parser.to_epoch_ms(line_matched_time.group(1))
+            except ValueError:
+                return self.is_within_range
+            if log_ms > self.end_ms:
+                self.finished = True
+                return False
+            if not self.is_within_range and log_ms >= self.start_ms:
+                self.is_within_range = True
+        return self.is_within_range
+
+
+# Upper bound on the bytes scanned after a probe offset while looking for the next timestamped line
+SEEK_RESYNC_LIMIT = 4 * 1024 * 1024
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _next_timestamped_line(f, offset: int, time_format_matcher, timestamp_parser: TimestampParser):
+    """
+    Resyncs on the first line starting at or after `offset` and returns (line_offset, epoch ms)
+    of the first timestamped line found from there, or (None, None) if none is found.
+    """
+    if offset > 0:
+        # skip the (possibly partial) line that contains the byte just before offset
+        f.seek(offset - 1)
+        f.readline()
+    else:
+        f.seek(0)
+
+    line_offset = f.tell()
+    scanned = 0
+    while scanned < SEEK_RESYNC_LIMIT:
+        line = f.readline()
+        if not line:
+            break
+        line_matched_time = time_format_matcher.match(line[:64].decode('utf-8', errors='ignore'))
+        if line_matched_time:
+            try:
+                return line_offset, timestamp_parser.to_epoch_ms(line_matched_time.group(1))
+            except ValueError:
+                pass
+        line_offset += len(line)
+        scanned += len(line)
+    return None, None
+
+
+def find_time_offset(f, file_size: int, is_reached, time_format_matcher, timestamp_parser: TimestampParser) -> int:
+    """
+    Bisects a binary log file opened in `f` and returns the offset of the first timestamped line
+    whose epoch ms satisfies `is_reached`, or `file_size` when no such line exists.
+    `is_reached` must be monotonic over the file, which holds for time-ordered logs.
+    """
+    lo, hi = 0, file_size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_offset, log_ms = _next_timestamped_line(f, mid, time_format_matcher, timestamp_parser)
+        if line_offset is None or is_reached(log_ms):
+            hi = mid
+        else:
+            # the answer lies after the line we just read
+            lo = line_offset + 1
+
+    line_offset, _ = _next_timestamped_line(f, lo, time_format_matcher, timestamp_parser)
+    return file_size if line_offset is None else line_offset
+
+
+def find_time_window_offsets(f, file_size: int, start_dt: datetime, end_dt: datetime, time_format: str):
+    """Returns the [start, end) byte range of the lines between start_dt and end_dt."""
+    time_format_matcher = build_time_format_matcher(time_format)
+    timestamp_parser = TimestampParser(time_format)
+    start_ms = datetime_to_epoch_ms(start_dt)
+    end_ms = datetime_to_epoch_ms(end_dt)
+    start_offset = find_time_offset(f, file_size, lambda log_ms: log_ms >= start_ms, time_format_matcher,
+                                    timestamp_parser)
+    end_offset = find_time_offset(f, file_size, lambda log_ms: log_ms > end_ms, time_format_matcher,
+                                  timestamp_parser)
+    return start_offset, max(start_offset, end_offset)
+
+
+def scan_time_window_offsets(f, file_size: int, start_dt: datetime, end_dt: datetime, time_format: str):
+    """
+    Returns the [start, end) byte range of the lines TimeWindow admits, by a linear scan of the timestamps
+    at the start of the lines: the first timestamp between start_dt and end_dt starts the range, the first
+    one after end_dt ends it. Unlike find_time_window_offsets, it holds for logs with out-of-order lines.
+    The timestamps are fixed-width and naive, so they are compared as bytes to the bounds in the same layout,
+    and only the ones deciding a bound are parsed, to skip the invalid ones like TimeWindow does.
+    """
+    if file_size == 0:
+        return 0, 0
+    timestamp_parser = TimestampParser(time_format)
+    separator = timestamp_parser.separator.encode()
+    start_ms = datetime_to_epoch_ms(start_dt)
+    end_ms = datetime_to_epoch_ms(end_dt)
+    start_bound = epoch_ms_to_str(start_ms).encode().replace(b'.', separator)
+    end_bound = epoch_ms_to_str(end_ms).encode().replace(b'.', separator)
+
+    def is_valid(timestamp):
+        try:
+            timestamp_parser.to_epoch_ms(timestamp.decode('ascii'))
+            return True
+        except ValueError:
+            return False
+
+    pattern = re.compile(build_time_format_matcher(time_format).pattern.encode(), re.MULTILINE)
+    start_offset = None
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        for line_matched_time in pattern.finditer(buf, 0, file_size):
+            timestamp = line_matched_time.group(1)
+            if timestamp > end_bound:
+                if is_valid(timestamp):
+                    end_offset = line_matched_time.start()
+                    return (end_offset if start_offset is None else start_offset), end_offset
+            elif start_offset is None and timestamp >= start_bound and is_valid(timestamp):
+                start_offset = line_matched_time.start()
+    return (file_size if start_offset is None else start_offset), file_size
+
+
+def reduce_log_file(input_path, output_path: str, start_time: str, end_time: str,
+                    time_format='%Y-%m-%d %H:%M:%S.%f', seek=False):
     """Reduce a log file to only include lines between start_time and end_time.
 
     Args:
-        input_path (str): Path to the input log file.
+        input_path: Path, glob pattern or list of paths of the input log files.
         output_path (str): Path to the output reduced log file.
         start_time (str): Start time in 'YYYY-MM-DD HH:MM:SS,mmm' format.
         end_time (str): End time in 'YYYY-MM-DD HH:MM:SS,mmm' format.
         :param end_time: the time to which we want to stop adding the logs to the output file
         :param start_time: the time to which we want to start adding the logs to the output file
-        :param input_path: the path of the file we want to reduce
+        :param input_path: the log file, or the files of a rotated log series, plain or compressed.
+            They are read in order as one stream (see log_sources.iter_log_lines)
         :param output_path: the path of the reduced file
         :param time_format: the format of the timestamps in the log file
+        :param seek: bisect the file to find the window instead of scanning it line by line.
+            Assumes the timestamps are ordered, and copies the byte range without decoding it.
+            Only a single plain file can be bisected, other inputs are scanned.
     """
+    paths = log_sources.resolve_log_paths(input_path)
+    if seek:
+        if log_sources.is_seekable(paths):
+            _reduce_log_file_by_seek(paths[0], output_path, start_time, end_time, time_format)
+            return
+        print("[!] Compressed or multi-file input cannot be bisected, scanning it instead")
 
-    start_dt = datetime.strptime(start_time, time_format)
-    end_dt = datetime.strptime(end_time, time_format)
-    is_within_range = False
+    window = TimeWindow(start_time, end_time, time_format)
     kept_lines = 0
-    time_format_matcher = build_time_format_matcher(time_format)
 
-    # set up progress bar
-    file_size = os.path.getsize(input_path)
-    with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-    ) as progress:
-        progress.console.print(
-            f"Reducing log file from {input_path} to {output_path} between {start_time} and {end_time}...")
-
-        task = progress.add_task("Reducing log file...", total=file_size)
-        log_dt = start_dt - timedelta(seconds=1)  # Initialize to a time before start_dt
-        with open(input_path, 'r', encoding="utf-8", errors="ignore") as inf, \
-                open(output_path, 'w', encoding="utf-8") as outf:
-            for line in inf:
-                progress.update(task, advance=len(line.encode('utf-8')))
-                line_matched_time = time_format_matcher.match(line)
-                if line_matched_time:
-                    try:
-                        log_dt = datetime.strptime(line_matched_time.group(1), time_format)
-                    except ValueError as e:
-                        if is_within_range:
-                            outf.write(line)
-                            kept_lines += 1
-                        continue
-                    if log_dt > end_dt:
-                        progress.console.print(f"[bold red] Reached end time {end_time}. Stopping log reduction.")
-                        break
-                    if not is_within_range and log_dt >= start_dt:
-                        is_within_range = True
-
-                if is_within_range:
-                    outf.write(line)
+    # the progress is the bytes read from disk, compressed or not, published by iter_log_lines per batch of lines
+    with progress.ProgressTracker("Reducing log file...", total=lambda: log_sources.disk_size(paths)) as tracker:
+        tracker.print(
+            f"Reducing log file from {', '.join(paths)} to {output_path} between {start_time} and {end_time}...")
+
+        with open(output_path, 'wb') as outf:
+            for raw_bytes in profiling.counted(log_sources.iter_log_lines(paths, progress=tracker), 'log (reduce)'):
+                if window.admit(raw_bytes.decode('utf-8', errors='ignore')):
+                    outf.write(raw_bytes)
                     kept_lines += 1
-        progress.console.print("[bold green] Log reduction completed. keeped ", kept_lines, " lines and saved to ",
-                               output_path)
+                elif window.finished:
+                    tracker.print(f"[bold red] Reached end time {end_time}. Stopping log reduction.")
+                    break
+        tracker.print("[bold green] Log reduction completed. keeped ", kept_lines, " lines and saved to ",
+                      output_path)
+
+
+def _reduce_log_file_by_seek(input_path: str, output_path: str, start_time: str, end_time: str, time_format: str):
+    start_dt = datetime.strptime(start_time, time_format)
+    end_dt = datetime.strptime(end_time, time_format)
+    file_size = os.path.getsize(input_path)
+
+    with open(input_path, 'rb') as inf, open(output_path, 'wb') as outf:
+        start_offset, end_offset = find_time_window_offsets(inf, file_size, start_dt, end_dt, time_format)
+        with progress.ProgressTracker("Copying log window...", total=end_offset - start_offset) as tracker:
+            tracker.print(f"Reducing log file from {input_path} to {output_path} between {start_time} and {end_time} "
+                          f"(seek mode)...")
+
+            inf.seek(start_offset)
+            remaining = end_offset - start_offset
+            while remaining > 0:
+                chunk = inf.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                outf.write(chunk)
+                remaining -= len(chunk)
+                tracker.advance(len(chunk))
+
+            tracker.print("[bold green] Log reduction completed. keeped ", end_offset - start_offset,
+                          " bytes and saved to ", output_path)
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+"""
+A cache of the DLC operations extracted from a log file, so that reruns on the same log skip the parse.
+Entries are Parquet files keyed by a fingerprint of the input file, the parser version and the parse parameters.
+"""
+
+# Bytes hashed at the head and at the tail of the input file
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+
+def fingerprint(input_file: str) -> dict:
+    """
+    Identifies the content of a file without reading it whole: absolute path, size, modification time
+    and a hash of its first and last bytes.
+    """
+    stat = os.stat(input_file)
+    digest = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+        if stat.st_size > FINGERPRINT_SAMPLE_SIZE:
+            f.seek(max(FINGERPRINT_SAMPLE_SIZE, stat.st_size - FINGERPRINT_SAMPLE_SIZE))
+            digest.update(f.read())
+    return {
+        'path': os.path.abspath(input_file),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sample_sha256': digest.hexdigest(),
+    }
+
+
+def cache_path(cache_dir: str, input_files, parser_version, **parameters) -> str:
+    """
+    Returns the path of the cache entry of the input file, or ordered list of files of a log series,
+    parsed with the given parser version and parameters.
+    """
+    if isinstance(input_files, str):
+        input_files = [input_files]
+    key = {'input': [fingerprint(input_file) for input_file in input_files], 'parser_version': parser_version,
+           'parameters': parameters}
+    key_hash = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(input_files[-1])}.{key_hash[:32]}.parquet")
+
+
+def load_frame(path: str):
+    """Returns the cached frame, or None when there is no valid entry at path."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"[!] Ignoring unreadable cache entry {path}: {e}")
+        return None
+
+
+def save_frame(path: str, frame: pd.DataFrame):
+    """Writes the frame to the cache, atomically so that an interrupted run leaves no partial entry."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except ImportError as e:
+        print(f"[!] Parse results are not cached, Parquet support is missing: {e}")
+    except OSError as e:
+        print(f"[!] Could not write the cache entry {path}: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
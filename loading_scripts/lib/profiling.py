@@ -0,0 +1,278 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+"""
+Profiling of the log analysis (the --profile mode of main.py): wall time of the stages, calls, hits and time
+of the hot path patterns and functions, lines and bytes read, and peak memory.
+
+The library marks its stages with profiling.stage(name) and its line streams with profiling.counted(lines, name).
+Both are no-ops until a Profiler is started, and the patterns and functions are only wrapped by
+Profiler.instrument_patterns/instrument_calls while it runs, so the parse pays nothing when profiling is off.
+Worker processes of the parallel parse are not accounted for.
+"""
+
+_NO_STAGE = nullcontext()
+_active_profiler = None
+
+
+def stage(name):
+    """Context manager timing the stage `name` when a profiler is running."""
+    return _active_profiler.stage(name) if _active_profiler else _NO_STAGE
+
+
+def counted(lines, name):
+    """Returns the lines (bytes or str) of the input `name`, counted when a profiler is running."""
+    return _active_profiler.counted(lines, name) if _active_profiler else lines
+
+
+def record_input(name, lines=None, size=0):
+    """Accounts for an input read without iterating its lines, e.g. a memory-mapped range."""
+    if _active_profiler:
+        _active_profiler.add_input(name, lines, size)
+
+
+def peak_rss_bytes():
+    """Peak resident memory of the process so far, None when unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class CallStats:
+    """Calls, hits (None when the calls have no outcome) and cumulated seconds of a pattern or function."""
+
+    __slots__ = ('calls', 'hits', 'seconds')
+
+    def __init__(self, with_hits):
+        self.calls = 0
+        self.hits = 0 if with_hits else None
+        self.seconds = 0.0
+
+
+class _TimedPattern:
+    """Stand-in of a compiled pattern counting and timing its search/match/sub/finditer calls."""
+
+    __slots__ = ('_pattern', '_stats')
+
+    def __init__(self, pattern, stats):
+        self._pattern = pattern
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._pattern, name)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        stats = self._stats
+        stats.seconds += time.perf_counter() - start
+        stats.calls += 1
+        if result is not None:
+            stats.hits += 1
+        return result
+
+    def search(self, *args):
+        return self._timed(self._pattern.search, *args)
+
+    def match(self, *args):
+        return self._timed(self._pattern.match, *args)
+
+    def sub(self, repl, string, *args):
+        start = time.perf_counter()
+        result = self._pattern.sub(repl, string, *args)
+        stats = self._stats
+        stats.seconds += time.perf_counter() - start
+        stats.calls += 1
+        if result != string:
+            stats.hits += 1
+        return result
+
+    def finditer(self, *args):
+        """One call per scan, one hit per match."""
+        stats = self._stats
+        stats.calls += 1
+        matches = self._pattern.finditer(*args)
+        while True:
+            start = time.perf_counter()
+            m = next(matches, None)
+            stats.seconds += time.perf_counter() - start
+            if m is None:
+                return
+            stats.hits += 1
+            yield m
+
+
+class Profiler:
+    """
+    Collects the profile of a run, between start() and stop() (or as a context manager).
+    Stages can nest, e.g. the parse within the extraction: the time of a stage includes its nested stages.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.calls = {}
+        self.inputs = {}
+        self.started_at = None
+        self.seconds = None
+        self._restore = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        global _active_profiler
+        self.started_at = time.perf_counter()
+        _active_profiler = self
+        return self
+
+    def stop(self):
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+        for owner, attribute, original in reversed(self._restore):
+            setattr(owner, attribute, original)
+        self._restore = []
+        self.seconds = time.perf_counter() - self.started_at
+
+    @contextmanager
+    def stage(self, name):
+        # registered on entry, so that the stages are listed in the order they start
+        stats = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'peak_rss_bytes': None})
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats['calls'] += 1
+            stats['seconds'] += time.perf_counter() - start
+            stats['peak_rss_bytes'] = peak_rss_bytes()
+
+    def counted(self, lines, name):
+        stats = self._input_stats(name)
+        try:
+            for line in lines:
+                stats['lines'] += 1
+                stats['bytes'] += len(line)
+                yield line
+        finally:
+            # also when the reader stops early, e.g. at the end of the time window
+            if hasattr(lines, 'close'):
+                lines.close()
+
+    def add_input(self, name, lines=None, size=0):
+        stats = self._input_stats(name)
+        stats['bytes'] += size
+        if lines is None:
+            stats['lines'] = None
+        elif stats['lines'] is not None:
+            stats['lines'] += lines
+
+    def _input_stats(self, name):
+        return self.inputs.setdefault(name, {'lines': 0, 'bytes': 0})
+
+    def instrument_patterns(self, module, names):
+        """
+        Replaces the compiled patterns module.<name> by timed stand-ins until stop(). A name can also refer to
+        a list of patterns or of tuples holding a pattern, like dlc_analytics.BYTES_EVENT_PATTERNS.
+        """
+        for name in names:
+            original = getattr(module, name)
+            self._restore.append((module, name, original))
+            setattr(module, name, self._timed_patterns(original, name))
+
+    def _timed_patterns(self, value, name):
+        if isinstance(value, list):
+            return [self._timed_patterns(item, f"{name}[{item[0] if isinstance(item, tuple) else i}]")
+                    for i, item in enumerate(value)]
+        if isinstance(value, tuple):
+            return tuple(self._timed_patterns(item, name) for item in value)
+        if hasattr(value, 'finditer'):
+            return _TimedPattern(value, self.calls.setdefault(name, CallStats(with_hits=True)))
+        return value
+
+    def instrument_calls(self, owner, attribute, name=None):
+        """Replaces the function owner.<attribute> (a module function or a method) by a timed wrapper until stop()."""
+        original = getattr(owner, attribute)
+        stats = self.calls.setdefault(name or f"{getattr(owner, '__name__', owner)}.{attribute}",
+                                      CallStats(with_hits=False))
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                stats.seconds += time.perf_counter() - start
+                stats.calls += 1
+
+        self._restore.append((owner, attribute, original))
+        setattr(owner, attribute, timed)
+
+    def stages_frame(self):
+        return pd.DataFrame([{
+            'Stage': name,
+            'Calls': stats['calls'],
+            'Seconds': round(stats['seconds'], 3),
+            'Peak RSS (MB)': _megabytes(stats['peak_rss_bytes']),
+        } for name, stats in self.stages.items()])
+
+    def calls_frame(self):
+        """The patterns and functions called, most time consuming first."""
+        frame = pd.DataFrame([{
+            'Pattern/function': name,
+            'Calls': stats.calls,
+            'Hits': stats.hits,
+            'Seconds': round(stats.seconds, 3),
+            'us/call': round(stats.seconds / stats.calls * 1e6, 2) if stats.calls else None,
+        } for name, stats in sorted(self.calls.items(), key=lambda item: -item[1].seconds) if stats.calls])
+        if not frame.empty:
+            frame['Hits'] = frame['Hits'].astype('Int64')
+        return frame
+
+    def to_dict(self):
+        return {
+            'seconds': self.seconds,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': self.stages,
+            'calls': {name: {'calls': stats.calls, 'hits': stats.hits, 'seconds': stats.seconds}
+                      for name, stats in self.calls.items()},
+            'inputs': self.inputs,
+        }
+
+    def print_summary(self):
+        print("\nProfile")
+        print("-------")
+        if self.stages:
+            print(self.stages_frame().to_string(index=False))
+        if any(stats.calls for stats in self.calls.values()):
+            print()
+            print(self.calls_frame().to_string(index=False))
+        for name, stats in self.inputs.items():
+            throughput = stats['bytes'] / self.seconds / 1024 ** 2 if self.seconds else 0
+            lines = 'unknown' if stats['lines'] is None else f"{stats['lines']:,}"
+            print(f"\n{name}: {lines} lines, {stats['bytes']:,} bytes ({throughput:.1f} MB/s over the run)")
+        print(f"\nTotal: {self.seconds:.3f}s, peak RSS {_megabytes(peak_rss_bytes())} MB")
+
+    def save_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _megabytes(size):
+    return None if size is None else round(size / 1024 ** 2, 1)
@@ -0,0 +1,111 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from rich.console import Console
+from rich.progress import (Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn,
+                           DownloadColumn, TransferSpeedColumn, MofNCompleteColumn)
+
+"""
+Progress bars of the long-running stages: log reduction and extraction, KeepNKeys discovery and filtering,
+report writing. The work only publishes its position, usually the bytes of its input files read so far,
+and a background thread refreshes the bar from it at a fixed interval, so no work is added per line.
+Set ENABLED to False (--no_progress) to run without any bar, e.g. in batch runs.
+"""
+
+# Seconds between two refreshes of a bar
+REFRESH_INTERVAL_S = 0.5
+UNIT_BYTES = 'bytes'
+
+ENABLED = True
+
+
+class ProgressTracker:
+    """
+    Context manager showing the progress of a stage.
+    The work sets position (or adds to it with advance) as it goes, out of total: None when unknown,
+    or a function returning it, only called when the bar is shown (sizing the inputs can cost a stat per file).
+    Within watching(f), the position is instead polled from the offset of the file f.
+    unit is UNIT_BYTES, or a name of the items counted, e.g. 'files'.
+    print writes a message above the bar, or to the console when the bar is disabled.
+    """
+
+    def __init__(self, description, total=None, unit=UNIT_BYTES, interval_s=REFRESH_INTERVAL_S, enabled=None):
+        self.description = description
+        self.total = total
+        self.unit = unit
+        self.interval_s = interval_s
+        self.enabled = ENABLED if enabled is None else enabled
+        self.position = 0
+        self._watched = None
+        self._progress = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.console = Console()
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        if self.unit == UNIT_BYTES:
+            columns = [DownloadColumn(), TransferSpeedColumn()]
+        else:
+            columns = [MofNCompleteColumn(), TextColumn(self.unit)]
+        self._progress = Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"),
+                                  BarColumn(), TaskProgressColumn(), *columns, TimeRemainingColumn(),
+                                  auto_refresh=False, console=self.console)
+        if callable(self.total):
+            self.total = self.total()
+        self._progress.start()
+        self._task = self._progress.add_task(self.description, total=self.total)
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.enabled:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._refresh()
+        self._progress.stop()
+
+    def advance(self, amount):
+        self.position += amount
+
+    @contextmanager
+    def watching(self, f):
+        """
+        Within the context, the position is the position on entry plus the offset of the file descriptor of f,
+        which is read directly, without locking the buffers of f. Exit the context before closing f:
+        the position is then left at the end of what was read of f, so files can be watched one after the other.
+        """
+        if not self.enabled:
+            yield self
+            return
+        fd = f.fileno()
+        base = self.position
+        self._watched = (fd, base)
+        try:
+            yield self
+        finally:
+            self._watched = None
+            self.position = base + os.lseek(fd, 0, os.SEEK_CUR)
+
+    def print(self, *objects):
+        self.console.print(*objects)
+
+    def _poll(self):
+        while not self._stop.wait(self.interval_s):
+            self._refresh()
+
+    def _refresh(self):
+        watched = self._watched
+        if watched is not None:
+            fd, base = watched
+            try:
+                self.position = base + os.lseek(fd, 0, os.SEEK_CUR)
+            except OSError:
+                # the file was closed in the meantime, its final position is set by watching
+                pass
+        self._progress.update(self._task, completed=self.position, total=self.total)
+        self._progress.refresh()
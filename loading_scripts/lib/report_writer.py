@@ -0,0 +1,158 @@
+import gzip
+import os
+
+import pandas as pd
+
+try:
+    from . import dlc_analytics as dlc
+    from . import progress
+except ImportError:
+    import dlc_analytics as dlc
+    import progress
+
+"""
+Writing of the analysis reports to an output directory, as CSV for reading, or as Parquet or Feather
+for the large runs: the columnar formats keep the column types and load back into pandas without any parsing.
+"""
+
+FORMAT_CSV = 'csv'
+FORMAT_PARQUET = 'parquet'
+FORMAT_FEATHER = 'feather'
+FORMATS = [FORMAT_CSV, FORMAT_PARQUET, FORMAT_FEATHER]
+
+# Operations buffered by the streamed columnar writers before each write, see OperationBatchWriter
+OPERATION_BATCH_SIZE = 10000
+# Rows of a CSV report written at a time: larger reports are written by chunks, with a progress bar
+CSV_CHUNK_ROWS = 100000
+
+
+class ReportWriter:
+    """
+    Writes each report once, to <output_dir>/<name>.<format>.
+    compression is passed to the writer of the format: 'gzip' for CSV (written as .csv.gz),
+    'snappy', 'gzip' or 'zstd' for Parquet, 'lz4' or 'zstd' for Feather. None keeps the default of the format.
+    """
+
+    def __init__(self, output_dir='output', report_format=FORMAT_CSV, compression=None):
+        if report_format not in FORMATS:
+            raise ValueError(f"Unknown report format {report_format}, expected one of {FORMATS}")
+        self.output_dir = output_dir
+        self.report_format = report_format
+        self.compression = compression
+        self.written = []
+
+    def path(self, name):
+        extension = self.report_format
+        if self.report_format == FORMAT_CSV and self.compression == 'gzip':
+            extension += '.gz'
+        return os.path.join(self.output_dir, f"{name}.{extension}")
+
+    def write(self, name, frame):
+        """Writes the frame as the report `name` and returns its path."""
+        path = self.path(name)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with progress.ProgressTracker(f"Writing {os.path.basename(path)}...", total=len(frame), unit='rows',
+                                      enabled=None if len(frame) > CSV_CHUNK_ROWS else False) as tracker:
+            if self.report_format == FORMAT_CSV:
+                self._write_csv(path, frame, tracker)
+            elif self.report_format == FORMAT_PARQUET:
+                frame.to_parquet(path, index=False,
+                                 **({'compression': self.compression} if self.compression else {}))
+            else:
+                frame.reset_index(drop=True).to_feather(path,
+                                                        **({'compression': self.compression} if self.compression else {}))
+            tracker.position = len(frame)
+        self.written.append(path)
+        return path
+
+    def _write_csv(self, path, frame, tracker):
+        """Writes the CSV by chunks of CSV_CHUNK_ROWS rows, the other compressions of pandas in one go."""
+        if self.compression == 'gzip':
+            f = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        elif self.compression is None:
+            f = open(path, 'w', newline='', encoding='utf-8')
+        else:
+            frame.to_csv(path, index=False, compression=self.compression)
+            return
+        with f:
+            # the header is written with the first chunk, also when the frame is empty
+            for start in range(0, max(len(frame), 1), CSV_CHUNK_ROWS):
+                frame.iloc[start:start + CSV_CHUNK_ROWS].to_csv(f, index=False, header=start == 0)
+                tracker.position = min(start + CSV_CHUNK_ROWS, len(frame))
+
+    def operation_writer(self, name):
+        """
+        Returns a context manager writing completed operations to the report `name` as they come,
+        for the streaming mode: row by row in CSV, by batches of OPERATION_BATCH_SIZE in the columnar formats.
+        """
+        path = self.path(name)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.written.append(path)
+        if self.report_format == FORMAT_CSV:
+            return dlc.CsvOperationWriter(path, compression=self.compression)
+        return OperationBatchWriter(path, self.report_format, self.compression)
+
+
+class OperationBatchWriter:
+    """
+    Writes completed operations to a Parquet file (one row group per batch) or a Feather file
+    (one record batch per batch), so that memory holds a single batch of operations.
+    Categorical columns are written as dictionary columns, like the reports of the batch mode: the categories
+    of each batch extend the ones of the previous batches, so that Feather writes them as dictionary deltas.
+    """
+
+    def __init__(self, path, report_format, compression=None, batch_size=OPERATION_BATCH_SIZE):
+        self.path = path
+        self.report_format = report_format
+        self.compression = compression
+        self.batch_size = batch_size
+        self._batch = []
+        self._writer = None
+        self._schema = None
+        self._categories = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._batch or self._writer is None:
+            self._flush()
+        self._writer.close()
+
+    def __call__(self, op):
+        self._batch.append(op)
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+
+        frame = dlc.operations_to_frame(self._batch)
+        for column, dtype in frame.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories = self._categories.get(column)
+                categories = dtype.categories if categories is None else categories.append(
+                    dtype.categories.difference(categories, sort=False))
+                self._categories[column] = categories
+                frame[column] = frame[column].cat.set_categories(categories)
+        table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            # int32 indices, as the number of categories grows from one batch to the next
+            self._schema = pa.schema([pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                                      if pa.types.is_dictionary(field.type) else field for field in table.schema],
+                                     metadata=table.schema.metadata)
+            table = table.cast(self._schema)
+            self._writer = self._open_writer(self._schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def _open_writer(self, schema):
+        import pyarrow as pa
+        if self.report_format == FORMAT_PARQUET:
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(self.path, schema, compression=self.compression or 'snappy')
+        # lz4 by default, like DataFrame.to_feather
+        compression = self.compression or 'lz4'
+        options = pa.ipc.IpcWriteOptions(compression=None if compression == 'uncompressed' else compression,
+                                         emit_dictionary_deltas=True)
+        return pa.ipc.new_file(self.path, schema, options=options)
@@ -0,0 +1,249 @@
+import heapq
+import math
+from itertools import count
+
+import pandas as pd
+
+try:
+    from . import dlc_analytics as dlc
+except ImportError:
+    import dlc_analytics as dlc
+
+"""
+Constant-memory statistics of the DLC operations, updated as each operation completes:
+count/min/max/mean/variance and p50/p95/p99 percentiles, overall and per topic, and the top-N slowest.
+All the aggregates can be merged, e.g. the aggregates of several log files or of parallel passes.
+"""
+
+# Relative accuracy of the percentiles of QuantileSketch
+SKETCH_RELATIVE_ACCURACY = 0.01
+PERCENTILES = [('p50', 0.50), ('p95', 0.95), ('p99', 0.99)]
+ALL_TOPICS = 'ALL'
+
+
+class RunningStats:
+    """Count, min, max, mean and variance of a series of values, updated one value at a time (Welford)."""
+
+    __slots__ = ('count', 'min', 'max', 'mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.min, self.max, self.mean, self._m2 = \
+                other.count, other.min, other.max, other.mean, other._m2
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """Sample variance, 0 below two values."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with logarithmic buckets: a value v > 0 is counted in bucket ceil(log_gamma(v)),
+    so every quantile is estimated within relative_accuracy of a value of the series.
+    The number of buckets grows with the log of the range of the values, not with their number.
+    Values <= 0 are counted as 0.
+    """
+
+    __slots__ = ('relative_accuracy', '_gamma', '_log_gamma', 'buckets', 'zero_count', 'count')
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches of different accuracies")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """Returns the estimated q-quantile (0 <= q <= 1), or None when the sketch is empty."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # middle of the bucket (gamma^(index-1), gamma^index], in relative terms
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+
+class MetricSummary:
+    """RunningStats and QuantileSketch of one metric."""
+
+    __slots__ = ('stats', 'sketch')
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q):
+        """The sketch estimate, clamped to the exact min and max."""
+        estimate = self.sketch.quantile(q)
+        return None if estimate is None else min(max(estimate, self.stats.min), self.stats.max)
+
+
+class DlcStreamingStats:
+    """
+    Aggregates of the durations of the completed DLC operations, overall and per topic.
+    Use add as the on_operation callback of dlc_analytics.stream_dlc_operations.
+    """
+
+    metrics = {
+        dlc.DLC_DURATION_MS: ('DCL operation duration', 'dlc_duration_ms'),
+        dlc.AP_TRANSACTION_DURATION_MS: ('AP Transaction duration', 'pivot_transaction_duration_ms'),
+        dlc.AP_COMMIT_DURATION_MS: ('AP Commit duration', 'pivot_commit_duration_ms'),
+        dlc.DS_TRANSACTION_DURATION_MS: ('DS Transaction duration', 'ds_transaction_duration_ms'),
+        dlc.DS_COMMIT_DURATION_MS: ('DS Commit duration', 'ds_commit_duration_ms'),
+    }
+
+    def __init__(self):
+        # summaries[topic][metric], with the ALL_TOPICS entry for all the operations
+        self.summaries = {}
+
+    def _topic_summaries(self, topic):
+        summaries = self.summaries.get(topic)
+        if summaries is None:
+            summaries = self.summaries[topic] = {metric: MetricSummary() for metric in self.metrics}
+        return summaries
+
+    def add(self, op):
+        for topic in (ALL_TOPICS, op.topic):
+            summaries = self._topic_summaries(topic)
+            for metric, (_, attribute) in self.metrics.items():
+                summaries[metric].add(getattr(op, attribute))
+
+    def merge(self, other):
+        for topic, other_summaries in other.summaries.items():
+            summaries = self._topic_summaries(topic)
+            for metric, summary in other_summaries.items():
+                summaries[metric].merge(summary)
+
+    def to_frame(self):
+        """One row per topic and metric, the ALL_TOPICS rows first."""
+        rows = []
+        topics = sorted(self.summaries, key=lambda topic: (topic != ALL_TOPICS, topic))
+        for topic in topics:
+            for metric, (label, _) in self.metrics.items():
+                summary = self.summaries[topic][metric]
+                row = {
+                    'Metric': label,
+                    'Topic': topic,
+                    'Count': summary.stats.count,
+                    'Min (ms)': summary.stats.min,
+                    'Max (ms)': summary.stats.max,
+                    'Average (ms)': summary.stats.mean,
+                    'Std (ms)': summary.stats.std,
+                }
+                for name, q in PERCENTILES:
+                    row[f'{name} (ms)'] = summary.quantile(q)
+                rows.append(row)
+        return pd.DataFrame(rows)
+
+
+class TopN:
+    """
+    The n rows with the largest metric values, kept in a bounded min-heap. On ties the first rows are kept,
+    like DataFrame.nlargest.
+    """
+
+    def __init__(self, n, metric, columns):
+        self.n = n
+        self.metric = metric
+        self.columns = columns
+        self._heap = []
+        self._sequence = count()
+
+    def add(self, op):
+        """op is a DlcOperation, or a row with the columns as attributes."""
+        value = getattr(op, self.metric)
+        if value is None or self.n <= 0:
+            return
+        key = (value, -next(self._sequence))
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, (key, tuple(getattr(op, column) for column in self.columns)))
+        elif key > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (key, tuple(getattr(op, column) for column in self.columns)))
+
+    def to_frame(self):
+        """The rows, largest first."""
+        rows = [row for _, row in sorted(self._heap, reverse=True)]
+        return pd.DataFrame(rows, columns=self.columns)
+
+
+class SlowestOperations:
+    """
+    The top-N reports of dlc_analytics.get_n_slowest_operations, maintained as operations complete.
+    extra_metrics adds a 'slowest_<metric>' report per metric, e.g. dlc_analytics.DS_COMMIT_DURATION_MS.
+    """
+
+    def __init__(self, n=5, extra_metrics=()):
+        reports = dict(dlc.SLOWEST_REPORTS)
+        for metric in extra_metrics:
+            reports[f'slowest_{metric}'] = (metric, [dlc.OPERATION_ID, dlc.OPERATION_TYPE, dlc.TOPIC, metric])
+        self.tops = {report_name: TopN(n, metric, columns) for report_name, (metric, columns) in reports.items()}
+
+    def add(self, op):
+        for top in self.tops.values():
+            top.add(op)
+
+    def reports(self):
+        return {report_name: top.to_frame() for report_name, top in self.tops.items()}
@@ -0,0 +1,233 @@
+import csv
+import os
+import random
+from datetime import datetime, timedelta
+
+"""
+Deterministic generators of synthetic inputs for the tests and the benchmarks:
+Atoti server logs with DLC operations, and CSV file trees for KeepNKeys.py.
+The same seed and parameters always produce the same bytes.
+"""
+
+LOG_START_TIME = datetime(2026, 1, 29, 13, 0, 0)
+# Lines buffered before each write
+WRITE_BATCH_LINES = 10000
+
+STORE_NAMES = ['Scenarios', 'Trades', 'TradePnLs', 'TradeSensitivities', 'MarketData', 'FxRates', 'Books',
+               'Counterparties', 'Instruments', 'RiskFactors', 'VaRVectors', 'ESVectors', 'Limits', 'Desks',
+               'LegalEntities', 'Curves', 'Surfaces', 'Fixings', 'Holidays', 'Portfolios']
+TOPICS = ['StaticTopic', 'TradeTopic', 'SensitivityTopic', 'PnLTopic', 'VaRTopic', 'MarketDataTopic']
+PIVOTS = [('SensiSchema', 'Sensitivity Cube'), ('VaR/ESSchema', 'VaR-ES Cube'), ('PnLSchema', 'PnL Cube'),
+          ('LimitsSchema', 'Limits Cube')]
+
+
+def _colour_prefix(timestamp, thread, level, logger):
+    return (f"{timestamp} CET [\x1b[34m{thread}\x1b[0;39m] \x1b[34m{level} \x1b[0;39m "
+            f"\x1b[33m{logger}\x1b[0;39m - ")
+
+
+class _Operation:
+    """A DLC operation being written: its remaining lines are emitted one step at a time."""
+
+    def __init__(self, rng, op_id, thread, ds_tx_id, ap_tx_id):
+        self.op_id = op_id
+        self.thread = thread
+        self.ds_tx_id = ds_tx_id
+        self.ap_tx_id = ap_tx_id
+        self.topic = rng.choice(TOPICS)
+        self.stores = rng.sample(STORE_NAMES, rng.randint(3, len(STORE_NAMES)))
+        self.pivots = rng.sample(PIVOTS, rng.randint(1, len(PIVOTS)))
+        self.steps = ['start']
+        for i in range(len(self.pivots)):
+            self.steps += [('pivot_start', i), ('pivot_detail', i), ('pivot_commit', i)]
+        self.steps += ['ds_commit', 'finish']
+
+
+class SyntheticLogWriter:
+    """
+    Writes a realistic ANSI coloured Atoti log: concurrent DLC operations on their own threads, with their
+    datastore transaction start/commit events, the ActivePivot transaction start/commit health events of
+    their pivots, and noise lines of CSV source and worker threads, interleaved.
+    noise_ratio is the probability that a line is noise, concurrency the number of operations in flight.
+    """
+
+    def __init__(self, seed=0, concurrency=4, noise_ratio=0.9, time_format_separator='.'):
+        self.rng = random.Random(seed)
+        self.concurrency = concurrency
+        self.noise_ratio = noise_ratio
+        self.separator = time_format_separator
+        self.clock = LOG_START_TIME
+        self._second = None
+        self._second_prefix = None
+        self.next_op_id = 0
+        self.active = []
+        self.lines = 0
+        self.bytes = 0
+        self.operations = 0
+
+    def _timestamp(self):
+        self.clock += timedelta(milliseconds=self.rng.randint(0, 7))
+        second = self.clock.replace(microsecond=0)
+        if second != self._second:
+            self._second = second
+            self._second_prefix = second.strftime('%Y-%m-%d %H:%M:%S') + self.separator
+        return f"{self._second_prefix}{self.clock.microsecond // 1000:03d}"
+
+    def _noise_line(self):
+        rng = self.rng
+        timestamp = self._timestamp()
+        kind = rng.randrange(3)
+        if kind == 0:
+            worker = f"activeviamcsv-worker-local-csv-source-{rng.randint(1, 16)}"
+            size = rng.randint(10, 10 ** 7)
+            return (_colour_prefix(timestamp, worker, 'INFO', 'atoti.server.source.csv')
+                    + f"{size} bytes ({size}), {size // 40} lines, {size // 45} records read from "
+                      f"/MARS/data/cubeInputData/cube_{rng.randint(1, 999)}/{rng.choice(STORE_NAMES)}.csv in "
+                      f"{rng.randint(1, 5000)}ms (1 tasks, 15.23% reading, 13.88% decoding, 0.07% waiting, "
+                      f"10.26% stripping, 47.96% parsing, 12.58% publishing)\n")
+        if kind == 1:
+            return (_colour_prefix(timestamp, 'main', 'INFO', 'atoti.server.source.csv')
+                    + f"local-csv-source: Processing workload #{rng.randint(0, 9999)}: Parsing workload for files "
+                      f"/MARS/data/cubeInputData/cube_{rng.randint(1, 999)}/{rng.choice(STORE_NAMES)}.csv\n")
+        return (_colour_prefix(timestamp, f"activeviam-common-pool-worker-{rng.randint(1, 64)}", 'INFO',
+                               'c.a.i.d.i.s.c.ChannelFactoryService')
+                + f"Field '{rng.choice(STORE_NAMES)}Field{rng.randint(1, 300)}' has multiple parser keys: "
+                  f"[string, double], no implicit CsvColumnParser will be created.\n")
+
+    def _operation_lines(self, op):
+        """Returns the lines of the next step of the operation."""
+        rng = self.rng
+        step = op.steps.pop(0)
+        timestamp = self._timestamp()
+        health = 'activepivot-health-event-dispatcher'
+
+        if step == 'start':
+            return [
+                _colour_prefix(timestamp, op.thread, 'INFO', 'c.a.i.d.i.DataLoadControllerService')
+                + f"[dlc, transaction] Starting LOAD operation, operation_id={op.op_id}, on topic [{op.topic}], "
+                  f"with scope {{}}. Locking stores: [{', '.join(op.stores)}]\n",
+                # the datastore transaction starts right after its operation, before another operation starts
+                _colour_prefix(timestamp, health, 'INFO', 'com.activeviam.apm.health')
+                + f"[datastore, transaction] INFO {timestamp.replace(' ', 'T')}Z uptime={rng.randint(1, 10 ** 8)}ms "
+                  f"com.activeviam.database.datastore.internal.transaction.impl.TransactionManager."
+                  f"emitObservabilityOnTransactionStarted:612 thread={op.thread} thread_id={rng.randint(1, 300)} "
+                  f"event_type=DatastoreTransactionStarted Transaction Started  transaction_id={op.ds_tx_id} "
+                  f"on_stores=[{', '.join(op.stores)}]\n",
+            ]
+
+        if step == 'ds_commit':
+            return [_colour_prefix(timestamp, health, 'INFO', 'com.activeviam.apm.health')
+                    + f"[datastore, transaction] INFO {timestamp.replace(' ', 'T')}Z uptime={rng.randint(1, 10 ** 8)}ms "
+                      f"com.activeviam.database.datastore.internal.transaction.impl.TransactionManager."
+                      f"emitObservabilityOnTransactionCommitted:650 thread={op.thread} thread_id=1 "
+                      f"event_type=DatastoreTransactionCommitted Transaction Committed  "
+                      f"transaction_id={op.ds_tx_id} transaction_duration={rng.randint(1, 20000)}ms "
+                      f"commit_duration={rng.randint(1, 2000)}ms\n"]
+
+        if step == 'finish':
+            return [_colour_prefix(timestamp, op.thread, 'INFO', 'c.a.i.d.i.DataLoadControllerService')
+                    + f"[dlc, transaction] Finishing LOAD operation, id {op.op_id}.\n"]
+
+        kind, i = step
+        schema, pivot = op.pivots[i]
+        if kind == 'pivot_start':
+            return [_colour_prefix(timestamp, health, 'INFO', 'a.s.tech.observability.health-event')
+                    + f"[activepivot, transaction] INFO {timestamp.replace(' ', 'T')}Z uptime=1ms "
+                      f"com.activeviam.activepivot.core.impl.private_.transaction.impl."
+                      f"ActivePivotSchemaTransactionManager.startTransactionOrBlock:238 thread={op.thread} "
+                      f"thread_id=1 event_type=ActivePivotTransactionStartedEvent user=NO_USER roles=[] "
+                      f"ActivePivotSchema = {schema}, Pivots = [{pivot}] ActivePivot transaction {op.ap_tx_id} "
+                      f"started, fired by database transaction {op.ds_tx_id}\n"]
+        if kind == 'pivot_detail':
+            return [_colour_prefix(timestamp, f"activeviam-common-pool-worker-{rng.randint(1, 64)}", 'INFO',
+                                   'a.s.tech.observability.health-event')
+                    + f"[activepivot, transaction] {pivot}: {rng.randint(1, 99)} partitions committed on "
+                      f"aggregate providers in {rng.randint(1, 3000)}ms\n"]
+        transaction_duration = rng.randint(1, 5000)
+        commit_duration = rng.randint(1, 5000)
+        return [_colour_prefix(timestamp, health, 'INFO', 'a.s.tech.observability.health-event')
+                + f"[activepivot, transaction] INFO {timestamp.replace(' ', 'T')}Z uptime=1ms "
+                  f"com.activeviam.activepivot.core.impl.private_.transaction.impl.ActivePivotSchemaTransaction$1."
+                  f"execute:284 thread=activeviam-common-pool-worker-{rng.randint(1, 64)} thread_id=220 "
+                  f"event_type=ActivePivotTransactionCommittedEvent user=NO_USER roles=[] "
+                  f"ActivePivotSchema = {schema}, Pivots = [{pivot}] ActivePivot transaction {op.ap_tx_id} was "
+                  f"successfully committed on epoch {op.ap_tx_id}. "
+                  f"total_duration={transaction_duration + commit_duration}ms, "
+                  f"transaction_duration={transaction_duration}ms, commit_duration={commit_duration}ms\n"]
+
+    def _next_lines(self, draining=False):
+        rng = self.rng
+        if not draining and rng.random() < self.noise_ratio:
+            return [self._noise_line()]
+
+        if not draining and len(self.active) < self.concurrency and (not self.active or rng.random() < 0.3):
+            slot = next(k for k in range(self.concurrency) if all(op.thread != f"dlc-loader-{k}" for op in self.active))
+            op_id = self.next_op_id
+            self.next_op_id += 1
+            self.active.append(_Operation(rng, op_id, f"dlc-loader-{slot}", 1000 + op_id, 500000 + op_id))
+
+        op = rng.choice(self.active)
+        lines = self._operation_lines(op)
+        if not op.steps:
+            self.active.remove(op)
+            self.operations += 1
+        return lines
+
+    def write(self, path, target_bytes):
+        """
+        Writes at least target_bytes of log to path, then completes the operations in flight.
+        Returns the lines, bytes and DLC operations written.
+        """
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            batch = []
+            while self.bytes < target_bytes or self.active:
+                lines = self._next_lines(draining=self.bytes >= target_bytes)
+                for line in lines:
+                    # the generated lines are ASCII
+                    self.bytes += len(line)
+                batch.extend(lines)
+                if len(batch) >= WRITE_BATCH_LINES:
+                    f.writelines(batch)
+                    self.lines += len(batch)
+                    batch = []
+            f.writelines(batch)
+            self.lines += len(batch)
+        return {'lines': self.lines, 'bytes': self.bytes, 'operations': self.operations,
+                'start_time': LOG_START_TIME.strftime('%Y-%m-%d %H:%M:%S.000'),
+                'end_time': self.clock.strftime('%Y-%m-%d %H:%M:%S') + f".{self.clock.microsecond // 1000:03d}"}
+
+
+def generate_log(path, target_bytes, seed=0, concurrency=4, noise_ratio=0.9):
+    """Writes a synthetic log of about target_bytes to path, see SyntheticLogWriter. Returns its statistics."""
+    return SyntheticLogWriter(seed, concurrency, noise_ratio).write(path, target_bytes)
+
+
+def generate_csv_tree(root, target_bytes, files=20, key_column='tradeKey', distinct_keys=100000, seed=0):
+    """
+    Writes a tree of CSV files of about target_bytes in total under root, spread over sub-directories,
+    with a key column among other columns, some of them quoted with embedded commas.
+    Returns the files, rows and bytes written.
+    """
+    rng = random.Random(seed)
+    header = ['asOfDate', 'book', key_column, 'desk', 'comment', 'currency', 'value', 'scenario']
+    bytes_per_file = max(1, target_bytes // files)
+    rows = 0
+    written_bytes = 0
+    for i in range(files):
+        directory = os.path.join(root, f"part{i % 4}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"file{i:04d}.csv")
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            while f.tell() < bytes_per_file:
+                batch = [[
+                    '2026-01-29', f"BOOK_{rng.randint(1, 500)}", f"TRD{rng.randrange(distinct_keys):09d}",
+                    rng.choice(['Rates', 'FX', 'Credit', 'Equity']),
+                    rng.choice(['', 'amended', 'late booking, re-sent', 'split "A", part 2']),
+                    rng.choice(['EUR', 'USD', 'GBP', 'JPY']), f"{rng.uniform(-1e6, 1e6):.4f}", str(rng.randint(0, 499)),
+                ] for _ in range(1000)]
+                writer.writerows(batch)
+                rows += len(batch)
+            written_bytes += f.tell()
+    return {'files': files, 'rows': rows, 'bytes': written_bytes}
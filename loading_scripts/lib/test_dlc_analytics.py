@@ -1,9 +1,13 @@
+import gzip
+import os
+import tempfile
 import unittest
 from unittest.mock import mock_open, patch
 import pandas as pd
 
 # Adjust the import if your test is not in the same folder as dlc_analytics.py
 import dlc_analytics as dlc
+import synthetic_logs
 
 
 class TestDlcAnalytics(unittest.TestCase):
@@ -43,8 +47,9 @@ class TestDlcAnalytics(unittest.TestCase):
     # ------------------------------
     # extract_dlc_operations_from_file
     # ------------------------------
+    @patch("progress.ENABLED", False)  # the mocked log has no size on disk
     def test_extract_single_operation_basic(self):
-        data = "\n".join(self.log_lines) + "\n"
+        data = ("\n".join(self.log_lines) + "\n").encode("utf-8")
 
         with patch("builtins.open", mock_open(read_data=data)):
              df = dlc.extract_dlc_operations_from_file("input.log", threshold_ms=None, output_log_path=None)
@@ -53,7 +58,7 @@ class TestDlcAnalytics(unittest.TestCase):
         self.assertEqual(1, len(df), "Expected one DLC operation extracted")
 
         row = df.iloc[0]
-        self.assertEqual(row[dlc.OPERATION_ID], "0")         # operation_id from the log
+        self.assertEqual(row[dlc.OPERATION_ID], 0)         # operation_id from the log
         self.assertEqual(row[dlc.OPERATION_TYPE], "LOAD")
         self.assertEqual(row[dlc.TOPIC], "StaticTopic")
         self.assertIn("Scenarios", row[dlc.LOCKED_STORES])
@@ -62,29 +67,204 @@ class TestDlcAnalytics(unittest.TestCase):
         self.assertAlmostEqual(row[dlc.DLC_DURATION_MS], 9783.0, delta=5.0)
 
         # Transaction/commit accumulation parsed via AP tx 1 -> DB tx 3 mapping
-        self.assertEqual(row[dlc.PIVOT_TRANSACTION_ID], "3")
+        self.assertEqual(row[dlc.PIVOT_TRANSACTION_ID], 3)
         self.assertEqual(row[dlc.AP_TRANSACTION_DURATION_MS], 635)
         self.assertEqual(row[dlc.AP_COMMIT_DURATION_MS], 629)
+        self.assertEqual(row[dlc.PIVOTS], "Sensitivity Cube, VaR-ES Cube")
 
-    def test_extract_buffers_slow_ops_when_threshold_set(self):
-        data = "\n".join(self.log_lines) + "\n"
+    @patch("progress.ENABLED", False)  # the mocked log has no size on disk
+    def test_extract_counts_the_commits_logged_after_the_finish_line(self):
+        finish_line = self.log_lines[-1]
+        first_commit = next(i for i, line in enumerate(self.log_lines) if "TransactionCommittedEvent" in line)
+        lines = self.log_lines[:first_commit] + [finish_line + "\n"] + self.log_lines[first_commit:-1]
+        data = ("\n".join(lines) + "\n").encode("utf-8")
 
-        m_in = mock_open(read_data=data)  # input file: yields lines
-        m_out = mock_open()  # output file: capture writes
+        with patch("builtins.open", mock_open(read_data=data)):
+            df = dlc.extract_dlc_operations_from_file("input.log")
+
+        row = df.iloc[0]
+        self.assertEqual(row[dlc.AP_TRANSACTION_DURATION_MS], 635)
+        self.assertEqual(row[dlc.AP_COMMIT_DURATION_MS], 629)
+        self.assertEqual(row[dlc.DS_COMMIT_DURATION_MS], 665)
+        self.assertEqual(row[dlc.PIVOTS], "Sensitivity Cube, VaR-ES Cube")
+
+    @patch("progress.ENABLED", False)  # the mocked log has no size on disk
+    def test_extract_builds_typed_frame(self):
+        data = ("\n".join(self.log_lines) + "\n").encode("utf-8")
+
+        with patch("builtins.open", mock_open(read_data=data)):
+            df = dlc.extract_dlc_operations_from_file("input.log")
+
+        self.assertEqual("int64", df[dlc.OPERATION_ID].dtype)
+        self.assertEqual("int64", df[dlc.DLC_DURATION_MS].dtype)
+        self.assertEqual("Int64", df[dlc.PIVOT_TRANSACTION_ID].dtype)
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df[dlc.START_TIME]))
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df[dlc.END_TIME]))
+        for column in (dlc.THREAD, dlc.TOPIC, dlc.OPERATION_TYPE):
+            self.assertIsInstance(df[column].dtype, pd.CategoricalDtype)
+        self.assertEqual(pd.Timestamp("2026-01-29 13:41:39.106"), df[dlc.START_TIME].iloc[0])
+
+    def test_compute_dlc_stats_does_not_mutate_input(self):
+        df = pd.DataFrame([{
+            dlc.START_TIME: "2026-01-01 00:00:00.000",
+            dlc.END_TIME: "2026-01-01 00:00:10.000",
+            dlc.AP_TRANSACTION_DURATION_MS: 1000,
+            dlc.AP_COMMIT_DURATION_MS: 100,
+        }])
+        stats = dlc.compute_dlc_stats(df)
+
+        self.assertEqual(10000.0, stats[stats["Metric"] == "DCL operation duration"].iloc[0]["Max (ms)"])
+        self.assertNotIn(dlc.DLC_DURATION_MS, df)
+        self.assertEqual("2026-01-01 00:00:00.000", df[dlc.START_TIME].iloc[0])
+
+    def test_extract_buffers_slow_ops_when_threshold_set(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "input.log")
+            output_path = os.path.join(tmp_dir, "buffered.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write("".join(line.rstrip("\n") + "\n" for line in self.log_lines))
 
-        with patch("builtins.open") as m_open:
-            m_open.side_effect = [m_in.return_value, m_out.return_value]
             df = dlc.extract_dlc_operations_from_file(
-                "input.log",
+                input_path,
                 threshold_ms=5000,                # ~9783ms -> considered slow
-                output_log_path="buffered.txt"
+                output_log_path=output_path
             )
+            with open(output_path, encoding="utf-8") as f:
+                written = f.read()
         self.assertEqual(len(df), 1)
 
         # Verify header marker for slow op written
-        writes = [c.args[0] for c in m_out().write.call_args_list]
-        header = next((w for w in writes if "---- SLOW DLC OP: 0" in w), None)
-        self.assertIsNotNone(header, "Expected slow-op header to be written to buffer file")
+        self.assertIn("---- SLOW DLC OP: 0", written)
+        # Lines of the operation thread are copied verbatim, lines of other threads are not
+        main_lines = [line.rstrip("\n") + "\n" for line in self.log_lines if "\x1b[34mmain\x1b" in line]
+        self.assertEqual(5, len(main_lines))
+        self.assertTrue(written.endswith("".join(main_lines)))
+        self.assertNotIn("activepivot-health-event-dispatcher", written)
+
+    def test_extract_skips_fast_ops_when_threshold_set(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "input.log")
+            output_path = os.path.join(tmp_dir, "buffered.txt")
+            self._write_numbered_operations(input_path, 3)
+
+            dlc.extract_dlc_operations_from_file(input_path, threshold_ms=60000, output_log_path=output_path)
+            with open(output_path, encoding="utf-8") as f:
+                self.assertEqual("", f.read())
+
+    @patch("progress.ENABLED", False)  # the mocked log has no size on disk
+    def test_extract_filters_time_window_in_stream(self):
+        data = ("\n".join(self.log_lines) + "\n").encode("utf-8")
+
+        with patch("builtins.open", mock_open(read_data=data)):
+            df = dlc.extract_dlc_operations_from_file("input.log", start_time="2026-01-29 13:41:00.000",
+                                                      end_time="2026-01-29 13:42:00.000")
+        self.assertEqual(1, len(df), "The whole operation lies inside the window")
+
+        # The window closes before the finish line: the operation never completes
+        with patch("builtins.open", mock_open(read_data=data)):
+            df = dlc.extract_dlc_operations_from_file("input.log", start_time="2026-01-29 13:41:00.000",
+                                                      end_time="2026-01-29 13:41:48.000")
+        self.assertTrue(df.empty)
+
+    def test_parse_log_line_skips_irrelevant_lines(self):
+        noise = self.log_lines[3]
+        self.assertIsNone(dlc.parse_log_line(noise))
+        self.assertEqual((dlc.EVENT_LINE, "main"), dlc.parse_log_line(noise, plain_lines=True))
+
+        kinds = [event[0] for event in map(dlc.parse_log_line, self.log_lines) if event]
+        self.assertEqual([dlc.EVENT_DLC_START, dlc.EVENT_DS_START, dlc.EVENT_PIVOT_LINK, dlc.EVENT_PIVOT_LINK,
+                          dlc.EVENT_AP_COMMIT, dlc.EVENT_AP_COMMIT, dlc.EVENT_DS_COMMIT, dlc.EVENT_DLC_FINISH], kinds)
+
+    def _write_numbered_operations(self, path, count):
+        """Writes `count` copies of the operation of setUp, each with its own operation and transaction ids."""
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(count):
+                for line in self.log_lines:
+                    line = (line.replace("operation_id=0", f"operation_id={i}")
+                            .replace("operation, id 0", f"operation, id {i}")
+                            .replace("transaction_id=3", f"transaction_id={1000 + i}")
+                            .replace("database transaction 3", f"database transaction {1000 + i}")
+                            .replace("ActivePivot transaction 1 ", f"ActivePivot transaction {2000 + i} "))
+                    f.write(line.rstrip("\n") + "\n")
+
+    def test_extract_parallel_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            self._write_numbered_operations(path, 40)
+
+            sequential = dlc.extract_dlc_operations_from_file(path)
+            # many small chunks, so operations and transactions straddle chunk boundaries
+            parallel = dlc.extract_dlc_operations_from_file(path, workers=3)
+
+        self.assertEqual(40, len(sequential))
+        pd.testing.assert_frame_equal(sequential, parallel)
+
+    def test_extract_mmap_engine_matches_text_engine(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            self._write_numbered_operations(path, 10)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("trailing line without newline fired by database transaction 3")
+
+            text = dlc.extract_dlc_operations_from_file(path)
+            binary = dlc.extract_dlc_operations_from_file(path, engine=dlc.ENGINE_MMAP)
+            binary_parallel = dlc.extract_dlc_operations_from_file(path, engine=dlc.ENGINE_MMAP, workers=2)
+
+        self.assertEqual(10, len(text))
+        pd.testing.assert_frame_equal(text, binary)
+        pd.testing.assert_frame_equal(text, binary_parallel)
+
+    def test_extract_engines_match_on_out_of_order_timestamps(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            synthetic_logs.generate_log(path, 300_000, seed=2)
+            with open(path, "rb") as f:
+                data = f.read()
+            # a line stamped inside the window before it, and one stamped after the window inside it
+            early = data.index(b"\n2026-01-29 13:00:00.5") + 1
+            late = data.index(b"\n2026-01-29 13:00:02.0") + 1
+            skewed_line = "2026-01-29 {} CET [main] INFO  a.s.tech.observability - skewed clock\n"
+            with open(path, "wb") as f:
+                f.write(data[:early] + skewed_line.format("13:00:01.500").encode() + data[early:late]
+                        + skewed_line.format("13:09:59.000").encode() + data[late:])
+
+            window = dict(start_time="2026-01-29 13:00:01.000", end_time="2026-01-29 13:00:02.500")
+            text = dlc.extract_dlc_operations_from_file(path, **window)
+            for options in (dict(engine=dlc.ENGINE_MMAP), dict(workers=2),
+                            dict(engine=dlc.ENGINE_MMAP, workers=2)):
+                with self.subTest(**options):
+                    pd.testing.assert_frame_equal(
+                        text, dlc.extract_dlc_operations_from_file(path, **window, **options))
+
+        self.assertGreater(len(text), 0)
+        self.assertLess(text[dlc.START_TIME].min(), pd.Timestamp("2026-01-29 13:00:01"))
+
+    def test_extract_rotated_compressed_series_matches_single_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            self._write_numbered_operations(path, 6)
+            with open(path, "rb") as f:
+                data = f.read()
+
+            # split in the middle of an operation, the older half rotated and compressed
+            split = data.index(b"\n", len(data) // 2) + 1
+            with gzip.open(os.path.join(tmp_dir, "nohup.out.1.gz"), "wb") as f:
+                f.write(data[:split])
+            with open(os.path.join(tmp_dir, "nohup.out"), "wb") as f:
+                f.write(data[split:])
+
+            single = dlc.extract_dlc_operations_from_file(path, threshold_ms=0,
+                                                          output_log_path=os.path.join(tmp_dir, "single.out"))
+            series = dlc.extract_dlc_operations_from_file(os.path.join(tmp_dir, "nohup.out*"), threshold_ms=0,
+                                                          output_log_path=os.path.join(tmp_dir, "series.out"))
+            with open(os.path.join(tmp_dir, "single.out"), "rb") as f:
+                single_slow_lines = f.read()
+            with open(os.path.join(tmp_dir, "series.out"), "rb") as f:
+                series_slow_lines = f.read()
+
+        self.assertEqual(6, len(series))
+        pd.testing.assert_frame_equal(single, series)
+        self.assertEqual(single_slow_lines, series_slow_lines)
 
     # ------------------------------
     # compute_dlc_stats
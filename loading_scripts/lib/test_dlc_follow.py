@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+import dlc_analytics
+import dlc_follow
+import synthetic_logs
+
+
+START_LINE = ("2026-01-29 13:41:39.106 CET [main] INFO  c.a.i.d.i.DataLoadControllerService - [dlc, transaction] "
+              "Starting LOAD operation, operation_id={id}, on topic [StaticTopic], with scope {{}}. "
+              "Locking stores: [Scenarios]\n")
+NOISE_LINE = "2026-01-29 13:41:40.000 CET [main] INFO  atoti.server.source.csv - local-csv-source: Processing\n"
+FINISH_LINE = ("2026-01-29 13:41:48.889 CET [main] INFO  c.a.i.d.i.DataLoadControllerService - [dlc, transaction] "
+               "Finishing LOAD operation, id {id}.\n")
+
+
+class TestDlcFollow(unittest.TestCase):
+
+    def _follow(self, path, state_path, polls=2):
+        """Runs one follow session of a few polls and returns the ids of the operations it reported."""
+        reported = []
+        remaining = [polls]
+
+        def should_stop():
+            remaining[0] -= 1
+            return remaining[0] < 0
+
+        dlc_follow.follow_dlc_operations(path, lambda op: reported.append(op.operation_id), state_path=state_path,
+                                         poll_interval_s=0, should_stop=should_stop)
+        return reported
+
+    def test_follow_reports_operations_as_they_finish_and_resumes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            state_path = os.path.join(tmp_dir, "follow.state")
+
+            # the finish line of operation 1 is still being written
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=0) + NOISE_LINE + FINISH_LINE.format(id=0) + START_LINE.format(id=1))
+                f.write(FINISH_LINE.format(id=1)[:40])
+            self.assertEqual([0], self._follow(path, state_path))
+
+            # a restart resumes the open operation from the saved state, without reporting operation 0 again
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(FINISH_LINE.format(id=1)[40:])
+            self.assertEqual([1], self._follow(path, state_path))
+
+    def test_follow_rereads_truncated_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            state_path = os.path.join(tmp_dir, "follow.state")
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=0) + NOISE_LINE * 3 + FINISH_LINE.format(id=0))
+            self.assertEqual([0], self._follow(path, state_path))
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=1) + FINISH_LINE.format(id=1))
+            self.assertEqual([1], self._follow(path, state_path))
+
+    def test_crash_while_reporting_does_not_report_again(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            state_path = os.path.join(tmp_dir, "follow.state")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=0) + FINISH_LINE.format(id=0))
+
+            def crash(op):
+                raise RuntimeError("crash")
+
+            with self.assertRaises(RuntimeError):
+                dlc_follow.follow_dlc_operations(path, crash, state_path=state_path, poll_interval_s=0)
+
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=1) + FINISH_LINE.format(id=1))
+            self.assertEqual([1], self._follow(path, state_path))
+
+    def test_saved_state_keeps_only_the_open_operations(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            state_path = os.path.join(tmp_dir, "follow.state")
+            stats = synthetic_logs.generate_log(path, 300_000, seed=5)
+
+            self.assertEqual(stats["operations"], len(self._follow(path, state_path)))
+            tracker = dlc_follow.FollowState.load(state_path).tracker
+
+        self.assertEqual([], tracker.completed_ops)
+        self.assertEqual({}, tracker.dlc_op_data)
+        self.assertEqual({}, tracker.ds_transaction_to_dlc_op)
+        self.assertEqual({}, tracker.pivot_transaction_to_dlc_op)
+
+    def test_operation_to_row_formats_times(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(START_LINE.format(id=0) + FINISH_LINE.format(id=0))
+            rows = []
+            dlc_follow.follow_dlc_operations(path, lambda op: rows.append(dlc_analytics.operation_to_row(op)),
+                                             poll_interval_s=0, should_stop=lambda: bool(rows))
+
+        self.assertEqual("2026-01-29 13:41:39.106", rows[0]["start_time"])
+        self.assertEqual("2026-01-29 13:41:48.889", rows[0]["end_time"])
+        self.assertEqual(9783, rows[0]["dlc_duration_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
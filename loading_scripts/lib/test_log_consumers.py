@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import dlc_analytics as dlc
+import log_consumers
+
+
+DLC_START = ("2026-01-29 13:41:39.106 CET [\x1b[34mmain\x1b[0;39m] INFO  c.a.i.d.i.DataLoadControllerService - "
+             "[dlc, transaction] Starting LOAD operation, operation_id=0, on topic [StaticTopic], with scope {}. "
+             "Locking stores: [Scenarios]\n")
+DS_START = ("2026-01-29 13:41:39.108 CET [health] INFO  com.activeviam.apm.health - [datastore, transaction] "
+            "thread=main thread_id=1 event_type=DatastoreTransactionStarted Transaction Started  transaction_id=3 "
+            "on_stores=[Scenarios, Trades]\n")
+AP_START = ("2026-01-29 13:41:48.154 CET [health] INFO  a.s.health-event - [activepivot, transaction] "
+            "event_type=ActivePivotTransactionStartedEvent Pivots = [Sensitivity Cube] ActivePivot transaction 1 "
+            "started, fired by database transaction 3\n")
+AP_DETAIL = "2026-01-29 13:41:48.500 CET [worker] INFO  a.s.pivot - Hierarchy transaction times: 12ms\n"
+AP_COMMIT = ("2026-01-29 13:41:48.758 CET [health] INFO  a.s.health-event - [activepivot, transaction] "
+             "event_type=ActivePivotTransactionCommittedEvent Pivots = [Sensitivity Cube, VaR-ES Cube] "
+             "ActivePivot transaction 1 was successfully committed on epoch 3. total_duration=610ms, "
+             "transaction_duration=32ms, commit_duration={commit}ms\n")
+DS_COMMIT = ("2026-01-29 13:41:48.810 CET [health] INFO  com.activeviam.apm.health - [datastore, transaction] "
+             "thread=main thread_id=1 event_type=DatastoreTransactionCommitted Transaction Committed  "
+             "transaction_id=3 transaction_duration=9702ms commit_duration=665ms\n")
+DLC_FINISH = ("2026-01-29 13:41:48.889 CET [main] INFO  c.a.i.d.i.DataLoadControllerService - [dlc, transaction] "
+              "Finishing LOAD operation, id 0.\n")
+
+
+class TestLogConsumers(unittest.TestCase):
+
+    def _feed(self, consumers, lines):
+        for line in lines:
+            log_consumers.feed_consumers(consumers, line)
+        for consumer in consumers:
+            consumer.finish()
+
+    def test_pivot_commit_stats_groups_by_pivot(self):
+        stats = log_consumers.PivotCommitStats()
+        self._feed([stats], [DLC_START, AP_COMMIT.format(commit=578), AP_COMMIT.format(commit=51), DLC_FINISH])
+
+        self.assertEqual(["Sensitivity Cube", "VaR-ES Cube"], sorted(stats.pivot_data))
+        self.assertEqual([578, 51], [e["commit_duration"] for e in stats.pivot_data["VaR-ES Cube"]])
+
+    def test_store_transaction_stats_filters_by_store(self):
+        trades = log_consumers.StoreTransactionStats(["Trades"])
+        others = log_consumers.StoreTransactionStats(["Sensitivities"])
+        self._feed([trades, others], [DS_START, DS_COMMIT])
+
+        self.assertEqual([("3", {"stores": {"Scenarios", "Trades"}, "transaction_duration": 9702,
+                                 "commit_duration": 665})], trades.matching_transactions())
+        self.assertEqual([], others.matching_transactions())
+
+    def test_slow_pivot_block_filter_dumps_slow_transactions(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, "blocks.log")
+            block_filter = log_consumers.SlowPivotBlockFilter(500, output_file)
+            self._feed([block_filter], [
+                DLC_START, AP_START, AP_DETAIL, AP_COMMIT.format(commit=578), DS_COMMIT,
+                DLC_START, AP_START, AP_COMMIT.format(commit=51), DS_COMMIT,
+            ])
+            with open(output_file) as f:
+                dump = f.read()
+
+        self.assertEqual(1, block_filter.written_transactions)
+        self.assertEqual("\n==================== TRANSACTION ====================\n"
+                         + DLC_START + AP_START + AP_DETAIL + AP_COMMIT.format(commit=578) + DS_COMMIT
+                         + "=====================================================\n\n", dump)
+
+    def test_slow_pivot_block_filter_ignores_the_case(self):
+        lines = [DLC_START.replace("Starting LOAD", "STARTING load"), AP_START.upper(), AP_DETAIL.lower(),
+                 AP_COMMIT.format(commit=578).lower(), DS_COMMIT.upper()]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_file = os.path.join(tmp_dir, "blocks.log")
+            block_filter = log_consumers.SlowPivotBlockFilter(500, output_file)
+            self._feed([block_filter, log_consumers.PivotCommitStats()], lines)
+            with open(output_file) as f:
+                dump = f.read()
+
+        self.assertEqual(1, block_filter.written_transactions)
+        self.assertIn("".join(lines), dump)
+
+    def test_consumers_share_the_extraction_pass(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(DLC_START + DS_START + AP_START + AP_COMMIT.format(commit=578) + DS_COMMIT + DLC_FINISH)
+
+            shared = log_consumers.PivotCommitStats()
+            df = dlc.extract_dlc_operations_from_file(path, consumers=[shared], workers=2)
+            alone = log_consumers.PivotCommitStats()
+            log_consumers.run_consumers(path, [alone])
+
+        self.assertEqual(1, len(df))
+        self.assertEqual(alone.pivot_data, shared.pivot_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+
+import log_sources
+
+
+class TestLogSources(unittest.TestCase):
+
+    def test_resolve_log_paths_orders_rotations_oldest_first(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["nohup.out", "nohup.out.1.gz", "nohup.out.2.gz", "nohup.out.10.gz"]:
+                open(os.path.join(tmp_dir, name), "wb").close()
+
+            paths = log_sources.resolve_log_paths(os.path.join(tmp_dir, "nohup.out*"))
+
+        self.assertEqual(["nohup.out.10.gz", "nohup.out.2.gz", "nohup.out.1.gz", "nohup.out"],
+                         [os.path.basename(path) for path in paths])
+
+    def test_resolve_log_paths_keeps_list_order(self):
+        self.assertEqual(["b.log", "a.log"], log_sources.resolve_log_paths(["b.log", "a.log"]))
+
+    def test_iter_log_lines_streams_compressed_series(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i, opener in enumerate([gzip.open, bz2.open, lzma.open, open]):
+                path = os.path.join(tmp_dir, f"part{i}")
+                with opener(path, "wb") as f:
+                    # the last file line of each part has no newline
+                    f.write(f"line {i}.1\nline {i}.2".encode("utf-8"))
+                paths.append(path)
+
+            self.assertEqual(["gzip", "bz2", "xz", None], [log_sources.compression_of(path) for path in paths])
+            for prefetch in (True, False):
+                with self.subTest(prefetch=prefetch):
+                    lines = list(log_sources.iter_log_lines(paths, prefetch=prefetch))
+                    self.assertEqual(8, len(lines))
+                    # the files but the last are given the newline they lack
+                    self.assertEqual([b"line 0.1\n", b"line 0.2\n", b"line 1.1\n"], lines[:3])
+                    self.assertEqual(b"line 3.2", lines[-1])
+
+    def test_iter_log_lines_stops_early(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "big.log.gz")
+            with gzip.open(path, "wb") as f:
+                f.write((b"x" * 100 + b"\n") * 100000)
+
+            for i, _ in enumerate(log_sources.iter_log_lines([path])):
+                if i == 10:
+                    break
+        self.assertEqual(10, i)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import gzip
+import os
+import tempfile
 import unittest
-from unittest.mock import mock_open, patch
-from log_utils import reduce_log_file, build_time_format_matcher
+from unittest.mock import patch
+from datetime import datetime
+
+from log_utils import TimeWindow, reduce_log_file, build_time_format_matcher, scan_time_window_offsets
 
 
 class TestLogUtils(unittest.TestCase):
@@ -24,55 +29,39 @@ class TestLogUtils(unittest.TestCase):
         self.assertIsNotNone(matcher.match("2023-10-01 12:05:00.456 rest of line"))
         self.assertIsNone(matcher.match("prefix 2023-10-01 12:05:00.456 not at start"))
 
-    @patch("os.path.getsize", return_value=100)
-    @patch("log_utils.Progress")  # Patch progress to avoid terminal output
-    def test_reduce_log_file_single_line(self, mock_progress, mock_getsize):
+    def _reduce(self, sample, start_time, end_time, input_name="input.log", opener=open):
+        """Reduces the sample log written to a temporary file and returns the written lines."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, input_name)
+            output_path = os.path.join(tmp_dir, "output.log")
+            with opener(input_path, "wt", encoding="utf-8") as f:
+                f.write(sample)
+            reduce_log_file(input_path, output_path, start_time, end_time, self.time_format)
+            with open(output_path, encoding="utf-8") as f:
+                return f.readlines()
+
+    @patch("progress.ENABLED", False)  # Disable the progress bars to avoid terminal output
+    def test_reduce_log_file_single_line(self):
         """
         With a single line at the start boundary, it should be written to the output.
         """
-        m_in = mock_open(read_data="2023-10-01 12:00:00.123 Log entry 1\n")
-        m_out = mock_open()
-
-        # First open() is input (read), second is output (write)
-        with patch("builtins.open", side_effect=[m_in.return_value, m_out.return_value]):
-            reduce_log_file(
-                "input.log",
-                "output.log",
-                self.start_time,
-                self.end_time,
-                self.time_format
-            )
-
-        m_out().write.assert_called_with("2023-10-01 12:00:00.123 Log entry 1\n")
-
-    @patch("os.path.getsize", return_value=100)
-    @patch("log_utils.Progress")
-    def test_reduce_log_file_with_multiple_lines(self, mock_progress, mock_getsize):
+        writes = self._reduce("2023-10-01 12:00:00.123 Log entry 1\n", self.start_time, self.end_time)
+
+        self.assertEqual(["2023-10-01 12:00:00.123 Log entry 1\n"], writes)
+
+    @patch("progress.ENABLED", False)
+    def test_reduce_log_file_with_multiple_lines(self):
         """
         Lines within [start, end] are written; lines after end are not.
         """
-        m_in = mock_open(read_data=self.sample_log)
-        m_out = mock_open()
-
-        with patch("builtins.open", side_effect=[m_in.return_value, m_out.return_value]):
-            reduce_log_file(
-                "input.log",
-                "output.log",
-                self.start_time,
-                self.end_time,
-                self.time_format
-            )
-
-        # Collect all write() calls' first positional arg
-        writes = [c.args[0] for c in m_out().write.call_args_list]
+        writes = self._reduce(self.sample_log, self.start_time, self.end_time)
 
         self.assertIn("2023-10-01 12:00:00.123 Log entry 1\n", writes)
         self.assertIn("2023-10-01 12:05:00.456 Log entry 2\n", writes)
         self.assertNotIn("2023-10-01 12:10:00.789 Log entry 3\n", writes)
 
-    @patch("os.path.getsize", return_value=100)
-    @patch("log_utils.Progress")
-    def test_reduce_log_file_non_timestamp_handling(self, mock_progress, mock_getsize):
+    @patch("progress.ENABLED", False)
+    def test_reduce_log_file_non_timestamp_handling(self):
         """
         Non-timestamp lines are:
           - dropped before entering the window,
@@ -90,13 +79,7 @@ class TestLogUtils(unittest.TestCase):
         start_time = "2023-10-01 12:00:00.000"
         end_time = "2023-10-01 12:05:00.000"
 
-        m_in = mock_open(read_data=sample)
-        m_out = mock_open()
-
-        with patch("builtins.open", side_effect=[m_in.return_value, m_out.return_value]):
-            reduce_log_file("input.log", "output.log", start_time, end_time, self.time_format)
-
-        writes = [c.args[0] for c in m_out().write.call_args_list]
+        writes = self._reduce(sample, start_time, end_time)
 
         # BEFORE entering window -> dropped
         self.assertNotIn("BOOT NO TS BEFORE WINDOW\n", writes)
@@ -116,6 +99,98 @@ class TestLogUtils(unittest.TestCase):
         # Line after end (12:06) triggers stop; subsequent lines never written
         self.assertNotIn("THIS LINE SHOULD NOT BE REACHED\n", writes)
 
+    @patch("progress.ENABLED", False)
+    def test_reduce_log_file_seek_matches_linear_scan(self):
+        """
+        Seek mode bisects the file but must keep exactly the lines the linear scan keeps,
+        including untimestamped lines inside the window.
+        """
+        lines = []
+        for minute in range(60):
+            lines.append(f"2023-10-01 12:{minute:02d}:00.000 entry {minute}\n")
+            if minute % 7 == 0:
+                lines.append(f"    at stack.trace.Frame{minute}\n")
+        sample = "".join(lines)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "input.log")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(sample)
+
+            windows = [
+                ("2023-10-01 12:14:30.000", "2023-10-01 12:21:00.000"),
+                ("2023-10-01 11:00:00.000", "2023-10-01 12:03:00.000"),
+                ("2023-10-01 12:58:00.000", "2023-10-01 13:30:00.000"),
+                ("2023-10-01 13:00:00.000", "2023-10-01 14:00:00.000"),
+            ]
+            for start_time, end_time in windows:
+                with self.subTest(start=start_time, end=end_time):
+                    linear_path = os.path.join(tmp_dir, "linear.log")
+                    seek_path = os.path.join(tmp_dir, "seek.log")
+                    reduce_log_file(input_path, linear_path, start_time, end_time, self.time_format)
+                    reduce_log_file(input_path, seek_path, start_time, end_time, self.time_format, seek=True)
+
+                    with open(linear_path, encoding="utf-8") as f:
+                        expected = f.read()
+                    with open(seek_path, encoding="utf-8") as f:
+                        self.assertEqual(expected, f.read())
+
+    @patch("progress.ENABLED", False)
+    def test_reduce_log_file_reads_compressed_input(self):
+        writes = self._reduce(self.sample_log, self.start_time, self.end_time, "input.log.1.gz", gzip.open)
+
+        self.assertEqual(["2023-10-01 12:00:00.123 Log entry 1\n", "2023-10-01 12:05:00.456 Log entry 2\n"], writes)
+
+    @patch("progress.ENABLED", False)
+    def test_reduce_log_file_ends_the_last_line_of_each_file_of_a_series(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            older_path, newer_path = os.path.join(tmp_dir, "x.log.1.gz"), os.path.join(tmp_dir, "x.log")
+            output_path = os.path.join(tmp_dir, "output.log")
+            with gzip.open(older_path, "wt", encoding="utf-8") as f:
+                f.write("2023-10-01 12:00:00.100 a\n2023-10-01 12:00:00.200 b")
+            with open(newer_path, "w", encoding="utf-8") as f:
+                f.write("2023-10-01 12:00:00.300 c\n")
+            reduce_log_file([older_path, newer_path], output_path, "2023-10-01 12:00:00.000",
+                            "2023-10-01 12:01:00.000", self.time_format)
+            with open(output_path, encoding="utf-8") as f:
+                writes = f.readlines()
+
+        self.assertEqual(["2023-10-01 12:00:00.100 a\n", "2023-10-01 12:00:00.200 b\n",
+                          "2023-10-01 12:00:00.300 c\n"], writes)
+
+    def test_scan_time_window_offsets_gives_the_lines_of_time_window(self):
+        lines = [
+            "no timestamp before the window\n",
+            "2023-10-01 12:00:00.000 before\n",
+            "2023-10-01 12:13:99.000 invalid second, ignored\n",
+            "2023-10-01 12:03:00.000 out of order, starts the window\n",
+            "2023-10-01 12:01:00.000 kept inside the window\n",
+            "no timestamp inside the window\n",
+            "2023-10-01 12:04:00.000 inside\n",
+            "2023-10-01 12:09:00.000 out of order, ends the window\n",
+            "2023-10-01 12:04:30.000 after the end\n",
+        ]
+        window = TimeWindow("2023-10-01 12:02:00.000", "2023-10-01 12:05:00.000", self.time_format)
+        expected = []
+        for line in lines:
+            if window.admit(line):
+                expected.append(line)
+            elif window.finished:
+                break
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(lines))
+            with open(path, "rb") as f:
+                start, end = scan_time_window_offsets(f, os.path.getsize(path), datetime(2023, 10, 1, 12, 2),
+                                                      datetime(2023, 10, 1, 12, 5), self.time_format)
+                f.seek(start)
+                scanned = f.read(end - start).decode("utf-8")
+
+        self.assertEqual(4, len(expected))
+        self.assertEqual("".join(expected), scanned)
+
 
 if __name__ == "__main__":
     unittest.main()
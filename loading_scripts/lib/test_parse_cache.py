@@ -0,0 +1,68 @@
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import dlc_analytics as dlc
+import parse_cache
+
+LOG_LINES = [
+    "2026-01-29 13:41:39.106 CET [\x1b[34mmain\x1b[0;39m] \x1b[34mINFO \x1b[0;39m - [dlc, transaction] Starting LOAD "
+    "operation, operation_id=0, on topic [StaticTopic], with scope {}. Locking stores: [Scenarios]\n",
+    "2026-01-29 13:41:40.000 CET [\x1b[34mmain\x1b[0;39m] \x1b[34mINFO \x1b[0;39m - some noise\n",
+    "2026-01-29 13:41:48.889 CET [\x1b[34mmain\x1b[0;39m] \x1b[34mINFO \x1b[0;39m - [dlc, transaction] Finishing LOAD "
+    "operation, id 0.\n",
+]
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "Parquet support (pyarrow) is not installed")
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp_dir.name, "nohup.out")
+        self.cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            f.writelines(LOG_LINES)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_second_run_loads_from_cache(self):
+        first = dlc.extract_dlc_operations_from_file(self.input_path, cache_dir=self.cache_dir)
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        with patch.object(dlc, "_extract_dlc_operations", side_effect=AssertionError("log parsed again")):
+            second = dlc.extract_dlc_operations_from_file(self.input_path, cache_dir=self.cache_dir)
+
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_slow_operations_are_written_from_cache(self):
+        dlc.extract_dlc_operations_from_file(self.input_path, cache_dir=self.cache_dir)
+        output_path = os.path.join(self.tmp_dir.name, "slow.log")
+
+        with patch.object(dlc, "_extract_dlc_operations", side_effect=AssertionError("log parsed again")):
+            dlc.extract_dlc_operations_from_file(self.input_path, threshold_ms=1000, output_log_path=output_path,
+                                                 cache_dir=self.cache_dir)
+
+        with open(output_path, encoding="utf-8") as f:
+            self.assertTrue(f.read().endswith("".join(LOG_LINES)))
+
+    def test_cache_key_changes_with_content_and_window(self):
+        key = parse_cache.cache_path(self.cache_dir, self.input_path, dlc.PARSER_VERSION)
+        self.assertNotEqual(key, parse_cache.cache_path(self.cache_dir, self.input_path, dlc.PARSER_VERSION + 1))
+        self.assertNotEqual(key, parse_cache.cache_path(self.cache_dir, self.input_path, dlc.PARSER_VERSION,
+                                                        start_time="2026-01-29 13:00:00.000"))
+
+        time.sleep(0.01)
+        with open(self.input_path, "a", encoding="utf-8") as f:
+            f.write(LOG_LINES[1])
+        self.assertNotEqual(key, parse_cache.cache_path(self.cache_dir, self.input_path, dlc.PARSER_VERSION))
+
+
+if __name__ == "__main__":
+    unittest.main()
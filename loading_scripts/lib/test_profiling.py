@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+import dlc_analytics as dlc
+import profiling
+
+TEST_LINES = [
+    "2026-01-29 13:00:00.000 CET [dlc-thread-1] INFO  DLC - [dlc, transaction] Starting LOAD operation, "
+    "operation_id=1, on topic [TradeTopic], with scope {}.  Locking stores: [Trades]\n",
+    "2026-01-29 13:00:00.500 CET [worker-1] INFO  CSV - noise\n",
+    "2026-01-29 13:00:01.000 CET [dlc-thread-1] INFO  DLC - Finishing LOAD operation, id 1.\n",
+]
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_helpers_are_no_ops_without_profiler(self):
+        lines = iter(TEST_LINES)
+        self.assertIs(lines, profiling.counted(lines, "log"))
+        with profiling.stage("parse"):
+            pass
+        profiling.record_input("log", size=10)
+
+    def test_profiles_extraction_and_restores_patterns(self):
+        original_pattern = dlc.DLC_START_EVENT
+        original_parse = dlc.parse_log_line
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "test.log")
+            with open(path, "w") as f:
+                f.writelines(TEST_LINES)
+
+            with profiling.Profiler() as profiler:
+                profiler.instrument_patterns(dlc, dlc.PROFILED_PATTERNS)
+                profiler.instrument_calls(dlc, "parse_log_line", "parse_log_line")
+                frame = dlc.extract_dlc_operations_from_file(path)
+
+            profile_path = os.path.join(tmp_dir, "profile", "profile.json")
+            profiler.save_json(profile_path)
+            with open(profile_path) as f:
+                saved = json.load(f)
+
+        self.assertEqual(1, len(frame))
+        self.assertIs(original_pattern, dlc.DLC_START_EVENT)
+        self.assertIs(original_parse, dlc.parse_log_line)
+        self.assertEqual({"lines": 3, "bytes": sum(len(line) for line in TEST_LINES)}, profiler.inputs["log"])
+        self.assertEqual(1, profiler.stages["parse"]["calls"])
+        self.assertEqual(1, profiler.calls["DLC_START_EVENT"].calls)
+        self.assertEqual(1, profiler.calls["DLC_START_EVENT"].hits)
+        self.assertEqual(3, profiler.calls["parse_log_line"].calls)
+        self.assertEqual(3, saved["calls"]["parse_log_line"]["calls"])
+        self.assertIn("DLC_START_EVENT", set(profiler.calls_frame()["Pattern/function"]))
+
+    def test_timed_finditer_counts_matches(self):
+        with profiling.Profiler() as profiler:
+            patterns = profiler._timed_patterns(dlc.BYTES_LINE_LOCATORS, "locators")
+            matches = list(patterns[1].finditer(b"event_type=a event_type=b"))
+
+        self.assertEqual(2, len(matches))
+        self.assertEqual(1, profiler.calls["locators[1]"].calls)
+        self.assertEqual(2, profiler.calls["locators[1]"].hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import log_sources
+import progress
+
+
+class TestProgress(unittest.TestCase):
+
+    def test_watching_follows_files_one_after_the_other(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i, size in enumerate([1000, 2500]):
+                path = os.path.join(tmp_dir, f"file{i}")
+                with open(path, "wb") as f:
+                    f.write(b"x" * size)
+                paths.append(path)
+
+            with progress.ProgressTracker("test", total=3500, enabled=True, interval_s=0.01) as tracker:
+                tracker.console.quiet = True
+                for path in paths:
+                    with open(path, "rb") as f, tracker.watching(f):
+                        f.read()
+
+        self.assertEqual(3500, tracker.position)
+
+    def test_disabled_tracker_does_not_call_total(self):
+        def total():
+            raise AssertionError("total computed for a disabled bar")
+
+        with progress.ProgressTracker("test", total=total, enabled=False) as tracker:
+            tracker.advance(10)
+        self.assertEqual(10, tracker.position)
+
+    def test_iter_log_lines_reports_bytes_read_from_disk(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = [os.path.join(tmp_dir, "nohup.out.1.gz"), os.path.join(tmp_dir, "nohup.out")]
+            with gzip.open(paths[0], "wb") as f:
+                f.write(b"old line\n" * 1000)
+            with open(paths[1], "wb") as f:
+                f.write(b"new line\n" * 1000)
+
+            for prefetch in (True, False):
+                with self.subTest(prefetch=prefetch):
+                    tracker = progress.ProgressTracker("test", enabled=False)
+                    lines = list(log_sources.iter_log_lines(paths, prefetch=prefetch, progress=tracker))
+                    self.assertEqual(2000, len(lines))
+                    self.assertEqual(log_sources.disk_size(paths), tracker.position)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import dlc_analytics as dlc
+import report_writer
+
+LOG_LINES = [
+    "2026-01-29 13:41:39.106 CET [main] INFO  - [dlc, transaction] Starting LOAD operation, operation_id={id}, "
+    "on topic [{topic}], with scope {{}}. Locking stores: [Scenarios]\n",
+    "2026-01-29 13:41:48.889 CET [main] INFO  - [dlc, transaction] Finishing LOAD operation, id {id}.\n",
+]
+
+
+class TestReportWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmp_dir.name, "nohup.out")
+        with open(self.input_path, "w", encoding="utf-8") as f:
+            for i in range(25):
+                f.write("".join(line.format(id=i, topic=f"Topic{i % 3}") for line in LOG_LINES))
+        self.operations = dlc._extract_dlc_operations([self.input_path])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_csv_with_compression(self):
+        writer = report_writer.ReportWriter(os.path.join(self.tmp_dir.name, "out"), compression="gzip")
+        frame = dlc.operations_to_frame(self.operations)
+
+        path = writer.write("dlc_operations_report", frame)
+
+        self.assertTrue(path.endswith("dlc_operations_report.csv.gz"))
+        self.assertEqual([path], writer.written)
+        self.assertEqual(list(frame[dlc.OPERATION_ID]), list(pd.read_csv(path)[dlc.OPERATION_ID]))
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "Parquet support (pyarrow) is not installed")
+    def test_columnar_formats_keep_column_types(self):
+        frame = dlc.operations_to_frame(self.operations)
+        for report_format, read in [(report_writer.FORMAT_PARQUET, pd.read_parquet),
+                                    (report_writer.FORMAT_FEATHER, pd.read_feather)]:
+            with self.subTest(report_format=report_format):
+                writer = report_writer.ReportWriter(os.path.join(self.tmp_dir.name, report_format), report_format)
+                pd.testing.assert_frame_equal(frame, read(writer.write("dlc_operations_report", frame)))
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "Parquet support (pyarrow) is not installed")
+    def test_operation_writer_streams_batches(self):
+        expected = dlc.operations_to_frame(self.operations)
+        for report_format, read in [(report_writer.FORMAT_PARQUET, pd.read_parquet),
+                                    (report_writer.FORMAT_FEATHER, pd.read_feather)]:
+            with self.subTest(report_format=report_format):
+                writer = report_writer.ReportWriter(os.path.join(self.tmp_dir.name, report_format), report_format)
+                with writer.operation_writer("dlc_operations_report") as write_operation:
+                    # the second batch adds a topic to the categories of the first one
+                    write_operation.batch_size = 2
+                    for op in self.operations:
+                        write_operation(op)
+
+                # the column types of the batch mode reports
+                pd.testing.assert_frame_equal(expected, read(writer.written[-1]), check_categorical=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import random
+import statistics
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import dlc_analytics as dlc
+import streaming_stats
+import synthetic_logs
+
+
+class TestStreamingStats(unittest.TestCase):
+
+    def test_running_stats_match_batch_stats_and_merge(self):
+        rng = random.Random(7)
+        values = [rng.expovariate(1 / 800) for _ in range(1000)]
+        first, second = streaming_stats.RunningStats(), streaming_stats.RunningStats()
+        for value in values[:300]:
+            first.add(value)
+        for value in values[300:]:
+            second.add(value)
+        first.merge(second)
+
+        self.assertEqual(1000, first.count)
+        self.assertEqual(min(values), first.min)
+        self.assertEqual(max(values), first.max)
+        self.assertAlmostEqual(statistics.mean(values), first.mean)
+        self.assertAlmostEqual(statistics.variance(values), first.variance, delta=1e-6 * first.variance)
+
+    def test_quantile_sketch_is_within_relative_accuracy(self):
+        rng = random.Random(11)
+        values = sorted(rng.lognormvariate(6, 1.5) for _ in range(20000))
+        sketch, other = streaming_stats.QuantileSketch(), streaming_stats.QuantileSketch()
+        for i, value in enumerate(values):
+            (sketch if i % 2 else other).add(value)
+        sketch.merge(other)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(exact, sketch.quantile(q), delta=exact * 0.02)
+
+    def test_quantile_sketch_counts_zero_durations(self):
+        sketch = streaming_stats.QuantileSketch()
+        for value in [0, 0, 0, 100]:
+            sketch.add(value)
+        self.assertEqual(0, sketch.quantile(0.5))
+        self.assertIsNone(streaming_stats.QuantileSketch().quantile(0.5))
+
+    def test_stream_dlc_operations_keeps_no_operation(self):
+        lines = [
+            "2026-01-29 13:41:39.106 CET [main] INFO  c.a.i.d.i.DataLoadControllerService - [dlc, transaction] "
+            "Starting LOAD operation, operation_id={id}, on topic [{topic}], with scope {{}}. Locking stores: [S]\n",
+            "2026-01-29 13:41:4{id}.889 CET [main] INFO  c.a.i.d.i.DataLoadControllerService - [dlc, transaction] "
+            "Finishing LOAD operation, id {id}.\n",
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            csv_path = os.path.join(tmp_dir, "operations.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                for i, topic in enumerate(["A", "B", "A"]):
+                    f.write("".join(line.format(id=i, topic=topic) for line in lines))
+
+            stats = streaming_stats.DlcStreamingStats()
+            with dlc.CsvOperationWriter(csv_path) as writer:
+                def on_operation(op):
+                    stats.add(op)
+                    writer(op)
+                dlc.stream_dlc_operations(path, on_operation)
+
+            rows = pd.read_csv(csv_path)
+            frame = dlc.extract_dlc_operations_from_file(path)
+
+        self.assertEqual([0, 1, 2], list(rows[dlc.OPERATION_ID]))
+        self.assertEqual(list(frame[dlc.DLC_DURATION_MS]), list(rows[dlc.DLC_DURATION_MS]))
+
+        summary = stats.to_frame()
+        dlc_rows = summary[summary['Metric'] == 'DCL operation duration'].set_index('Topic')
+        self.assertEqual(['ALL', 'A', 'B'], list(dlc_rows.index))
+        self.assertEqual(3, dlc_rows.loc['ALL', 'Count'])
+        self.assertEqual(2, dlc_rows.loc['A', 'Count'])
+        self.assertEqual(frame[dlc.DLC_DURATION_MS].max(), dlc_rows.loc['ALL', 'Max (ms)'])
+
+    def test_slowest_operations_match_nlargest(self):
+        rng = random.Random(3)
+        df = pd.DataFrame({
+            dlc.OPERATION_ID: range(200),
+            dlc.OPERATION_TYPE: "LOAD",
+            dlc.TOPIC: "StaticTopic",
+            dlc.LOCKED_STORES: [rng.choice(["A", "B"]) for _ in range(200)],
+            dlc.PIVOT_TRANSACTION_ID: range(1000, 1200),
+            # few distinct values, so that ties decide which rows are kept
+            dlc.DLC_DURATION_MS: [rng.randint(0, 20) for _ in range(200)],
+            dlc.AP_TRANSACTION_DURATION_MS: [rng.randint(0, 20) for _ in range(200)],
+            dlc.AP_COMMIT_DURATION_MS: [rng.randint(0, 20) for _ in range(200)],
+            dlc.DS_COMMIT_DURATION_MS: [rng.randint(0, 20) for _ in range(200)],
+        })
+
+        slowest = streaming_stats.SlowestOperations(n=7, extra_metrics=[dlc.DS_COMMIT_DURATION_MS])
+        for row in df.itertuples(index=False):
+            slowest.add(row)
+        reports = slowest.reports()
+
+        expected = dlc.get_n_slowest_operations(df, n=7)
+        expected[f"slowest_{dlc.DS_COMMIT_DURATION_MS}"] = df.nlargest(7, dlc.DS_COMMIT_DURATION_MS)[
+            [dlc.OPERATION_ID, dlc.OPERATION_TYPE, dlc.TOPIC, dlc.DS_COMMIT_DURATION_MS]]
+        self.assertEqual(list(expected), list(reports))
+        for report_name, frame in expected.items():
+            with self.subTest(report=report_name):
+                pd.testing.assert_frame_equal(frame.reset_index(drop=True), reports[report_name])
+
+    def test_stream_dlc_operations_releases_the_finished_operations(self):
+        trackers = []
+
+        def tracker(*args, **kwargs):
+            trackers.append(tracker_class(*args, **kwargs))
+            return trackers[-1]
+
+        tracker_class = dlc.DlcOperationTracker
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            stats = synthetic_logs.generate_log(path, 300_000, seed=3)
+            operations = []
+            with patch.object(dlc, "DlcOperationTracker", side_effect=tracker):
+                dlc.stream_dlc_operations(path, operations.append)
+
+        self.assertEqual(stats["operations"], len(operations))
+        self.assertTrue(any(op.pivots for op in operations))
+        self.assertEqual({}, trackers[0].ds_transaction_to_dlc_op)
+        self.assertEqual({}, trackers[0].pivot_transaction_to_dlc_op)
+        self.assertEqual({}, trackers[0].dlc_op_data)
+
+    def test_stream_dlc_operations_writes_the_slow_operations_of_the_batch_mode(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "input.log")
+            synthetic_logs.generate_log(path, 300_000, seed=4)
+            batch_output, stream_output = os.path.join(tmp_dir, "batch.log"), os.path.join(tmp_dir, "stream.log")
+            frame = dlc.extract_dlc_operations_from_file(path, threshold_ms=1000, output_log_path=batch_output)
+            dlc.stream_dlc_operations(path, lambda op: None, threshold_ms=1000, output_log_path=stream_output)
+
+            with open(batch_output, "rb") as batch, open(stream_output, "rb") as stream:
+                batch_lines, stream_lines = batch.read(), stream.read()
+
+        self.assertTrue(0 < (frame[dlc.DLC_DURATION_MS] >= 1000).sum() < len(frame))
+        self.assertEqual(batch_lines, stream_lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
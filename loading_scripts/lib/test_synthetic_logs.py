@@ -0,0 +1,58 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import dlc_analytics as dlc
+import synthetic_logs
+
+
+class TestSyntheticLogs(unittest.TestCase):
+
+    def test_generate_log_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            contents = []
+            for name in ("a.log", "b.log"):
+                path = os.path.join(tmp_dir, name)
+                synthetic_logs.generate_log(path, 200_000, seed=7)
+                with open(path, "rb") as f:
+                    contents.append(f.read())
+
+            self.assertEqual(contents[0], contents[1])
+
+    def test_generated_operations_are_extracted(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "synthetic.log")
+            stats = synthetic_logs.generate_log(path, 500_000, seed=3)
+
+            self.assertEqual(stats["bytes"], os.path.getsize(path))
+            text = dlc.extract_dlc_operations_from_file(path, output_log_path=os.path.join(tmp_dir, "slow.log"))
+            mmap = dlc.extract_dlc_operations_from_file(path, output_log_path=os.path.join(tmp_dir, "slow.log"),
+                                                        engine="mmap")
+
+        self.assertGreater(stats["operations"], 0)
+        self.assertEqual(stats["operations"], len(text))
+        self.assertTrue(text.equals(mmap))
+
+    def test_generate_csv_tree(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stats = synthetic_logs.generate_csv_tree(tmp_dir, 100_000, files=4, distinct_keys=50)
+
+            rows = 0
+            keys = set()
+            for directory, _, files in os.walk(tmp_dir):
+                for name in files:
+                    with open(os.path.join(directory, name), newline="", encoding="utf-8") as f:
+                        reader = csv.reader(f)
+                        header = next(reader)
+                        for row in reader:
+                            self.assertEqual(len(header), len(row))
+                            keys.add(row[header.index("tradeKey")])
+                            rows += 1
+
+        self.assertEqual(stats["rows"], rows)
+        self.assertLessEqual(len(keys), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime
+
+from timestamps import TimestampParser, datetime_to_epoch_ms
+
+
+class TestTimestamps(unittest.TestCase):
+
+    def test_to_epoch_ms_matches_strptime(self):
+        parser = TimestampParser("%Y-%m-%d %H:%M:%S.%f")
+        for timestamp in ["1970-01-01 00:00:00.000", "2026-01-29 13:41:39.106", "2024-02-29 23:59:59.999",
+                          "2026-01-29 13:41:39.107 CET [main] rest of the line"]:
+            with self.subTest(timestamp=timestamp):
+                expected = datetime_to_epoch_ms(datetime.strptime(timestamp[:23], "%Y-%m-%d %H:%M:%S.%f"))
+                self.assertEqual(expected, parser.to_epoch_ms(timestamp))
+
+    def test_to_epoch_ms_within_the_same_second(self):
+        parser = TimestampParser()
+        self.assertEqual(883, parser.to_epoch_ms("2026-01-29 13:41:48.889") -
+                         parser.to_epoch_ms("2026-01-29 13:41:48.006"))
+        self.assertEqual(9783, parser.to_epoch_ms("2026-01-29 13:41:48.889") -
+                         parser.to_epoch_ms("2026-01-29 13:41:39.106"))
+
+    def test_to_epoch_ms_honours_the_separator(self):
+        comma_parser = TimestampParser("%Y-%m-%d %H:%M:%S,%f")
+        dot_parser = TimestampParser("%Y-%m-%d %H:%M:%S.%f")
+        self.assertEqual(dot_parser.to_epoch_ms("2026-01-29 13:41:39.106"),
+                         comma_parser.to_epoch_ms("2026-01-29 13:41:39,106"))
+        with self.assertRaises(ValueError):
+            comma_parser.to_epoch_ms("2026-01-29 13:41:39.106")
+
+    def test_to_epoch_ms_rejects_invalid_timestamps(self):
+        parser = TimestampParser()
+        for timestamp in ["2026-13-29 13:41:39.106", "2026-01-29 25:41:39.106", "2026-01-29 13:41:39.1x6",
+                          "2026-01-29T13:41:39.106", "not a timestamp"]:
+            with self.subTest(timestamp=timestamp):
+                with self.assertRaises(ValueError):
+                    parser.to_epoch_ms(timestamp)
+
+
+if __name__ == "__main__":
+    unittest.main()
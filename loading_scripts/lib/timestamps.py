@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta
+
+"""
+Fast parsing of the fixed-layout timestamps at the start of the log lines: 'YYYY-MM-DD HH:MM:SS.mmm'
+"""
+
+# Length of a timestamp with millisecond precision
+TIMESTAMP_LENGTH = 23
+# Length of the date/second prefix, shared by consecutive lines most of the time
+SECOND_PREFIX_LENGTH = 19
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1)
+
+
+def datetime_to_epoch_ms(dt: datetime) -> int:
+    """Converts a naive datetime to integer epoch milliseconds, on the same scale as TimestampParser."""
+    days = dt.toordinal() - _EPOCH_ORDINAL
+    return ((days * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second) * 1000) + dt.microsecond // 1000
+
+
+def epoch_ms_to_str(epoch_ms: int) -> str:
+    """Formats epoch milliseconds back to a 'YYYY-MM-DD HH:MM:SS.mmm' timestamp."""
+    return (_EPOCH + timedelta(milliseconds=epoch_ms)).isoformat(sep=' ', timespec='milliseconds')
+
+
+class TimestampParser:
+    """
+    Parses 'YYYY-MM-DD HH:MM:SS<sep>mmm' timestamps into integer epoch milliseconds by slicing the
+    fixed-width digit fields, instead of going through strptime or pd.to_datetime.
+    The separator before the milliseconds is taken from time_format, like build_time_format_matcher does.
+    The epoch of the last date/second prefix is cached, so lines within the same second only parse the millis.
+    Timestamps are naive: no time zone conversion is applied.
+    """
+
+    def __init__(self, time_format='%Y-%m-%d %H:%M:%S.%f'):
+        self.separator = ',' if ',' in time_format else '.'
+        self._cached_prefix = None
+        self._cached_prefix_ms = 0
+        self._day_ordinals = {}
+
+    def to_epoch_ms(self, timestamp: str) -> int:
+        """Returns the epoch milliseconds of the timestamp at the start of the string, or raises ValueError."""
+        prefix = timestamp[:SECOND_PREFIX_LENGTH]
+        if prefix != self._cached_prefix:
+            self._cached_prefix_ms = self._parse_second_prefix(prefix)
+            self._cached_prefix = prefix
+
+        millis = timestamp[SECOND_PREFIX_LENGTH + 1:TIMESTAMP_LENGTH]
+        if timestamp[SECOND_PREFIX_LENGTH:SECOND_PREFIX_LENGTH + 1] != self.separator or len(millis) != 3 \
+                or not millis.isdigit():
+            raise ValueError(f"Invalid timestamp: {timestamp[:TIMESTAMP_LENGTH]!r}")
+        return self._cached_prefix_ms + int(millis)
+
+    def _parse_second_prefix(self, prefix: str) -> int:
+        if len(prefix) != SECOND_PREFIX_LENGTH or prefix[4] != '-' or prefix[7] != '-' or prefix[10] != ' ' \
+                or prefix[13] != ':' or prefix[16] != ':':
+            raise ValueError(f"Invalid timestamp: {prefix!r}")
+
+        day = prefix[:10]
+        day_ordinal = self._day_ordinals.get(day)
+        if day_ordinal is None:
+            # date() validates the year, month and day fields
+            day_ordinal = date(int(day[:4]), int(day[5:7]), int(day[8:10])).toordinal() - _EPOCH_ORDINAL
+            self._day_ordinals[day] = day_ordinal
+
+        hour, minute, second = int(prefix[11:13]), int(prefix[14:16]), int(prefix[17:19])
+        if hour > 23 or minute > 59 or second > 59:
+            raise ValueError(f"Invalid timestamp: {prefix!r}")
+        return (day_ordinal * 86400 + hour * 3600 + minute * 60 + second) * 1000
@@ -1,4 +1,10 @@
 import lib.dlc_analytics as dlc
+import lib.dlc_follow as follow
+import lib.log_consumers as consumers
+import lib.profiling as profiling
+import lib.progress as progress
+import lib.report_writer as report_writer
+import lib.streaming_stats as streaming_stats
 import lib.log_utils as lu
 import argparse
 import os
@@ -28,92 +34,250 @@ def run_analysis():
     parser.add_argument("-cf", "--config", default=None, help="Path to YAML configuration file.")
 
 
-    parser.add_argument("-i", "--input", required=False, help="Path to the input log file.")
+    parser.add_argument("-i", "--input", required=False, nargs='+', help="Path to the input log file, or the files (or glob pattern) of a rotated log series, oldest first. Gzip, bz2, xz and zstd files are read as is.")
     parser.add_argument("-t", "--threshold", type=int, default=None, help="Threshold in milliseconds for buffering log lines.")
     parser.add_argument("-o", "--output_log", default=None, help="Path to output log file for buffered lines.")
-    parser.add_argument("-c", "--csv_output", default=None, help="Path to output CSV file for DLC statistics.")
+    parser.add_argument("-c", "--csv_output", default=None, help="Name of the DLC summary statistics report, written to the output directory in the report format (default: dlc_summary_stats).")
+    parser.add_argument("--output_dir", default="output", help="Directory of the reports.")
+    parser.add_argument("--report_format", choices=report_writer.FORMATS, default=report_writer.FORMAT_CSV, help="Format of the reports: csv, or parquet/feather to keep the column types and load them back quickly.")
+    parser.add_argument("--compression", default=None, help="Compression of the reports: gzip for csv, snappy/gzip/zstd for parquet, lz4/zstd for feather.")
     parser.add_argument("-n", "--top_n", type=int, default=5, help="Number of slowest operations to report.")
+    parser.add_argument("--top_metrics", nargs='+', default=[], choices=[dlc.DS_TRANSACTION_DURATION_MS, dlc.DS_COMMIT_DURATION_MS], help="Additional metrics to report the top n slowest operations of.")
+    parser.add_argument("--engine", choices=dlc.ENGINES, default=dlc.ENGINE_TEXT, help="Log parsing engine: 'text' decodes every line, 'mmap' scans the memory-mapped file with bytes patterns.")
+    parser.add_argument("--cache_dir", default=None, help="Directory of the parse cache: reruns on an unchanged log load the extracted operations from it instead of parsing the log.")
+    parser.add_argument("--streaming", action='store_true', help="Aggregate the operations as they complete and write them to the report incrementally, in constant memory, instead of building the operations DataFrame.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of processes used to parse the log file. The time window is the one of the sequential pass, from the first timestamp inside it to the first one after it, so out-of-order lines give the same operations.")
+    parser.add_argument("--profile", action='store_true', help="Time the stages and the hot path patterns of the run, and print the profile with the bytes and lines read and the peak memory.")
+    parser.add_argument("--profile_output", default=None, help="JSON file of the profile (default: profile.json in the output directory).")
+    parser.add_argument("--no_progress", action='store_true', help="Do not show the progress bars, e.g. in batch runs.")
     parser.add_argument("-tf","--time_format", required=False, default="%Y-%m-%d %H:%M:%S.%f", help="Timestamp format in the log file.")
 
 
     # file reduction arguments
     parser.add_argument("-s", "--start_time", default=None, help="Start time for log reduction (format: 'YYYY-MM-DD HH:MM:SS,mmm').")
     parser.add_argument("-e", "--end_time", default=None, help="End time for log reduction (format: 'YYYY-MM-DD HH:MM:SS,mmm').")
-    parser.add_argument("--keep_reduced", action='store_true', help="Flag to keep the reduced log file after analysis.")
+    parser.add_argument("--keep_reduced", action='store_true', help="Write the reduced log file to disk and analyze it, instead of filtering the time window while extracting.")
+    parser.add_argument("--seek", action='store_true', help="Bisect the log file to find the time window of --keep_reduced instead of scanning it (requires time-ordered logs).")
 
-    args, remaining = parser.parse_known_args()
+    # analyses run in the same pass as the DLC extraction
+    parser.add_argument("--pivot_stats", action='store_true', help="Also report the ActivePivot commit duration stats per pivot.")
+    parser.add_argument("--store_stats", nargs='+', default=None, metavar="STORE", help="Also report the stats of the datastore transactions on at least one of these stores.")
+    parser.add_argument("--pivot_block_threshold", type=int, default=None, help="Also dump the DLC transactions with a pivot commit of at least this many milliseconds.")
+    parser.add_argument("--pivot_block_output", default="slow_pivot_blocks.log", help="Output file of the slow pivot block dump.")
+
+    # live analysis arguments
+    parser.add_argument("-f", "--follow", action='store_true', help="Tail the input log and report each DLC operation as soon as it finishes, until interrupted.")
+    parser.add_argument("--follow_output", default=None, help="CSV file the operations reported in follow mode are appended to.")
+    parser.add_argument("--follow_state", default=None, help="File where follow mode saves its offset and state, so that a restart resumes without rereading the log.")
+
+    args, _ = parser.parse_known_args()
 
     config_to_use = args.config if args.config else default_config_path
 
     print(f"current working directory: {os.getcwd()}")
     print(f"Using configuration file: {config_to_use}")
     config = load_config(config_to_use)
-    for key, value in config.items():
-         parser.set_defaults(**{key: value})
-
-
-
-    args = parser.parse_args(remaining)
+    # the config replaces the defaults, the options given on the command line override it
+    parser.set_defaults(**config)
+    args = parser.parse_args()
 
     if not args.input:
         parser.error("You must provide --input or specify 'input' in the config file")
-
-    analysis_input_file = args.input
+    if args.seek and not args.keep_reduced:
+        parser.error("--seek bisects the log to write the reduced file, it requires --keep_reduced")
+    if args.streaming:
+        # the streamed pass is sequential, with the text engine, and builds no frame to cache
+        if args.workers > 1 or args.engine != dlc.ENGINE_TEXT or args.cache_dir:
+            parser.error("--streaming cannot be combined with --workers, --engine mmap or --cache_dir")
+
+    # a single path or glob from the config, or the paths of a log series
+    inputs = args.input if isinstance(args.input, list) else [args.input]
+    input_file = inputs[0] if len(inputs) == 1 else inputs
+    progress.ENABLED = not args.no_progress
+
+    profiler = start_profiler() if args.profile else None
+    try:
+        analyze(args, inputs, input_file)
+    finally:
+        if profiler:
+            stop_profiler(args, profiler)
+
+
+def analyze(args, inputs, input_file):
+    if args.follow:
+        follow_log_file(args, input_file)
+        return
+
+    analysis_input_file = input_file
+    window = {}
 
     if args.start_time and args.end_time:
-        print(f"Reducing log file between {args.start_time} and {args.end_time}...")
-        reduced_log_file = f"reduced_log_{os.path.basename(args.input)}"
-        lu.reduce_log_file(
-            args.input,
-            reduced_log_file,
-            args.start_time,
-            args.end_time,
-            time_format=args.time_format
-        )
+        if args.keep_reduced:
+            print(f"Reducing log file between {args.start_time} and {args.end_time}...")
+            reduced_log_file = f"reduced_log_{os.path.basename(inputs[-1])}"
+            with profiling.stage('reduce'):
+                lu.reduce_log_file(
+                    input_file,
+                    reduced_log_file,
+                    args.start_time,
+                    args.end_time,
+                    time_format=args.time_format,
+                    seek=args.seek
+                )
 
-        analysis_input_file = reduced_log_file
+            analysis_input_file = reduced_log_file
+        else:
+            # filter the time window while extracting, without writing a reduced copy of the log
+            window = dict(start_time=args.start_time, end_time=args.end_time)
 
 
+    log_consumers = build_log_consumers(args)
+
+    if args.streaming:
+        stream_analysis(args, analysis_input_file, window, log_consumers)
+        return
+
+    slowest = streaming_stats.SlowestOperations(args.top_n, extra_metrics=args.top_metrics)
+
     print("Extracting DLC operations from log file...")
 
-    df = dlc.extract_dlc_operations_from_file(analysis_input_file, threshold_ms=args.threshold, output_log_path=args.output_log)
+    with profiling.stage('extraction'):
+        df = dlc.extract_dlc_operations_from_file(analysis_input_file, threshold_ms=args.threshold,
+                                                  output_log_path=args.output_log, time_format=args.time_format,
+                                                  workers=args.workers, engine=args.engine,
+                                                  cache_dir=args.cache_dir, consumers=log_consumers,
+                                                  on_operation=slowest.add, **window)
+    writer = build_report_writer(args)
     if df.empty:
         print("No DLC operations found in the log file.")
 
     else:
+        with profiling.stage('stats'):
+            summary_stats = dlc.compute_dlc_stats(df)
+        print("DLC Operations Summary Statistics:")
+        print(summary_stats.to_string(index=False))
 
-        #extract operation data to csv
-        df_sorted = df.sort_values(by=dlc.START_TIME, ascending=False)
-        df_sorted.to_csv("dlc_operations_report.csv", index=False)
-
-
-        summary_stats = dlc.compute_dlc_stats(df)
+        reports = slowest.reports()
+        print_slowest_reports(reports)
+
+        with profiling.stage('reports'):
+            # each report is serialized once, the operations most recent first
+            output_file = writer.write("dlc_operations_report", df.sort_values(by=dlc.START_TIME, ascending=False))
+            print(f"\nDetailed DLC operations report saved to {output_file}")
+            write_summary_and_slowest_reports(args, writer, summary_stats, reports)
+
+    for log_consumer in log_consumers:
+        log_consumer.report()
+
+
+def print_slowest_reports(reports):
+    titles = {
+        'slowest_dlc_operations': "Top n Slowest DLC Operations:",
+        'slowest_transactions': "Top n Slowest Transactions:",
+        'slowest_commits': "Top n Slowest Commits:",
+    }
+    for report_name, report in reports.items():
+        print(f"\n{titles.get(report_name, f'Top n {report_name}:')}")
+        print(report.to_string(index=False))
+
+
+def stream_analysis(args, input_file, window, log_consumers):
+    """Streams the operations of the log into the summary stats and the detailed report, see streaming_stats."""
+    stats = streaming_stats.DlcStreamingStats()
+    slowest = streaming_stats.SlowestOperations(args.top_n, extra_metrics=args.top_metrics)
+    writer = build_report_writer(args)
+
+    print("Streaming DLC operations from log file...")
+    with writer.operation_writer("dlc_operations_report") as write_operation:
+        def on_operation(op):
+            stats.add(op)
+            slowest.add(op)
+            write_operation(op)
+
+        dlc.stream_dlc_operations(input_file, on_operation, time_format=args.time_format, consumers=log_consumers,
+                                  threshold_ms=args.threshold, output_log_path=args.output_log, **window)
+    print(f"Detailed DLC operations report saved to {writer.written[-1]}")
+
+    summary_stats = stats.to_frame()
+    if summary_stats.empty:
+        print("No DLC operations found in the log file.")
+    else:
         print("DLC Operations Summary Statistics:")
         print(summary_stats.to_string(index=False))
+        reports = slowest.reports()
+        print_slowest_reports(reports)
+        with profiling.stage('reports'):
+            write_summary_and_slowest_reports(args, writer, summary_stats, reports)
+
+    for log_consumer in log_consumers:
+        log_consumer.report()
+
 
-        reports = dlc.get_n_slowest_operations(df, n=args.top_n)
-        print("\nTop n Slowest DLC Operations:")
-        print(reports['slowest_dlc_operations'].to_string(index=False))
-        print("\nTop n Slowest Transactions:")
-        print(reports['slowest_transactions'].to_string(index=False))
-        print("\nTop n Slowest Commits:")
-        print(reports['slowest_commits'].to_string(index=False))
+def start_profiler():
+    """Starts profiling the run and times the hot path of the parse, see lib/profiling.py."""
+    profiler = profiling.Profiler().start()
+    profiler.instrument_patterns(dlc, dlc.PROFILED_PATTERNS)
+    profiler.instrument_calls(dlc, 'parse_log_line', 'parse_log_line')
+    profiler.instrument_calls(dlc.DlcOperationTracker, 'apply', 'DlcOperationTracker.apply')
+    profiler.instrument_calls(dlc.TimestampParser, 'to_epoch_ms', 'TimestampParser.to_epoch_ms')
+    profiler.instrument_calls(lu.TimeWindow, 'admit', 'TimeWindow.admit')
+    profiler.instrument_calls(consumers, 'feed_consumers', 'log_consumers.feed_consumers')
+    profiler.instrument_calls(dlc.pd, 'to_datetime', 'pd.to_datetime')
+    return profiler
 
-        output_file = "output/dlc_operations_detailed_report.csv"
-        df.to_csv(output_file, index=False)
-        print(f"\nDetailed DLC operations report saved to {output_file}")
 
-        summary_file = "output/dlc_summary_stats.csv"
-        summary_stats.to_csv(summary_file, index=False)
-        print(f"Summary statistics saved to {summary_file}")
+def stop_profiler(args, profiler):
+    profiler.stop()
+    profiler.print_summary()
+    profile_file = args.profile_output or os.path.join(args.output_dir, "profile.json")
+    profiler.save_json(profile_file)
+    print(f"Profile saved to {profile_file}")
 
-        slowest_operations_file = "dlc_slowest_operations.csv"
-        dlc.print_slowest_reports_to_csv(reports, slowest_operations_file)
+
+def build_report_writer(args):
+    return report_writer.ReportWriter(args.output_dir, args.report_format, args.compression)
+
+
+def write_summary_and_slowest_reports(args, writer, summary_stats, reports):
+    summary_name = os.path.splitext(os.path.basename(args.csv_output))[0] if args.csv_output else "dlc_summary_stats"
+    summary_file = writer.write(summary_name, summary_stats)
+    print(f"Summary statistics saved to {summary_file}")
+
+    for report_name, report in reports.items():
+        slowest_operations_file = writer.write(report_name, report)
         print(f"Slowest operations report saved to {slowest_operations_file}")
 
-        if analysis_input_file != args.input and not args.keep_reduced:
-            os.remove(analysis_input_file)
-            print(f"Removed reduced log file: {analysis_input_file}")
+
+def build_log_consumers(args):
+    """Returns the analyses requested on the command line, to run in the pass of the DLC extraction."""
+    log_consumers = []
+    if args.pivot_stats:
+        log_consumers.append(consumers.PivotCommitStats(top_k=args.top_n))
+    if args.store_stats:
+        log_consumers.append(consumers.StoreTransactionStats(args.store_stats, top_k=args.top_n))
+    if args.pivot_block_threshold is not None:
+        log_consumers.append(consumers.SlowPivotBlockFilter(args.pivot_block_threshold, args.pivot_block_output))
+    return log_consumers
+
+
+def follow_log_file(args, input_file):
+    """Reports the DLC operations of a log that is still being written, see dlc_follow."""
+    appender = follow.CsvOperationAppender(args.follow_output) if args.follow_output else None
+    slowest = streaming_stats.SlowestOperations(args.top_n, extra_metrics=args.top_metrics)
+
+    def report(op):
+        print(f"[{op.thread}] {op.operation_type} operation {op.operation_id} on {op.topic}: {op.dlc_duration_ms}ms")
+        slowest.add(op)
+        if appender:
+            appender(op)
+
+    if not isinstance(input_file, str):
+        raise ValueError("Follow mode reads a single log file")
+    print(f"Following {input_file} (Ctrl+C to stop)...")
+    follow.follow_dlc_operations(input_file, report, state_path=args.follow_state, time_format=args.time_format)
+
+    # slowest operations reported during this session
+    print_slowest_reports(slowest.reports())
 
 
 if __name__ == "__main__":
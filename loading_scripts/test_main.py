@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import main
+
+
+class TestRunAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, "config.yaml")
+        with open(self.config_path, "w") as f:
+            f.write("input: from_config.log\nworkers: 2\ntop_n: 10\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, *argv):
+        with patch.object(sys, "argv", ["main.py", "-cf", self.config_path, *argv]), \
+                patch.object(main.progress, "ENABLED", main.progress.ENABLED), \
+                patch("main.analyze") as analyze:
+            main.run_analysis()
+        args, inputs, input_file = analyze.call_args.args
+        return args, inputs, input_file
+
+    def test_cli_options_override_the_config(self):
+        output_dir = os.path.join(self.tmp_dir.name, "xx")
+        args, inputs, input_file = self._run("-i", "from_cli.log", "--workers", "4", "--profile",
+                                             "--output_dir", output_dir)
+
+        self.assertEqual(["from_cli.log"], inputs)
+        self.assertEqual("from_cli.log", input_file)
+        self.assertEqual(4, args.workers)
+        self.assertEqual(output_dir, args.output_dir)
+        self.assertTrue(args.profile)
+        # the config still gives the options not on the command line
+        self.assertEqual(10, args.top_n)
+
+    def test_config_gives_the_defaults(self):
+        args, inputs, _ = self._run("--no_progress")
+
+        self.assertEqual(["from_config.log"], inputs)
+        self.assertEqual(2, args.workers)
+        self.assertTrue(args.no_progress)
+
+    def test_streaming_rejects_the_options_of_the_batch_pass(self):
+        for option in (["--workers", "2"], ["--engine", "mmap"], ["--cache_dir", self.tmp_dir.name]):
+            with self.subTest(option=option), patch("sys.stderr"), self.assertRaises(SystemExit):
+                self._run("--streaming", *option)
+
+    def test_seek_requires_keep_reduced(self):
+        with patch("sys.stderr"), self.assertRaises(SystemExit):
+            self._run("--seek")
+        args, _, _ = self._run("--seek", "--keep_reduced")
+        self.assertTrue(args.seek)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+import csv
+import filecmp
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+import KeepNKeys
+from loading_scripts.lib import progress, synthetic_logs
+
+progress.ENABLED = False
+
+# Rows with quoted fields, one of them on two lines, and rows without a value
+QUOTED_LINES = ['id,"tradeKey",comment\r\n',
+                '1,"A,1",plain\r\n',
+                '2,B,"quoted, ""twice"""\r\n',
+                '3,A""1,5" screen\r\n',
+                '4,"B","two\r\nlines, ""quoted"""\r\n',
+                '5,C\r\n',
+                '\r\n',
+                '6\r\n',
+                '7,"B"x,"open\nagain",\n',
+                '8,"A,1",last']
+
+
+def _dirs_equal(left: Path, right: Path) -> bool:
+    comparison = filecmp.dircmp(left, right)
+    if comparison.left_only or comparison.right_only:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(left, right, comparison.common_files, shallow=False)
+    return not mismatch and not errors and all(_dirs_equal(left / d, right / d) for d in comparison.common_dirs)
+
+
+class TestKeepNKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.input_path = self.root / "input"
+        synthetic_logs.generate_csv_tree(self.input_path, 200_000, files=6, distinct_keys=500, seed=1)
+        self.csv_files = sorted(self.input_path.rglob("*.csv"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _tasks(self, output_name):
+        output_path = self.root / output_name
+        tasks = []
+        for input_file in self.csv_files:
+            output_file = output_path / input_file.relative_to(self.input_path)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            tasks.append((input_file, output_file))
+        return output_path, tasks
+
+    def test_parallel_filter_matches_sequential(self):
+        allowed = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", 50)
+
+        sequential_path, tasks = self._tasks("sequential")
+        sequential = [KeepNKeys.limit_csv(input_file, output_file, "tradeKey", allowed)
+                      for input_file, output_file in tasks]
+        parallel_path, tasks = self._tasks("parallel")
+        parallel = KeepNKeys.filter_files_parallel(tasks, "tradeKey", allowed, 2, self.input_path)
+
+        self.assertEqual(sorted(sequential), sorted(parallel))
+        self.assertEqual(50, len(allowed))
+        self.assertTrue(_dirs_equal(sequential_path, parallel_path))
+
+    def test_single_pass_matches_two_phases(self):
+        # a cutoff in the first file, one in a later file, and no cutoff
+        for limit in (50, 480, 10 ** 6):
+            with self.subTest(limit=limit):
+                allowed = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", limit)
+                two_phases_path, tasks = self._tasks(f"two_phases_{limit}")
+                two_phases = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path)
+
+                single_pass_path, tasks = self._tasks(f"single_pass_{limit}")
+                single_pass_allowed, single_pass = KeepNKeys.discover_and_filter(tasks, "tradeKey", limit,
+                                                                                 self.input_path)
+                remaining = tasks[len(single_pass):]
+                single_pass += KeepNKeys.filter_files(remaining, "tradeKey", single_pass_allowed, 1, self.input_path)
+
+                self.assertEqual(allowed, single_pass_allowed)
+                self.assertEqual(two_phases, single_pass)
+                self.assertTrue(_dirs_equal(two_phases_path, single_pass_path))
+
+    def _all_values(self):
+        values = set()
+        for input_file in self.csv_files:
+            with open(input_file, newline='', encoding='utf-8') as f:
+                values.update(row["tradeKey"] for row in csv.DictReader(f))
+        return values
+
+    def test_bottom_k_selects_smallest_hashes_in_any_order(self):
+        expected = set(sorted(self._all_values(), key=KeepNKeys.value_hash)[:50])
+
+        sequential = KeepNKeys.discover_bottom_k(self.csv_files, "tradeKey", 50, 1, self.input_path)
+        reversed_files = KeepNKeys.discover_bottom_k(self.csv_files[::-1], "tradeKey", 50, 1, self.input_path)
+        parallel = KeepNKeys.discover_bottom_k(self.csv_files, "tradeKey", 50, 2, self.input_path)
+
+        self.assertEqual(expected, sequential)
+        self.assertEqual(expected, reversed_files)
+        self.assertEqual(expected, parallel)
+
+    def test_fraction_keeps_the_values_under_the_hash_threshold(self):
+        fraction = KeepNKeys.HashFraction(0.1)
+        expected = {value for value in self._all_values() if KeepNKeys.value_hash(value) < 0.1 * 2 ** 64}
+        self.assertTrue(0 < len(expected) < 100)
+
+        sequential_path, tasks = self._tasks("sequential")
+        KeepNKeys.filter_files(tasks, "tradeKey", fraction, 1, self.input_path)
+        parallel_path, tasks = self._tasks("parallel")
+        KeepNKeys.filter_files(tasks, "tradeKey", fraction, 2, self.input_path)
+
+        kept = set()
+        for output_file in sequential_path.rglob("*.csv"):
+            with open(output_file, newline='', encoding='utf-8') as f:
+                kept.update(row["tradeKey"] for row in csv.DictReader(f))
+        self.assertEqual(expected, kept)
+        self.assertTrue(_dirs_equal(sequential_path, parallel_path))
+
+    def test_saved_keys_are_loaded_back(self):
+        values = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", 50)
+        values |= {"a,b", 'say "hi"', "two\nlines", ""}
+        for name in ("keys.csv", "keys.csv.gz"):
+            with self.subTest(name=name):
+                keys_file = self.root / "keys" / name
+                KeepNKeys.save_keys(keys_file, values | {"a,b"})
+                self.assertEqual(values, KeepNKeys.load_keys(keys_file))
+
+    def test_index_gives_the_output_of_the_scan(self):
+        quoted_file = self.input_path / "quoted.csv"
+        quoted_file.write_bytes("".join(QUOTED_LINES).encode("utf-8"))
+        self.csv_files.append(quoted_file)
+        KeepNKeys.build_key_indexes(self.csv_files, "tradeKey", 1, self.input_path)
+
+        for limit in (50, 10 ** 6):
+            with self.subTest(limit=limit):
+                allowed = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", limit)
+                self.assertEqual(allowed, KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", limit,
+                                                                           use_index=True))
+                allowed |= {"A,1", "B"}
+
+                scan_path, tasks = self._tasks(f"scan_{limit}")
+                scan = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path)
+                indexed_path, tasks = self._tasks(f"indexed_{limit}")
+                indexed = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path, use_index=True)
+
+                self.assertEqual(scan, indexed)
+                self.assertTrue(_dirs_equal(scan_path, indexed_path))
+
+        self.assertEqual(KeepNKeys.discover_bottom_k(self.csv_files, "tradeKey", 50, 1, self.input_path),
+                         KeepNKeys.discover_bottom_k(self.csv_files, "tradeKey", 50, 1, self.input_path,
+                                                     use_index=True))
+
+        # the index of a file changed since is not used
+        self.assertIsNotNone(KeepNKeys.KeyIndex.load(quoted_file, "tradeKey"))
+        with open(quoted_file, "ab") as f:
+            f.write(b"9,D,new\r\n")
+        self.assertIsNone(KeepNKeys.KeyIndex.load(quoted_file, "tradeKey"))
+
+    def test_index_keeps_the_header_of_a_file_without_allowed_values(self):
+        KeepNKeys.build_key_indexes(self.csv_files, "tradeKey", 1, self.input_path)
+        for allowed in ({"missing"}, KeepNKeys.CompactKeySet({"missing"})):
+            with self.subTest(allowed=type(allowed).__name__):
+                scan_path, tasks = self._tasks("scan")
+                scan = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path)
+                indexed_path, tasks = self._tasks("indexed")
+                indexed = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path, use_index=True)
+
+                self.assertTrue(all(rows_kept == 0 for rows_kept, _ in indexed))
+                self.assertEqual(scan, indexed)
+                self.assertTrue(_dirs_equal(scan_path, indexed_path))
+
+    @patch("KeepNKeys.COMPACT_BATCH_ROWS", 100)
+    def test_compact_key_set_filters_like_a_set(self):
+        quoted_file = self.input_path / "quoted.csv"
+        quoted_file.write_bytes("".join(QUOTED_LINES).encode("utf-8"))
+        self.csv_files.append(quoted_file)
+        allowed = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", 300) | {"A,1", "B", "é"}
+        compact = KeepNKeys.CompactKeySet(allowed)
+
+        self.assertEqual(len(allowed), len(compact))
+        self.assertIn("é", compact)
+        self.assertNotIn("C", compact)
+
+        set_path, tasks = self._tasks("set")
+        with_set = KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path)
+        for workers, use_index in ((1, False), (2, False), (1, True)):
+            with self.subTest(workers=workers, use_index=use_index):
+                if use_index:
+                    KeepNKeys.build_key_indexes(self.csv_files, "tradeKey", 1, self.input_path)
+                compact_path, tasks = self._tasks(f"compact_{workers}_{use_index}")
+                with_compact = KeepNKeys.filter_files(tasks, "tradeKey", compact, workers, self.input_path,
+                                                      use_index=use_index)
+                self.assertEqual(sorted(with_set), sorted(with_compact))
+                self.assertTrue(_dirs_equal(set_path, compact_path))
+
+    def test_compact_key_set_verifies_the_hash_matches(self):
+        # every value has the same hash
+        with patch("KeepNKeys._hash_values", lambda values: np.zeros(len(values), dtype=np.uint64)):
+            compact = KeepNKeys.CompactKeySet({"a", "b", "c"})
+            self.assertEqual([True, False, True], compact.contains_many(["c", "d", "a"]).tolist())
+
+    def test_filter_copies_rows_read_by_the_csv_module(self):
+        lines = QUOTED_LINES
+        input_file = self.root / "quoted.csv"
+        input_file.write_bytes("".join(lines).encode("utf-8"))
+        output_file = self.root / "quoted_filtered.csv"
+
+        result = KeepNKeys.limit_csv(input_file, output_file, "tradeKey", {"A,1", "B", 'A""1'})
+
+        kept = [lines[0], lines[1], lines[2], lines[3], lines[4], lines[9]]
+        self.assertEqual("".join(kept), output_file.read_bytes().decode("utf-8"))
+        self.assertEqual((5, 4), result)
+
+        # the values are the ones of the csv module, here "B"x is read as Bx
+        allowed = set()
+        KeepNKeys.limit_csv(input_file, output_file, "tradeKey", allowed, discover_limit=10)
+        self.assertEqual({"A,1", "B", 'A""1', "C", "Bx"}, allowed)
+
+    def test_filters_without_numpy(self):
+        # numpy is only imported by the key indexes and the compact key sets
+        allowed = KeepNKeys.discover_unique_values(self.csv_files, "tradeKey", 20)
+        output_path, tasks = self._tasks("without_numpy")
+        script = ("import sys; sys.modules['numpy'] = None; from pathlib import Path; import KeepNKeys; "
+                  f"KeepNKeys.filter_files([(Path(i), Path(o)) for i, o in {[(str(i), str(o)) for i, o in tasks]!r}], "
+                  f"'tradeKey', {allowed!r}, 1, Path({str(self.input_path)!r}))")
+        subprocess.run([sys.executable, "-c", script], cwd=Path(KeepNKeys.__file__).parent, check=True,
+                       capture_output=True)
+
+        expected_path, tasks = self._tasks("expected")
+        KeepNKeys.filter_files(tasks, "tradeKey", allowed, 1, self.input_path)
+        self.assertTrue(_dirs_equal(expected_path, output_path))
+
+
+if __name__ == '__main__':
+    unittest.main()